@@ -4,10 +4,12 @@ Alert endpoints
 
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.core.database import get_db
+from backend.core.pagination import CountMode, count_rows, fetch_page
 from backend.models.alert import Alert, AlertStatus
-from backend.models.user import User
+from backend.auth.principal_cache import UserPrincipal
 from backend.auth.dependencies import get_current_active_user
 from backend.schemas.alert import AlertResponse, AlertUpdate, AlertListResponse
 from sqlalchemy.sql import func
@@ -19,48 +21,57 @@ router = APIRouter()
 async def get_alerts(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = None,
     status: Optional[AlertStatus] = None,
     severity: Optional[str] = None,
     sensor_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
-    """Get alerts with optional filtering"""
-    query = db.query(Alert)
+    """Get alerts with optional filtering.
+
+    Pass the ``next_cursor`` of a response as ``cursor`` to page by
+    (triggered_at, id) instead of offset.
+    """
+    query = select(Alert)
     
     # Apply filters
     if status:
-        query = query.filter(Alert.status == status)
+        query = query.where(Alert.status == status)
     if severity:
-        query = query.filter(Alert.severity == severity)
+        query = query.where(Alert.severity == severity)
     if sensor_id:
-        query = query.filter(Alert.sensor_id == sensor_id)
-    
-    # Order by triggered_at descending
-    query = query.order_by(Alert.triggered_at.desc())
+        query = query.where(Alert.sensor_id == sensor_id)
     
     # Get total count
-    total = query.count()
+    count = count or (CountMode.NONE if cursor else CountMode.EXACT)
+    total, total_is_estimate = await count_rows(db, query, count)
     
-    # Apply pagination
-    alerts = query.offset(skip).limit(limit).all()
+    # Order by triggered_at descending and apply pagination
+    alerts, next_cursor = await fetch_page(
+        db, query, [Alert.triggered_at, Alert.id], limit,
+        skip=skip, cursor=cursor, descending=True
+    )
     
     return AlertListResponse(
         alerts=[AlertResponse.from_orm(alert) for alert in alerts],
         total=total,
-        page=skip // limit + 1,
-        size=limit
+        total_is_estimate=total_is_estimate,
+        page=None if cursor else skip // limit + 1,
+        size=limit,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/{alert_id}", response_model=AlertResponse)
 async def get_alert(
     alert_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Get alert by ID"""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = await db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -73,11 +84,11 @@ async def get_alert(
 async def update_alert(
     alert_id: int,
     alert_data: AlertUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Update alert status"""
-    alert = db.query(Alert).filter(Alert.id == alert_id).first()
+    alert = await db.get(Alert, alert_id)
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,7 +107,7 @@ async def update_alert(
     elif alert_data.status == AlertStatus.RESOLVED and not alert.resolved_at:
         alert.resolved_at = func.now()
     
-    db.commit()
-    db.refresh(alert)
+    await db.commit()
+    await db.refresh(alert)
     
     return alert
@@ -5,11 +5,13 @@ Authentication endpoints
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.core.database import get_db
 from backend.core.config import settings
 from backend.models.user import User
-from backend.auth.security import verify_password, create_access_token
+from backend.auth.principal_cache import UserPrincipal
+from backend.auth.security import PasswordHasherBusy, create_access_token, password_hasher
 from backend.auth.dependencies import get_current_active_user
 from backend.schemas.auth import Token, UserLogin, UserCreate, UserResponse
 from sqlalchemy.sql import func
@@ -17,15 +19,31 @@ from sqlalchemy.sql import func
 router = APIRouter()
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent password checks, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing pool, answering 503 when it is saturated"""
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+
+
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login endpoint"""
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).where(User.username == form_data.username))
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await _verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -45,7 +63,7 @@ async def login(
     
     # Update last login
     user.last_login = func.now()
-    db.commit()
+    await db.commit()
     
     return {
         "access_token": access_token,
@@ -56,27 +74,29 @@ async def login(
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register new user endpoint"""
     # Check if user already exists
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await db.scalar(select(User.id).where(User.username == user_data.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
-    if db.query(User).filter(User.email == user_data.email).first():
+    if await db.scalar(select(User.id).where(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    from backend.auth.security import get_password_hash
     from backend.models.user import UserRole
     
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -86,15 +106,15 @@ async def register(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Get current user information"""
     return current_user
@@ -2,18 +2,34 @@
 IFC file endpoints
 """
 
+import logging
 import os
 import shutil
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
-from sqlalchemy.orm import Session
+import gzip
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
 from backend.core.database import get_db
+from backend.core.pagination import CountMode, count_rows, fetch_page
+from backend.ifc.index import INDEX_SUFFIX
 from backend.models.ifc_file import IFCFile
+from backend.models.ifc_job import IFCJob
 from backend.models.ifc_space import IFCSpace
-from backend.models.user import User
+from backend.models.sensor import Sensor
+from backend.auth.principal_cache import UserPrincipal
 from backend.auth.dependencies import get_current_active_user, get_current_admin_user
-from backend.schemas.ifc import IFCFileResponse, IFCFileUpdate, IFCFileListResponse, IFCSpaceResponse, IFCSpaceListResponse
-from backend.services.ifc_processor import IFCProcessor
+from backend.schemas.ifc import IFCFileResponse, IFCFileUpdate, IFCFileListResponse, IFCSpaceResponse, IFCSpaceListResponse, IFCSpaceMatch, IFCSpaceQueryResponse, IFCJobResponse, IFCHeatmapResponse
+from backend.services.heatmaps import heatmaps
+from backend.services.ifc_geometry import GEOMETRY_MEDIA_TYPE, geometry_path, rebuild_geometry, remove_geometry
+from backend.services.ifc_jobs import enqueue_job
+from backend.services.ifc_storage import UploadTooLarge, store_upload
+from backend.services.space_index import SpaceIndex, space_indexes
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -30,13 +46,14 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 async def get_ifc_files(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Get list of uploaded IFC files"""
-    query = db.query(IFCFile)
-    total = query.count()
-    ifc_files = query.offset(skip).limit(limit).order_by(IFCFile.created_at.desc()).all()
+    total = await db.scalar(select(func.count()).select_from(IFCFile))
+    ifc_files = (await db.scalars(
+        select(IFCFile).order_by(IFCFile.created_at.desc()).offset(skip).limit(limit)
+    )).all()
     
     return IFCFileListResponse(
         ifc_files=[IFCFileResponse.from_orm(file) for file in ifc_files],
@@ -49,11 +66,11 @@ async def get_ifc_files(
 @router.get("/files/{file_id}", response_model=IFCFileResponse)
 async def get_ifc_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Get IFC file by ID"""
-    ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
+    ifc_file = await db.get(IFCFile, file_id)
     if not ifc_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,8 +82,8 @@ async def get_ifc_file(
 @router.post("/upload", response_model=IFCFileResponse)
 async def upload_ifc_file(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Upload IFC file"""
     
@@ -78,45 +95,33 @@ async def upload_ifc_file(
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Validate file size
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
+    # Stream to disk, enforcing the size limit as data arrives
+    import uuid
+    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    try:
+        stored = await store_upload(file, UPLOAD_DIR, unique_filename, MAX_FILE_SIZE)
+    except UploadTooLarge:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail="File too large. Maximum size is 100MB"
         )
     
-    # Generate unique filename
-    import uuid
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
-    
     # Create database record
     ifc_file = IFCFile(
         filename=unique_filename,
         original_filename=file.filename,
-        file_path=file_path,
-        file_size=len(file_content),
+        file_path=stored.path,
+        file_size=stored.size,
+        file_hash=stored.sha256,
         uploaded_by=current_user.id
     )
     
     db.add(ifc_file)
-    db.commit()
-    db.refresh(ifc_file)
+    await db.flush()
     
-    # Start processing in background
-    try:
-        processor = IFCProcessor()
-        await processor.process_ifc_file(ifc_file.id, db)
-    except Exception as e:
-        # Update processing status
-        ifc_file.processing_status = "failed"
-        ifc_file.processing_error = str(e)
-        db.commit()
+    # Queue processing; a worker process picks it up
+    await enqueue_job(db, ifc_file, requested_by=current_user.id)
+    await db.refresh(ifc_file)
     
     return ifc_file
 
@@ -125,11 +130,11 @@ async def upload_ifc_file(
 async def update_ifc_file(
     file_id: int,
     file_data: IFCFileUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Update IFC file metadata"""
-    ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
+    ifc_file = await db.get(IFCFile, file_id)
     if not ifc_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -140,8 +145,8 @@ async def update_ifc_file(
     for field, value in update_data.items():
         setattr(ifc_file, field, value)
     
-    db.commit()
-    db.refresh(ifc_file)
+    await db.commit()
+    await db.refresh(ifc_file)
     
     return ifc_file
 
@@ -149,24 +154,34 @@ async def update_ifc_file(
 @router.delete("/files/{file_id}")
 async def delete_ifc_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Delete IFC file and its data"""
-    ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
+    ifc_file = await db.get(IFCFile, file_id)
     if not ifc_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="IFC file not found"
         )
     
-    # Delete physical file
-    if os.path.exists(ifc_file.file_path):
-        os.remove(ifc_file.file_path)
+    # Delete physical file, its entity index and its geometry
+    for path in (ifc_file.file_path, ifc_file.file_path + INDEX_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
+    remove_geometry(os.path.dirname(ifc_file.file_path), file_id, ifc_file.geometry_etag)
     
-    # Delete database records
-    db.delete(ifc_file)
-    db.commit()
+    # Delete database records; sensors placed in the model are kept, without a position
+    await db.execute(delete(IFCJob).where(IFCJob.ifc_file_id == file_id))
+    await db.execute(
+        update(Sensor)
+        .where(Sensor.ifc_file_id == file_id)
+        .values(ifc_file_id=None, ifc_space_id=None, x_coordinate=None, y_coordinate=None, z_coordinate=None)
+    )
+    await db.delete(ifc_file)
+    await db.commit()
+    space_indexes.invalidate(file_id)
+    heatmaps.invalidate(file_id)
     
     return {"message": "IFC file deleted successfully"}
 
@@ -176,56 +191,308 @@ async def get_ifc_spaces(
     file_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = None,
     space_type: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
-    """Get spaces from IFC file"""
-    query = db.query(IFCSpace).filter(IFCSpace.ifc_file_id == file_id)
+    """Get spaces from IFC file, ordered by id"""
+    query = select(IFCSpace).where(IFCSpace.ifc_file_id == file_id)
     
     if space_type:
-        query = query.filter(IFCSpace.space_type == space_type)
+        query = query.where(IFCSpace.space_type == space_type)
     
-    total = query.count()
-    spaces = query.offset(skip).limit(limit).all()
+    count = count or (CountMode.NONE if cursor else CountMode.EXACT)
+    total, total_is_estimate = await count_rows(db, query, count)
+    spaces, next_cursor = await fetch_page(db, query, [IFCSpace.id], limit, skip=skip, cursor=cursor)
     
     return IFCSpaceListResponse(
         spaces=[IFCSpaceResponse.from_orm(space) for space in spaces],
         total=total,
-        page=skip // limit + 1,
-        size=limit
+        total_is_estimate=total_is_estimate,
+        page=None if cursor else skip // limit + 1,
+        size=limit,
+        next_cursor=next_cursor
     )
 
 
+async def get_space_index(db: AsyncSession, file_id: int) -> SpaceIndex:
+    """Spatial index of a file's spaces, or 404"""
+    index = await space_indexes.get(db, file_id)
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="IFC file not found"
+        )
+    return index
+
+
+async def space_matches(
+    db: AsyncSession,
+    space_ids: List[int],
+    distances: Optional[List[float]] = None,
+    total: Optional[int] = None
+) -> IFCSpaceQueryResponse:
+    """Load spaces found by the index, keeping its order"""
+    spaces = {
+        space.id: space
+        for space in (await db.scalars(select(IFCSpace).where(IFCSpace.id.in_(space_ids)))).all()
+    } if space_ids else {}
+    matches = []
+    for position, space_id in enumerate(space_ids):
+        space = spaces.get(space_id)
+        if space is None:  # deleted since the index was built
+            continue
+        match = IFCSpaceMatch.from_orm(space)
+        if distances is not None:
+            match.distance = distances[position]
+        matches.append(match)
+    return IFCSpaceQueryResponse(spaces=matches, total=len(matches) if total is None else total)
+
+
+@router.get("/files/{file_id}/spaces/at", response_model=IFCSpaceQueryResponse)
+async def get_ifc_spaces_at(
+    file_id: int,
+    x: float,
+    y: float,
+    z: Optional[float] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get the spaces containing a point, smallest first; without ``z``, on every storey"""
+    index = await get_space_index(db, file_id)
+    return await space_matches(db, index.containing(x, y, z))
+
+
+@router.get("/files/{file_id}/spaces/intersecting", response_model=IFCSpaceQueryResponse)
+async def get_ifc_spaces_intersecting(
+    file_id: int,
+    min_x: float,
+    min_y: float,
+    max_x: float,
+    max_y: float,
+    min_z: Optional[float] = None,
+    max_z: Optional[float] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get the spaces intersecting a box, ordered by id; ``total`` counts them all"""
+    index = await get_space_index(db, file_id)
+    space_ids = index.intersecting(min_x, min_y, max_x, max_y, min_z, max_z)
+    return await space_matches(db, space_ids[:limit], total=len(space_ids))
+
+
+@router.get("/files/{file_id}/spaces/nearest", response_model=IFCSpaceQueryResponse)
+async def get_ifc_spaces_nearest(
+    file_id: int,
+    x: float,
+    y: float,
+    z: Optional[float] = None,
+    k: int = Query(1, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get the ``k`` spaces nearest to a point with their distance; 0 means inside"""
+    index = await get_space_index(db, file_id)
+    nearest = index.nearest(x, y, z, k)
+    return await space_matches(db, [space_id for space_id, _ in nearest], [distance for _, distance in nearest])
+
+
+@router.get("/files/{file_id}/geometry", response_class=FileResponse)
+async def get_ifc_geometry(
+    file_id: int,
+    request: Request,
+    v: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get the geometry of all spaces of a processed IFC file as one binary artifact.
+
+    The artifact is built once per processing (see ``ifc_geometry`` for the
+    layout) and sent gzip-encoded. Its ETag is the file's
+    ``geometry_etag``: a request for ``?v=<geometry_etag>`` may be cached
+    forever, one without ``v`` is revalidated with If-None-Match.
+    """
+    ifc_file = await db.get(IFCFile, file_id)
+    if not ifc_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="IFC file not found"
+        )
+    etag = ifc_file.geometry_etag
+    if not etag:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="IFC file has not been processed"
+        )
+    path = geometry_path(os.path.dirname(ifc_file.file_path), file_id, etag)
+    if not os.path.exists(path):
+        etag = await run_in_threadpool(rebuild_geometry, file_id)
+        if etag is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="IFC file not found"
+            )
+        path = geometry_path(os.path.dirname(ifc_file.file_path), file_id, etag)
+    if v is not None and v != etag:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Geometry version not found"
+        )
+    
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "private, max-age=31536000, immutable" if v else "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if f'"{etag}"' in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return FileResponse(path, media_type=GEOMETRY_MEDIA_TYPE, headers={**headers, "Content-Encoding": "gzip"})
+    with open(path, "rb") as artifact:
+        data = gzip.decompress(artifact.read())
+    return Response(content=data, media_type=GEOMETRY_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/files/{file_id}/heatmap", response_model=IFCHeatmapResponse)
+async def get_ifc_heatmap(
+    file_id: int,
+    sensor_type: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get the latest value of each space's sensors of one type, for colouring the building.
+
+    Values are the mean of the space's active sensors; served from memory
+    for ``IFC_HEATMAP_TTL`` seconds.
+    """
+    payload = heatmaps.cached(file_id, sensor_type)
+    if payload is None:
+        if not await db.scalar(select(IFCFile.id).where(IFCFile.id == file_id)):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="IFC file not found"
+            )
+        payload = await heatmaps.get(db, file_id, sensor_type)
+    return Response(content=payload, media_type="application/json")
+
+
 @router.post("/files/{file_id}/process")
 async def reprocess_ifc_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    force: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
+):
+    """Reprocess IFC file; unless ``force``, a file unchanged since it was processed is left as is"""
+    ifc_file = await db.get(IFCFile, file_id)
+    if not ifc_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="IFC file not found"
+        )
+    
+    if not force and ifc_file.is_processed and ifc_file.file_hash and ifc_file.processed_hash == ifc_file.file_hash:
+        return {"message": "IFC file unchanged since it was processed", "job_id": None}
+    
+    job = await enqueue_job(db, ifc_file, requested_by=current_user.id, force=force)
+    return {"message": "IFC file processing queued", "job_id": job.id}
+
+
+@router.post("/files/{file_id}/revision", response_model=IFCFileResponse)
+async def upload_ifc_revision(
+    file_id: int,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
-    """Reprocess IFC file"""
-    ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
+    """Upload a revised model for an IFC file.
+
+    The file's spaces are updated in place: only spaces added, removed or
+    changed in the revision are written, matched by GlobalId.
+    """
+    ifc_file = await db.get(IFCFile, file_id)
     if not ifc_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="IFC file not found"
         )
     
-    # Reset processing status
-    ifc_file.processing_status = "pending"
-    ifc_file.processing_error = None
-    db.commit()
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    if file_extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
     
-    # Start processing
+    import uuid
+    unique_filename = f"{uuid.uuid4()}{file_extension}"
     try:
-        processor = IFCProcessor()
-        await processor.process_ifc_file(ifc_file.id, db)
-        return {"message": "IFC file processing started"}
-    except Exception as e:
-        ifc_file.processing_status = "failed"
-        ifc_file.processing_error = str(e)
-        db.commit()
+        stored = await store_upload(file, UPLOAD_DIR, unique_filename, MAX_FILE_SIZE)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large. Maximum size is 100MB"
+        )
+    
+    # Identical content: keep the current file and its spaces
+    if stored.sha256 == ifc_file.file_hash:
+        os.remove(stored.path)
+        return ifc_file
+    
+    previous_path = ifc_file.file_path
+    ifc_file.filename = unique_filename
+    ifc_file.original_filename = file.filename
+    ifc_file.file_path = stored.path
+    ifc_file.file_size = stored.size
+    ifc_file.file_hash = stored.sha256
+    await enqueue_job(db, ifc_file, requested_by=current_user.id)
+    await db.refresh(ifc_file)
+    
+    # A job still running on the previous file keeps its open handle. The
+    # revision is committed at this point, so a file that cannot be removed
+    # (open files are locked on Windows) is left behind rather than failing
+    for path in (previous_path, previous_path + INDEX_SUFFIX):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove previous revision file {path}: {e}")
+    
+    return ifc_file
+
+
+@router.get("/files/{file_id}/job", response_model=IFCJobResponse)
+async def get_ifc_file_job(
+    file_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get the most recent processing job of an IFC file"""
+    job = await db.scalar(
+        select(IFCJob).where(IFCJob.ifc_file_id == file_id).order_by(IFCJob.id.desc()).limit(1)
+    )
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No processing job for this IFC file"
+        )
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=IFCJobResponse)
+async def get_ifc_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get status and progress of an IFC processing job"""
+    job = await db.get(IFCJob, job_id)
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Processing failed: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="IFC job not found"
         )
+    return job
@@ -4,10 +4,12 @@ Location endpoints
 
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
 from backend.core.database import get_db
 from backend.models.location import Location
-from backend.models.user import User
+from backend.auth.principal_cache import UserPrincipal
 from backend.auth.dependencies import get_current_active_user, get_current_admin_user
 from backend.schemas.location import LocationCreate, LocationUpdate, LocationResponse, LocationListResponse
 
@@ -18,13 +20,12 @@ router = APIRouter()
 async def get_locations(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Get list of locations"""
-    query = db.query(Location)
-    total = query.count()
-    locations = query.offset(skip).limit(limit).all()
+    total = await db.scalar(select(func.count()).select_from(Location))
+    locations = (await db.scalars(select(Location).offset(skip).limit(limit))).all()
     
     return LocationListResponse(
         locations=[LocationResponse.from_orm(location) for location in locations],
@@ -37,11 +38,11 @@ async def get_locations(
 @router.get("/{location_id}", response_model=LocationResponse)
 async def get_location(
     location_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Get location by ID"""
-    location = db.query(Location).filter(Location.id == location_id).first()
+    location = await db.get(Location, location_id)
     if not location:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -53,14 +54,14 @@ async def get_location(
 @router.post("/", response_model=LocationResponse)
 async def create_location(
     location_data: LocationCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Create new location"""
     db_location = Location(**location_data.dict())
     db.add(db_location)
-    db.commit()
-    db.refresh(db_location)
+    await db.commit()
+    await db.refresh(db_location)
     
     return db_location
 
@@ -69,11 +70,11 @@ async def create_location(
 async def update_location(
     location_id: int,
     location_data: LocationUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Update location"""
-    location = db.query(Location).filter(Location.id == location_id).first()
+    location = await db.get(Location, location_id)
     if not location:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,8 +85,8 @@ async def update_location(
     for field, value in update_data.items():
         setattr(location, field, value)
     
-    db.commit()
-    db.refresh(location)
+    await db.commit()
+    await db.refresh(location)
     
     return location
 
@@ -93,18 +94,18 @@ async def update_location(
 @router.delete("/{location_id}")
 async def delete_location(
     location_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Delete location"""
-    location = db.query(Location).filter(Location.id == location_id).first()
+    location = await db.get(Location, location_id)
     if not location:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Location not found"
         )
     
-    db.delete(location)
-    db.commit()
+    await db.delete(location)
+    await db.commit()
     
     return {"message": "Location deleted successfully"}
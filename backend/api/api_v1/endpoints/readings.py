@@ -2,16 +2,28 @@
 Sensor readings endpoints
 """
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+from backend.core.config import settings
 from backend.core.database import get_db
+from backend.core.pagination import CountMode, count_rows, fetch_page
 from backend.models.reading import SensorReading
-from backend.models.user import User
+from backend.auth.principal_cache import UserPrincipal
 from backend.auth.dependencies import get_current_active_user
-from backend.schemas.reading import ReadingResponse, ReadingCreate, ReadingListResponse
-from sqlalchemy.sql import func
+from backend.schemas.reading import (
+    ReadingResponse, ReadingCreate, ReadingListResponse,
+    ReadingBulkError, ReadingBulkResponse, ReadingAggregateResponse
+)
+from backend.services.latest_readings import get_latest, insert_readings
+from backend.services.sensor_registry import sensor_registry
+from backend.services.reading_aggregation import (
+    aggregate_readings, bucket_count, parse_bucket, parse_functions, to_naive_utc
+)
 
 router = APIRouter()
 
@@ -20,79 +32,251 @@ router = APIRouter()
 async def get_readings(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = None,
     sensor_id: Optional[int] = None,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
-    """Get sensor readings with optional filtering"""
-    query = db.query(SensorReading)
+    """Get sensor readings with optional filtering.
+
+    Pass the ``next_cursor`` of a response as ``cursor`` to page by
+    (timestamp, id) instead of offset. ``count`` defaults to exact in offset
+    mode and none in cursor mode.
+    """
+    query = select(SensorReading)
     
     # Apply filters
     if sensor_id:
-        query = query.filter(SensorReading.sensor_id == sensor_id)
+        query = query.where(SensorReading.sensor_id == sensor_id)
     if start_time:
-        query = query.filter(SensorReading.timestamp >= start_time)
+        query = query.where(SensorReading.timestamp >= start_time)
     if end_time:
-        query = query.filter(SensorReading.timestamp <= end_time)
-    
-    # Order by timestamp descending
-    query = query.order_by(SensorReading.timestamp.desc())
+        query = query.where(SensorReading.timestamp <= end_time)
     
     # Get total count
-    total = query.count()
+    count = count or (CountMode.NONE if cursor else CountMode.EXACT)
+    total, total_is_estimate = await count_rows(db, query, count)
     
-    # Apply pagination
-    readings = query.offset(skip).limit(limit).all()
+    # Order by timestamp descending and apply pagination
+    readings, next_cursor = await fetch_page(
+        db, query, [SensorReading.timestamp, SensorReading.id], limit,
+        skip=skip, cursor=cursor, descending=True
+    )
     
     return ReadingListResponse(
         readings=[ReadingResponse.from_orm(reading) for reading in readings],
         total=total,
-        page=skip // limit + 1,
-        size=limit
+        total_is_estimate=total_is_estimate,
+        page=None if cursor else skip // limit + 1,
+        size=limit,
+        next_cursor=next_cursor
     )
 
 
 @router.post("/", response_model=ReadingResponse)
 async def create_reading(
     reading_data: ReadingCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Create new sensor reading"""
-    db_reading = SensorReading(**reading_data.dict())
-    db.add(db_reading)
-    db.commit()
-    db.refresh(db_reading)
+    if not await sensor_registry.get(db, reading_data.sensor_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sensor not found"
+        )
     
-    return db_reading
+    db_reading, = await insert_readings(db, [reading_data.dict()])
+    await db.commit()
+    
+    return ReadingResponse.from_orm(db_reading)
 
 
-@router.get("/latest")
-async def get_latest_readings(
-    sensor_ids: Optional[List[int]] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+def _parse_bulk_body(body: bytes, content_type: str) -> List[Tuple[Any, Optional[str]]]:
+    """Split a bulk request body into (row, parse_error) pairs.
+
+    NDJSON bodies are parsed line by line so a malformed line only rejects
+    that row. JSON bodies may be a plain array or ``{"readings": [...]}``.
+    """
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = []
+        for line in body.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append((json.loads(line), None))
+            except ValueError as e:
+                rows.append((None, f"Invalid JSON: {e}"))
+        return rows
+
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid JSON body: {e}"
+        )
+
+    if isinstance(payload, dict):
+        payload = payload.get("readings")
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a JSON array of readings"
+        )
+    return [(row, None) for row in payload]
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    """Flatten a pydantic validation error into a single line"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+@router.post("/bulk", response_model=ReadingBulkResponse)
+async def create_readings_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
-    """Get latest readings for specified sensors or all sensors"""
-    from sqlalchemy import func
+    """Create many sensor readings from a JSON array or NDJSON body.
+
+    Rows are validated in a single pass; invalid rows are reported back by
+    index and the valid ones are written with one multi-row INSERT per chunk
+    inside a single transaction.
+    """
+    rows = _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+
+    if len(rows) > settings.READINGS_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many readings. Maximum per request is {settings.READINGS_BULK_MAX_ROWS}"
+        )
+
+    errors = []
+    valid = []
+    for index, (row, parse_error) in enumerate(rows):
+        if parse_error:
+            errors.append(ReadingBulkError(index=index, error=parse_error))
+            continue
+        if not isinstance(row, dict):
+            errors.append(ReadingBulkError(index=index, error="Reading must be a JSON object"))
+            continue
+        try:
+            valid.append((index, ReadingCreate(**row).dict()))
+        except ValidationError as e:
+            errors.append(ReadingBulkError(index=index, error=_format_validation_error(e)))
+
+    # Resolve every referenced sensor from the in-memory registry
+    known_ids = await sensor_registry.get_many(db, {data["sensor_id"] for _, data in valid})
+
+    accepted = []
+    for index, data in valid:
+        if data["sensor_id"] in known_ids:
+            accepted.append(data)
+        else:
+            errors.append(ReadingBulkError(index=index, error=f"Sensor {data['sensor_id']} not found"))
+
+    chunk_size = settings.READINGS_BULK_CHUNK_SIZE
+    for start in range(0, len(accepted), chunk_size):
+        await insert_readings(db, accepted[start:start + chunk_size])
+    await db.commit()
+
+    errors.sort(key=lambda error: error.index)
+    return ReadingBulkResponse(
+        accepted=len(accepted),
+        rejected=len(errors),
+        errors=errors
+    )
+
+
+@router.get("/aggregate", response_model=ReadingAggregateResponse)
+async def get_reading_aggregates(
+    sensor_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: str = Query("5m", description="Bucket width, e.g. 30s, 5m, 1h, 1d"),
+    fn: str = Query("avg,min,max,count", description="Comma separated: avg, min, max, count, sum"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get readings of a sensor aggregated into time buckets.
+
+    Bucketing happens in the database, so the response size depends on the
+    time range and bucket width only, never on the raw sample rate. The range
+    defaults to the last 24 hours; ``end`` is exclusive.
+    """
+    try:
+        bucket_seconds = parse_bucket(bucket)
+        functions = parse_functions(fn)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Compare and query in naive UTC whether or not the bounds carry an offset
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    start = to_naive_utc(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
     
-    query = db.query(
-        SensorReading.sensor_id,
-        SensorReading.value,
-        SensorReading.timestamp,
-        func.max(SensorReading.timestamp).label('max_timestamp')
-    ).group_by(SensorReading.sensor_id)
+    if bucket_count(start, end, bucket_seconds) > settings.READINGS_AGGREGATE_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many buckets. Use a wider bucket or a shorter range "
+                   f"(maximum {settings.READINGS_AGGREGATE_MAX_BUCKETS} buckets)"
+        )
     
-    if sensor_ids:
-        query = query.filter(SensorReading.sensor_id.in_(sensor_ids))
+    if not await sensor_registry.get(db, sensor_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sensor not found"
+        )
     
-    # Get latest reading for each sensor
-    latest_readings = db.query(SensorReading).join(
-        query.subquery(),
-        (SensorReading.sensor_id == query.subquery().c.sensor_id) &
-        (SensorReading.timestamp == query.subquery().c.max_timestamp)
-    ).all()
+    series = await aggregate_readings(db, sensor_id, start, end, bucket_seconds, functions)
+    
+    return ReadingAggregateResponse(
+        sensor_id=sensor_id,
+        start=start,
+        end=end,
+        bucket=bucket,
+        bucket_seconds=bucket_seconds,
+        **series
+    )
+
+
+@router.get("/latest", response_model=List[ReadingResponse])
+async def get_latest_readings(
+    sensor_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get latest readings for specified sensors or all sensors.
+
+    Served from the ``sensor_latest`` table, which every ingest path keeps
+    up to date, so the cost depends on the number of sensors only.
+    """
+    latest = await get_latest(db, sensor_ids)
     
-    return [ReadingResponse.from_orm(reading) for reading in latest_readings]
+    return [
+        ReadingResponse(
+            id=row.reading_id,
+            sensor_id=row.sensor_id,
+            value=row.value,
+            timestamp=row.timestamp,
+            quality_score=row.quality_score,
+            is_valid=row.is_valid,
+            created_at=row.created_at
+        )
+        for row in latest
+    ]
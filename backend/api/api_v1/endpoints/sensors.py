@@ -4,59 +4,76 @@ Sensor endpoints
 
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.core.database import get_db
+from backend.core.pagination import CountMode, count_rows, fetch_page
+from backend.models.alert import Alert
+from backend.models.reading import SensorReading
+from backend.models.reading_rollup import ReadingRollup, RollupWatermark
 from backend.models.sensor import Sensor
-from backend.models.user import User
+from backend.models.sensor_latest import SensorLatestReading
+from backend.auth.principal_cache import UserPrincipal
 from backend.auth.dependencies import get_current_active_user, get_current_admin_user
 from backend.schemas.sensor import SensorCreate, SensorUpdate, SensorResponse, SensorListResponse
+from backend.services.monitoring_service import monitoring_service
+from backend.services.sensor_registry import sensor_registry
+from backend.services.sensor_spaces import assign_space
 
 router = APIRouter()
 
+# Sensor fields that place it in a building model
+POSITION_FIELDS = {"ifc_file_id", "x_coordinate", "y_coordinate", "z_coordinate", "ifc_space_id"}
+
 
 @router.get("/", response_model=SensorListResponse)
 async def get_sensors(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    count: Optional[CountMode] = None,
     sensor_type: Optional[str] = None,
     location_id: Optional[int] = None,
     is_active: Optional[bool] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
-    """Get list of sensors with optional filtering"""
-    query = db.query(Sensor)
+    """Get list of sensors with optional filtering, ordered by id"""
+    query = select(Sensor)
     
     # Apply filters
     if sensor_type:
-        query = query.filter(Sensor.sensor_type == sensor_type)
+        query = query.where(Sensor.sensor_type == sensor_type)
     if location_id:
-        query = query.filter(Sensor.location_id == location_id)
+        query = query.where(Sensor.location_id == location_id)
     if is_active is not None:
-        query = query.filter(Sensor.is_active == is_active)
+        query = query.where(Sensor.is_active == is_active)
     
     # Get total count
-    total = query.count()
+    count = count or (CountMode.NONE if cursor else CountMode.EXACT)
+    total, total_is_estimate = await count_rows(db, query, count)
     
     # Apply pagination
-    sensors = query.offset(skip).limit(limit).all()
+    sensors, next_cursor = await fetch_page(db, query, [Sensor.id], limit, skip=skip, cursor=cursor)
     
     return SensorListResponse(
         sensors=[SensorResponse.from_orm(sensor) for sensor in sensors],
         total=total,
-        page=skip // limit + 1,
-        size=limit
+        total_is_estimate=total_is_estimate,
+        page=None if cursor else skip // limit + 1,
+        size=limit,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/{sensor_id}", response_model=SensorResponse)
 async def get_sensor(
     sensor_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Get sensor by ID"""
-    sensor = db.query(Sensor).filter(Sensor.id == sensor_id).first()
+    sensor = await db.get(Sensor, sensor_id)
     if not sensor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -68,12 +85,12 @@ async def get_sensor(
 @router.post("/", response_model=SensorResponse)
 async def create_sensor(
     sensor_data: SensorCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Create new sensor"""
     # Check if device_id already exists
-    if db.query(Sensor).filter(Sensor.device_id == sensor_data.device_id).first():
+    if await db.scalar(select(Sensor.id).where(Sensor.device_id == sensor_data.device_id)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Device ID already exists"
@@ -81,16 +98,24 @@ async def create_sensor(
     
     # Check if serial_number already exists
     if sensor_data.serial_number:
-        if db.query(Sensor).filter(Sensor.serial_number == sensor_data.serial_number).first():
+        if await db.scalar(select(Sensor.id).where(Sensor.serial_number == sensor_data.serial_number)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Serial number already exists"
             )
     
     db_sensor = Sensor(**sensor_data.dict())
+    if not await assign_space(db, db_sensor, space_given=sensor_data.ifc_space_id is not None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="IFC file or space not found"
+        )
     db.add(db_sensor)
-    db.commit()
-    db.refresh(db_sensor)
+    await db.commit()
+    await db.refresh(db_sensor)
+    
+    sensor_registry.put(db_sensor)
+    monitoring_service.schedule_sensor(db_sensor)
     
     return db_sensor
 
@@ -99,11 +124,11 @@ async def create_sensor(
 async def update_sensor(
     sensor_id: int,
     sensor_data: SensorUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Update sensor"""
-    sensor = db.query(Sensor).filter(Sensor.id == sensor_id).first()
+    sensor = await db.get(Sensor, sensor_id)
     if not sensor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -115,8 +140,19 @@ async def update_sensor(
     for field, value in update_data.items():
         setattr(sensor, field, value)
     
-    db.commit()
-    db.refresh(sensor)
+    # Place the sensor again when its position changed
+    if POSITION_FIELDS & update_data.keys():
+        if not await assign_space(db, sensor, space_given="ifc_space_id" in update_data):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="IFC file or space not found"
+            )
+    
+    await db.commit()
+    await db.refresh(sensor)
+    
+    sensor_registry.put(sensor)
+    monitoring_service.schedule_sensor(sensor)
     
     return sensor
 
@@ -124,18 +160,26 @@ async def update_sensor(
 @router.delete("/{sensor_id}")
 async def delete_sensor(
     sensor_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user)
 ):
     """Delete sensor"""
-    sensor = db.query(Sensor).filter(Sensor.id == sensor_id).first()
+    sensor = await db.get(Sensor, sensor_id)
     if not sensor:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sensor not found"
         )
     
-    db.delete(sensor)
-    db.commit()
+    # Bulk delete dependent rows instead of loading them through the ORM cascade
+    for model in (SensorReading, SensorLatestReading, Alert, ReadingRollup, RollupWatermark):
+        await db.execute(
+            delete(model).where(model.sensor_id == sensor_id).execution_options(synchronize_session=False)
+        )
+    await db.execute(delete(Sensor).where(Sensor.id == sensor_id))
+    await db.commit()
+    
+    sensor_registry.remove(sensor_id)
+    monitoring_service.unschedule_sensor(sensor_id)
     
     return {"message": "Sensor deleted successfully"}
@@ -4,20 +4,26 @@ Authentication dependencies for FastAPI
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.core.database import get_db
 from backend.models.user import User
+from backend.auth.principal_cache import PRINCIPAL_COLUMNS, UserPrincipal, principal_cache
 from backend.auth.security import verify_token
 
 # Security scheme
 security = HTTPBearer()
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
+    db: AsyncSession = Depends(get_db)
+) -> UserPrincipal:
+    """Get current authenticated user.
+
+    Returns a cached principal (see ``principal_cache``) rather than a User
+    row, so most authenticated requests need no user query.
+    """
     token = credentials.credentials
     payload = verify_token(token)
     
@@ -29,18 +35,24 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+    
+    row = (await db.execute(select(*PRINCIPAL_COLUMNS).where(User.username == username))).first()
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    user = UserPrincipal(*row)
+    principal_cache.put(user)
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(
@@ -50,7 +62,7 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 
-def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+def get_current_admin_user(current_user: UserPrincipal = Depends(get_current_active_user)) -> UserPrincipal:
     """Get current admin user"""
     if current_user.role.value != "ADMIN" and not current_user.is_superuser:
         raise HTTPException(
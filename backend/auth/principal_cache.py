@@ -0,0 +1,104 @@
+"""
+TTL + LRU cache of authenticated user principals
+"""
+
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from sqlalchemy import event, inspect
+from backend.core.config import settings
+from backend.models.user import User, UserRole
+
+
+class UserPrincipal(NamedTuple):
+    """The user fields needed to authorize a request and answer /auth/me"""
+    id: int
+    username: str
+    email: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+    is_superuser: bool
+
+
+PRINCIPAL_COLUMNS = [getattr(User, field) for field in UserPrincipal._fields]
+
+
+class PrincipalCache:
+    """Principals keyed by username, evicted after ``ttl`` seconds or LRU beyond ``max_size``.
+
+    Entries are dropped as soon as a User row is deleted, or updated in one
+    of the principal's fields, through the ORM in this process; updates of
+    other columns (``last_login`` on every login) keep the entry. Changes
+    made elsewhere become visible after at most ``USER_CACHE_TTL`` seconds.
+    A TTL of 0 disables caching.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None, clock=time.monotonic):
+        self._ttl = ttl
+        self._max_size = max_size
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[UserPrincipal, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self) -> float:
+        return settings.USER_CACHE_TTL if self._ttl is None else self._ttl
+
+    @property
+    def max_size(self) -> int:
+        return settings.USER_CACHE_SIZE if self._max_size is None else self._max_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, username: str) -> Optional[UserPrincipal]:
+        """Return the cached principal for ``username`` if it has not expired"""
+        entry = self._entries.get(username)
+        if entry is None or entry[1] <= self.clock():
+            if entry is not None:
+                del self._entries[username]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, principal: UserPrincipal):
+        """Cache a principal loaded from the database"""
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[principal.username] = (principal, self.clock() + self.ttl)
+        self._entries.move_to_end(principal.username)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        """Forget one user"""
+        self._entries.pop(username, None)
+
+    def clear(self):
+        """Forget every user"""
+        self._entries.clear()
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_updated_user(mapper, connection, target: User):
+    """Drop a user whose principal fields changed, under its old username as well"""
+    attrs = inspect(target).attrs
+    if not any(attrs[field].history.has_changes() for field in UserPrincipal._fields):
+        return
+    principal_cache.invalidate(target.username)
+    for username in attrs.username.history.deleted or ():
+        principal_cache.invalidate(username)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User):
+    """Drop a deleted user"""
+    principal_cache.invalidate(target.username)
@@ -2,6 +2,10 @@
 Security utilities for authentication and authorization
 """
 
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
@@ -23,6 +27,97 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is full"""
+    pass
+
+
+class PasswordHasher:
+    """Run bcrypt hashing and verification off the event loop.
+
+    Work goes to a thread pool of ``PASSWORD_HASH_WORKERS`` threads (bcrypt
+    releases the GIL while hashing). At most ``PASSWORD_HASH_MAX_QUEUE``
+    calls wait for a free worker; beyond that ``PasswordHasherBusy`` is
+    raised so a login burst is shed instead of piling up. With 0 workers
+    calls run inline, as before.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._waits = deque(maxlen=1000)
+        self.completed = 0
+        self.rejected = 0
+        self.max_queued = 0
+
+    @property
+    def queued(self) -> int:
+        """Calls waiting for a worker"""
+        return max(0, self._pending - settings.PASSWORD_HASH_WORKERS)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash in the worker pool"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the worker pool"""
+        return await self._run(get_password_hash, password)
+
+    async def _run(self, func, *args):
+        workers = settings.PASSWORD_HASH_WORKERS
+        if workers <= 0:
+            return func(*args)
+        if self._pending >= workers + settings.PASSWORD_HASH_MAX_QUEUE:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+        submitted = time.perf_counter()
+
+        def call():
+            # Time spent queued for a worker
+            self._waits.append(time.perf_counter() - submitted)
+            return func(*args)
+
+        self._pending += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        """Queueing metrics for monitoring"""
+        waits = sorted(self._waits) or [0.0]
+
+        def wait_ms(pct):
+            return round(waits[min(len(waits) - 1, int(pct / 100.0 * len(waits)))] * 1000.0, 3)
+
+        return {
+            'workers': settings.PASSWORD_HASH_WORKERS,
+            'in_flight': self._pending,
+            'queued': self.queued,
+            'max_queued': self.max_queued,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'queue_wait_p50_ms': wait_ms(50),
+            'queue_wait_p95_ms': wait_ms(95),
+            'queue_wait_max_ms': round(waits[-1] * 1000.0, 3)
+        }
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -3,7 +3,7 @@ Application configuration settings
 """
 
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 
 
@@ -12,22 +12,64 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./ifc_monitoring.db"
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    USER_CACHE_TTL: int = 60  # seconds an authenticated user is cached; 0 disables the cache
+    USER_CACHE_SIZE: int = 1024  # users kept in the principal cache
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt worker threads; 0 hashes on the event loop
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # hash calls allowed to wait before login returns 503
     
     # API
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "IFC Monitoring System"
+    PAGINATION_COUNT_LIMIT: int = 10000  # rows counted when count=estimate
     
     # Sensor Configuration
-    SENSOR_UPDATE_INTERVAL: int = 60  # seconds
+    SENSOR_UPDATE_INTERVAL: int = 60  # seconds, default for sensors without update_interval
+    SENSOR_SCHEDULE_RESOLUTION: float = 1.0  # seconds, sensors due this close are polled together
+    SENSOR_ACQUISITION_CONCURRENCY: int = 100  # concurrent device reads per tick
+    SENSOR_READ_TIMEOUT: float = 5.0  # seconds allowed for a single device read
+    SENSOR_PERSIST_BATCH_SIZE: int = 1000  # readings written per bulk insert
+    SENSOR_REGISTRY_TTL: int = 300  # seconds before cached sensor metadata is reloaded
     ALERT_THRESHOLD_TEMPERATURE: float = 80.0  # celsius
     ALERT_THRESHOLD_HUMIDITY: float = 90.0  # percentage
     ALERT_THRESHOLD_PRESSURE: float = 1013.25  # hPa
     
+    # Sensor drivers (sensors with manufacturer "modbus" use the gateway when configured)
+    MODBUS_GATEWAY_HOST: Optional[str] = None
+    MODBUS_GATEWAY_PORT: int = 502
+    MODBUS_REGISTER_SCALE: float = 0.1  # engineering units per register count
+    
+    # Reading ingestion
+    READINGS_BULK_MAX_ROWS: int = 100000  # rows accepted per bulk request
+    READINGS_BULK_CHUNK_SIZE: int = 1000  # rows per multi-row INSERT
+    READINGS_AGGREGATE_MAX_BUCKETS: int = 10000  # buckets returned per aggregate request
+    ROLLUP_INTERVAL: int = 60  # seconds between rollup passes; 0 disables rollups
+    ROLLUP_BATCH_SIZE: int = 50000  # reading ids aggregated per rollup pass
+    
+    # Data retention (None keeps data forever; raw readings are only deleted once rolled up)
+    READING_RETENTION_DAYS: Optional[int] = None  # raw readings of sensor types not listed below
+    READING_RETENTION_DAYS_BY_TYPE: Dict[str, int] = {}  # e.g. {"temperature": 90}
+    RESOLVED_ALERT_RETENTION_DAYS: Optional[int] = None
+    RETENTION_INTERVAL: int = 3600  # seconds between retention passes
+    RETENTION_DELETE_CHUNK_SIZE: int = 5000  # rows deleted per statement
+    
+    # IFC processing
+    IFC_WORKER_PROCESSES: int = 2  # processes parsing IFC files; 0 leaves jobs queued
+    IFC_JOB_POLL_INTERVAL: float = 5.0  # seconds between queue polls when idle
+    IFC_JOB_TIMEOUT: int = 1800  # seconds without a heartbeat before a job of a dead worker is retried
+    IFC_JOB_HEARTBEAT_INTERVAL: float = 30.0  # seconds between heartbeats of a running job
+    IFC_JOB_MAX_ATTEMPTS: int = 3  # attempts before a job that keeps timing out is failed
+    IFC_PARSE_WORKERS: int = 4  # processes tokenizing one large IFC file (32 MB+); 1 scans in the job's process
+    IFC_SPACE_INDEX_CACHE_SIZE: int = 16  # IFC files whose spatial index is kept in memory
+    IFC_HEATMAP_TTL: float = 2.0  # seconds a heatmap is served from memory; 0 disables the cache
+    IFC_HEATMAP_CACHE_SIZE: int = 256  # (file, sensor type) heatmaps kept in memory
+    SENSOR_SPACE_TOLERANCE: float = 0.5  # meters a sensor may lie outside the space it is assigned to
+    
     # Email Configuration
     SMTP_SERVER: Optional[str] = None
     SMTP_PORT: int = 587
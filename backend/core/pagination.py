@@ -0,0 +1,103 @@
+"""
+Keyset (cursor) pagination helpers for list endpoints
+"""
+
+import base64
+import binascii
+import enum
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select, func
+from backend.core.config import settings
+
+
+class CountMode(str, enum.Enum):
+    """How list endpoints compute ``total``"""
+    EXACT = "exact"        # full COUNT(*) of the filtered result
+    ESTIMATE = "estimate"  # COUNT(*) capped at PAGINATION_COUNT_LIMIT rows
+    NONE = "none"          # no count; total is null
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row of a page into an opaque token"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """Decode a cursor token back into sort key values of the given types"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("cursor has the wrong shape")
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        )
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: bool = False):
+    """Filter for rows strictly after ``values`` in ``columns`` sort order.
+
+    Expanded as ``a > va OR (a = va AND b > vb)`` rather than a row-value
+    comparison so every backend can drive it from a composite index.
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        after = column < value if descending else column > value
+        equal_prefix = [prefix == prefix_value for prefix, prefix_value in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses)
+
+
+async def count_rows(db: AsyncSession, query: Select, mode: CountMode) -> Tuple[Optional[int], bool]:
+    """Count the rows of ``query``; returns ``(total, is_estimate)``"""
+    if mode == CountMode.NONE:
+        return None, False
+    if mode == CountMode.ESTIMATE:
+        cap = settings.PAGINATION_COUNT_LIMIT
+        total = await db.scalar(select(func.count()).select_from(query.limit(cap + 1).subquery()))
+        return (cap, True) if total > cap else (total, False)
+    return await db.scalar(select(func.count()).select_from(query.subquery())), False
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query: Select,
+    order_columns: Sequence[Any],
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    descending: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page ordered by ``order_columns`` (the last one must be unique).
+
+    With a cursor the page starts right after the encoded key (``skip`` is
+    ignored); otherwise ``skip`` is applied as an offset. Returns the rows
+    and the cursor for the next page, or None on the last page.
+    """
+    if cursor is not None:
+        values = decode_cursor(cursor, [column.type.python_type for column in order_columns])
+        query = query.where(keyset_after(order_columns, values, descending))
+    elif skip:
+        query = query.offset(skip)
+
+    ordering = [column.desc() if descending else column.asc() for column in order_columns]
+    rows = (await db.scalars(query.order_by(*ordering).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*(getattr(rows[-1], column.key) for column in order_columns))
+    return rows, next_cursor
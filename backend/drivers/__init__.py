@@ -0,0 +1 @@
+# Sensor drivers package initialization
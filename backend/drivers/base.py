@@ -0,0 +1,35 @@
+"""
+Base class for sensor drivers
+"""
+
+from typing import Any, Dict, List
+
+
+class SensorDriver:
+    """Interface for reading values from sensor devices.
+
+    Drivers receive sensor rows (anything exposing ``id``, ``device_id``,
+    ``sensor_type``, ``manufacturer``, ``min_value`` and ``max_value``) and
+    read them in batches so gateways that answer multi-point queries are
+    hit once per batch instead of once per sensor. Drivers are long-lived
+    and should keep their connections open between batches.
+    """
+
+    name = "base"
+    max_batch_size = 100
+    # Drivers that bound each of their own device requests set this, so a
+    # batch spanning several requests is not cut short by SENSOR_READ_TIMEOUT
+    enforces_timeout = False
+
+    async def read_batch(self, sensors: List[Any]) -> Dict[int, Dict[str, Any]]:
+        """Read many sensors in one call.
+
+        Returns a mapping of sensor id to reading data with ``value``,
+        ``timestamp`` and optionally ``quality_score`` and ``is_valid``.
+        Sensors that could not be read are left out of the mapping.
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Release any open connections"""
+        pass
@@ -0,0 +1,170 @@
+"""
+Modbus TCP driver
+"""
+
+import asyncio
+import itertools
+import logging
+import struct
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from backend.drivers.base import SensorDriver
+
+logger = logging.getLogger(__name__)
+
+READ_HOLDING_REGISTERS = 0x03
+MAX_REGISTERS_PER_REQUEST = 125  # Modbus limit for function 0x03
+MBAP_HEADER = struct.Struct(">HHHB")  # transaction id, protocol id, length, unit id
+
+
+class ModbusError(Exception):
+    """Raised when a Modbus device answers with an exception or a bad frame"""
+    pass
+
+
+class ModbusConnectionError(ModbusError):
+    """Raised when the gateway cannot be reached or does not answer in time"""
+    pass
+
+
+def parse_device_id(device_id: str) -> Optional[Tuple[int, int]]:
+    """Parse a ``"<unit>:<register>"`` device id into (unit, register)"""
+    try:
+        unit, register = device_id.split(":", 1)
+        return int(unit), int(register)
+    except (AttributeError, ValueError):
+        return None
+
+
+class ModbusTCPDriver(SensorDriver):
+    """Driver for sensors exposed as holding registers behind a Modbus TCP gateway.
+
+    The sensor's ``device_id`` is ``"<unit>:<register>"``. Each register
+    holds a signed 16-bit value multiplied by ``scale``. A batch is grouped
+    by unit and contiguous register spans, so neighbouring sensors are read
+    with a single request. One connection is kept open and reused; requests
+    on it are serialized, and each is bounded by ``timeout``. Once the
+    gateway fails to answer, the rest of the batch is abandoned with
+    ``asyncio.TimeoutError`` instead of every remaining request waiting out
+    its own timeout.
+    """
+
+    name = "modbus"
+    max_batch_size = 1000
+    enforces_timeout = True
+
+    def __init__(self, host: str, port: int = 502, scale: float = 0.1, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.scale = scale
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+        self._transaction_ids = itertools.cycle(range(1, 0x10000))
+
+    async def read_batch(self, sensors: List[Any]) -> Dict[int, Dict[str, Any]]:
+        """Read all sensors of the batch with as few register requests as possible"""
+        by_unit = defaultdict(list)
+        for sensor in sensors:
+            address = parse_device_id(sensor.device_id)
+            if address is None:
+                logger.warning(f"Invalid Modbus device id for sensor {sensor.id}: {sensor.device_id}")
+                continue
+            by_unit[address[0]].append((address[1], sensor))
+
+        readings = {}
+        timestamp = datetime.utcnow()
+        for unit, points in by_unit.items():
+            points.sort(key=lambda point: point[0])
+            for start, count, span in self._plan_requests(points):
+                try:
+                    registers = await self.read_holding_registers(unit, start, count)
+                except ModbusConnectionError as e:
+                    raise asyncio.TimeoutError(
+                        f"Modbus gateway {self.host}:{self.port} unavailable at unit {unit}: {e}"
+                    ) from e
+                except ModbusError as e:
+                    logger.warning(f"Modbus read failed for unit {unit} registers {start}-{start + count - 1}: {e}")
+                    continue
+                for register, sensor in span:
+                    raw = registers[register - start]
+                    value = (raw - 0x10000 if raw & 0x8000 else raw) * self.scale
+                    readings[sensor.id] = {
+                        'value': round(value, 4),
+                        'timestamp': timestamp,
+                        'quality_score': 1.0,
+                        'is_valid': 1
+                    }
+        return readings
+
+    def _plan_requests(self, points: List[Tuple[int, Any]]):
+        """Split sorted (register, sensor) points into spans readable in one request"""
+        span = []
+        for register, sensor in points:
+            if span and register - span[0][0] >= MAX_REGISTERS_PER_REQUEST:
+                yield span[0][0], span[-1][0] - span[0][0] + 1, span
+                span = []
+            span.append((register, sensor))
+        if span:
+            yield span[0][0], span[-1][0] - span[0][0] + 1, span
+
+    async def read_holding_registers(self, unit: int, start: int, count: int) -> List[int]:
+        """Read ``count`` holding registers starting at ``start`` from ``unit``"""
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._request(unit, start, count), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                # Drop the connection so the next request reconnects
+                await self._disconnect()
+                raise ModbusConnectionError(str(e) or e.__class__.__name__)
+            except ModbusError:
+                # Exception responses leave the connection in a clean state;
+                # a bad frame already dropped it
+                raise
+            except BaseException:
+                # Cancelled mid-request: a response may still be in flight and would
+                # be read as the answer to the next request, so drop the connection
+                self._abort()
+                raise
+
+    async def _request(self, unit: int, start: int, count: int) -> List[int]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        transaction_id = next(self._transaction_ids)
+        pdu = struct.pack(">BHH", READ_HOLDING_REGISTERS, start, count)
+        self._writer.write(MBAP_HEADER.pack(transaction_id, 0, len(pdu) + 1, unit) + pdu)
+        await self._writer.drain()
+
+        header = await self._reader.readexactly(MBAP_HEADER.size)
+        response_id, _, length, _ = MBAP_HEADER.unpack(header)
+        body = await self._reader.readexactly(length - 1)
+        if response_id != transaction_id:
+            await self._disconnect()
+            raise ModbusError(f"Unexpected transaction id {response_id}")
+        if body[0] & 0x80:
+            raise ModbusError(f"Exception code {body[1]}")
+        if body[1] != count * 2:
+            raise ModbusError(f"Expected {count * 2} data bytes, got {body[1]}")
+        return list(struct.unpack(f">{count}H", body[2:2 + count * 2]))
+
+    def _abort(self) -> Optional[asyncio.StreamWriter]:
+        """Forget the connection and start closing it"""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+        return writer
+
+    async def _disconnect(self):
+        writer = self._abort()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def close(self):
+        """Close the gateway connection"""
+        await self._disconnect()
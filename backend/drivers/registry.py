@@ -0,0 +1,74 @@
+"""
+Registry mapping sensors to the driver that reads them
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from backend.core.config import settings
+from backend.drivers.base import SensorDriver
+from backend.drivers.modbus import ModbusTCPDriver
+from backend.drivers.simulator import SimulatorDriver
+
+
+def _key(value: Optional[str]) -> Optional[str]:
+    return value.strip().lower() if value else None
+
+
+class DriverRegistry:
+    """Resolve a sensor to a driver by manufacturer and/or sensor type.
+
+    Lookup order: (manufacturer, sensor_type), manufacturer, sensor_type,
+    then the default driver.
+    """
+
+    def __init__(self, default: SensorDriver):
+        self.default = default
+        self._drivers: Dict[Tuple[Optional[str], Optional[str]], SensorDriver] = {}
+
+    def register(self, driver: SensorDriver, sensor_type: Optional[str] = None,
+                 manufacturer: Optional[str] = None):
+        """Register ``driver`` for a sensor type, a manufacturer or both"""
+        if sensor_type is None and manufacturer is None:
+            raise ValueError("A driver must be registered for a sensor_type and/or a manufacturer")
+        self._drivers[(_key(manufacturer), _key(sensor_type))] = driver
+
+    def unregister(self, sensor_type: Optional[str] = None, manufacturer: Optional[str] = None):
+        """Remove a registration"""
+        self._drivers.pop((_key(manufacturer), _key(sensor_type)), None)
+
+    def resolve(self, sensor: Any) -> SensorDriver:
+        """Return the driver responsible for ``sensor``"""
+        manufacturer = _key(sensor.manufacturer)
+        sensor_type = _key(sensor.sensor_type)
+        for key in ((manufacturer, sensor_type), (manufacturer, None), (None, sensor_type)):
+            driver = self._drivers.get(key)
+            if driver is not None:
+                return driver
+        return self.default
+
+    def group(self, sensors: List[Any]) -> Dict[SensorDriver, List[Any]]:
+        """Group sensors by the driver that reads them"""
+        groups = defaultdict(list)
+        for sensor in sensors:
+            groups[self.resolve(sensor)].append(sensor)
+        return groups
+
+    async def close(self):
+        """Close every registered driver"""
+        for driver in {self.default, *self._drivers.values()}:
+            await driver.close()
+
+
+# Global driver registry; the simulator reads every sensor without a specific driver
+driver_registry = DriverRegistry(default=SimulatorDriver())
+
+if settings.MODBUS_GATEWAY_HOST:
+    driver_registry.register(
+        ModbusTCPDriver(
+            settings.MODBUS_GATEWAY_HOST,
+            settings.MODBUS_GATEWAY_PORT,
+            scale=settings.MODBUS_REGISTER_SCALE,
+            timeout=settings.SENSOR_READ_TIMEOUT
+        ),
+        manufacturer="modbus"
+    )
@@ -0,0 +1,49 @@
+"""
+Simulator driver producing random readings
+"""
+
+import random
+from datetime import datetime
+from typing import Any, Dict, List
+from backend.drivers.base import SensorDriver
+
+# (base value, variation) per sensor type
+SIMULATED_RANGES = {
+    "temperature": (25.0, 10.0),
+    "humidity": (60.0, 20.0),
+    "pressure": (1013.25, 50.0),
+}
+DEFAULT_RANGE = (50.0, 20.0)
+
+
+class SimulatorDriver(SensorDriver):
+    """Reference driver that generates random values around a per-type base"""
+
+    name = "simulator"
+
+    def __init__(self, max_batch_size: int = 1000):
+        self.max_batch_size = max_batch_size
+
+    async def read_batch(self, sensors: List[Any]) -> Dict[int, Dict[str, Any]]:
+        """Simulate a reading for every sensor in the batch"""
+        timestamp = datetime.utcnow()
+        return {sensor.id: self._simulate(sensor, timestamp) for sensor in sensors}
+
+    def _simulate(self, sensor: Any, timestamp: datetime) -> Dict[str, Any]:
+        base_value, variation = SIMULATED_RANGES.get(sensor.sensor_type, DEFAULT_RANGE)
+        
+        # Add some randomness
+        value = base_value + random.uniform(-variation, variation)
+        
+        # Ensure value is within sensor limits
+        if sensor.min_value is not None:
+            value = max(value, sensor.min_value)
+        if sensor.max_value is not None:
+            value = min(value, sensor.max_value)
+        
+        return {
+            'value': round(value, 2),
+            'timestamp': timestamp,
+            'quality_score': random.uniform(0.8, 1.0),
+            'is_valid': 1 if random.random() > 0.05 else 0  # 5% chance of invalid reading
+        }
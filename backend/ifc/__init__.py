@@ -0,0 +1 @@
+# IFC (ISO-10303-21 / STEP) file reading package
@@ -0,0 +1,98 @@
+"""
+Content fingerprints of IFC entities, independent of instance numbering
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple, Union
+from backend.ifc.step import StepFile
+
+# Entity types whose content is left out of fingerprints: exporters rewrite
+# them on every save (timestamps, applications) without changing the model
+IGNORED_TYPES = frozenset({"IFCOWNERHISTORY"})
+
+# Instance references in statement text. One inside a string is treated as a
+# reference too, which can only make a fingerprint more sensitive.
+_REF = re.compile(rb"#(\d+)")
+
+DIGEST_SIZE = 16
+
+# Stand-ins for references to missing entities and back into a cycle
+_UNKNOWN = b"#?"
+_CYCLE = b"#cycle"
+
+
+class Fingerprinter:
+    """Digests of entities together with everything they reference.
+
+    An entity's digest covers its type and attribute text with each
+    ``#id`` replaced by the digest of the referenced entity, so it does not
+    depend on how instances are numbered and changes whenever anything the
+    entity transitively references changes. Digests are memoized, so
+    fingerprinting many entities that share placements, contexts or
+    directions hashes each shared entity once.
+    """
+
+    def __init__(self, step: StepFile):
+        self.step = step
+        self._digests: Dict[int, bytes] = {}
+
+    def digest(self, entity_id: int) -> bytes:
+        digest = self._digests.get(entity_id)
+        if digest is not None:
+            return digest
+        # Iterative post-order walk: reference chains can be long
+        pending: Dict[int, Tuple[List[bytes], List[int]]] = {}
+        stack = [entity_id]
+        while stack:
+            current = stack[-1]
+            if current in self._digests:
+                stack.pop()
+                continue
+            entry = pending.get(current)
+            if entry is None:
+                entry = self._split(current)
+                if entry is None:  # no such entity
+                    self._digests[current] = _UNKNOWN
+                    stack.pop()
+                    continue
+                pending[current] = entry
+                missing = [ref for ref in entry[1] if ref not in self._digests and ref not in pending]
+                if missing:
+                    stack.extend(missing)
+                    continue
+            stack.pop()
+            self._digests[current] = self._hash(*entry)
+        return self._digests[entity_id]
+
+    def of(self, *parts: Union[int, str, None]) -> str:
+        """Hex fingerprint of several entities (ids) and labels (str); None counts as a part too"""
+        combined = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        for part in parts:
+            if part is None:
+                combined.update(b"\0none")
+            elif isinstance(part, str):
+                combined.update(b"\0str" + part.encode("utf-8"))
+            else:
+                combined.update(b"\0ref" + self.digest(part))
+        return combined.hexdigest()
+
+    def _split(self, entity_id: int) -> Optional[Tuple[List[bytes], List[int]]]:
+        """Statement text around the references, and the referenced ids; None if there is no such entity"""
+        try:
+            entity_type, offset, length = self.step.index[entity_id]
+        except KeyError:
+            return None
+        if entity_type in IGNORED_TYPES:
+            return [entity_type.encode("ascii")], []
+        # The statement starts with its own "#id", which is left out: numbering is not content
+        pieces = _REF.split(self.step.buffer[offset:offset + length])
+        return pieces[2::2], [int(ref) for ref in pieces[3::2]]
+
+    def _hash(self, texts: List[bytes], refs: List[int]) -> bytes:
+        digest = hashlib.blake2b(texts[0], digest_size=DIGEST_SIZE)
+        for ref, text in zip(refs, texts[1:]):
+            # A reference back into a cycle hashes as a placeholder
+            digest.update(self._digests.get(ref, _CYCLE))
+            digest.update(text)
+        return digest.digest()
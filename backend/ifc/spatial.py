@@ -0,0 +1,563 @@
+"""
+Spatial structure, placements, geometry and quantities of IFC models
+
+Resolves, on top of a StepFile:
+
+- the spatial hierarchy (IfcRelAggregates, IfcRelContainedInSpatialStructure),
+  to find the building storey of a space;
+- IfcLocalPlacement chains, composed into world transforms;
+- IfcElementQuantity sets attached with IfcRelDefinesByProperties;
+- world-space bounding boxes of swept-solid and bounding-box body geometry.
+
+Placements, storeys and axis placements are memoized, so each entity of a
+chain is decoded and composed once however many products share it and
+resolving every space stays linear in the size of the model. All lengths
+are converted to metres using the project's units.
+"""
+
+import logging
+import math
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from backend.ifc.step import Ref, StepFile, TypedValue
+
+logger = logging.getLogger(__name__)
+
+# SI unit prefixes (IfcSIPrefix)
+SI_PREFIXES = {
+    "EXA": 1e18, "PETA": 1e15, "TERA": 1e12, "GIGA": 1e9, "MEGA": 1e6,
+    "KILO": 1e3, "HECTO": 1e2, "DECA": 1e1, "DECI": 1e-1, "CENTI": 1e-2,
+    "MILLI": 1e-3, "MICRO": 1e-6, "NANO": 1e-9, "PICO": 1e-12,
+    "FEMTO": 1e-15, "ATTO": 1e-18,
+}
+
+# Power of the base unit for the unit types used here
+_UNIT_POWERS = {"LENGTHUNIT": 1, "AREAUNIT": 2, "VOLUMEUNIT": 3}
+
+# Quantity entity -> (kind, project unit type)
+_QUANTITY_KINDS = {
+    "IFCQUANTITYLENGTH": ("length", "LENGTHUNIT"),
+    "IFCQUANTITYAREA": ("area", "AREAUNIT"),
+    "IFCQUANTITYVOLUME": ("volume", "VOLUMEUNIT"),
+}
+
+# Preferred quantity names (Qto_SpaceBaseQuantities, then IFC2x3 conventions)
+AREA_QUANTITIES = ("NetFloorArea", "GrossFloorArea", "NetArea", "GrossArea")
+VOLUME_QUANTITIES = ("NetVolume", "GrossVolume")
+HEIGHT_QUANTITIES = ("Height", "FinishCeilingHeight", "NetHeight", "GrossHeight")
+
+# Spatial structure element that gives a space its level
+STOREY = "IFCBUILDINGSTOREY"
+
+# Relating property definition of an IfcRelDefinesByProperties: its last attribute
+_LAST_REF = re.compile(rb"#(\d+)\s*\)\s*;\s*$")
+
+_IDENTITY = np.eye(4)
+
+
+class BoundingBox(NamedTuple):
+    """Axis-aligned box in world coordinates (metres)"""
+    min_x: float
+    min_y: float
+    min_z: float
+    max_x: float
+    max_y: float
+    max_z: float
+
+    @classmethod
+    def of_points(cls, points: np.ndarray) -> "BoundingBox":
+        low, high = points.min(axis=0), points.max(axis=0)
+        return cls(*(float(value) for value in low), *(float(value) for value in high))
+
+    @property
+    def center(self) -> Tuple[float, float, float]:
+        return (
+            (self.min_x + self.max_x) / 2,
+            (self.min_y + self.max_y) / 2,
+            (self.min_z + self.max_z) / 2,
+        )
+
+
+class Solid(NamedTuple):
+    """Body geometry of a product: world-space corner points plus swept-solid measures"""
+    points: np.ndarray
+    area: Optional[float]
+    depth: Optional[float]
+
+
+class SpatialModel:
+    """Placement, hierarchy and quantity resolution over a StepFile"""
+
+    def __init__(self, step: StepFile):
+        self.step = step
+        self._transforms: Dict[int, np.ndarray] = {}
+        self._axes: Dict[int, np.ndarray] = {}
+        self._directions: Dict[int, np.ndarray] = {}
+        self._storeys: Dict[int, Optional[int]] = {}
+        self._storey_info: Dict[int, Tuple[Optional[str], Optional[float]]] = {}
+        self._parents: Optional[Dict[int, int]] = None
+        self._containers: Optional[Dict[int, int]] = None
+        self._quantity_sets: Optional[Dict[int, List[int]]] = None
+        self._set_values: Dict[int, Dict[str, Dict[str, float]]] = {}
+        self.units = self._project_units()
+        self.length_scale = self.units.get("LENGTHUNIT", 1.0)
+
+    # Units
+
+    def _project_units(self) -> Dict[str, float]:
+        """Unit type -> factor to SI, from the IfcProject's unit assignment"""
+        units: Dict[str, float] = {}
+        project_ids = self.step.ids_of_type("IFCPROJECT")
+        if not project_ids:
+            return units
+        assignment = _arg(self.step.entity(project_ids[0]).args, 8)
+        if not isinstance(assignment, Ref):
+            return units
+        for unit in _arg(self.step.entity(assignment).args, 0) or []:
+            if not isinstance(unit, Ref):
+                continue
+            unit_type = _arg(self.step.entity(unit).args, 1)
+            if unit_type in _UNIT_POWERS:
+                factor = self._unit_factor(unit)
+                if factor:
+                    units[str(unit_type)] = factor
+        return units
+
+    def _unit_factor(self, unit_id: int, depth: int = 0) -> Optional[float]:
+        """Factor converting a value in this unit to the SI base unit"""
+        if depth > 8:
+            return None
+        unit = self.step.entity(unit_id)
+        args = unit.args
+        if unit.type == "IFCSIUNIT":
+            # Dimensions, UnitType, Prefix, Name
+            power = _UNIT_POWERS.get(_arg(args, 1), 1)
+            prefix = _arg(args, 2)
+            return SI_PREFIXES.get(prefix, 1.0) ** power if prefix else 1.0
+        if unit.type == "IFCCONVERSIONBASEDUNIT":
+            # Dimensions, UnitType, Name, ConversionFactor (IfcMeasureWithUnit)
+            measure = _arg(args, 3)
+            if not isinstance(measure, Ref):
+                return None
+            value, base = (self.step.entity(measure).args + [None, None])[:2]
+            if isinstance(value, TypedValue):
+                value = value.value
+            base_factor = self._unit_factor(base, depth + 1) if isinstance(base, Ref) else 1.0
+            if isinstance(value, (int, float)) and base_factor:
+                return float(value) * base_factor
+        return None
+
+    # Placements
+
+    def _point(self, point_id: int) -> np.ndarray:
+        """IfcCartesianPoint as a 3D vector in metres"""
+        coordinates = _arg(self.step.entity(point_id).args, 0) or []
+        vector = np.zeros(3)
+        vector[:min(len(coordinates), 3)] = [float(value) for value in coordinates[:3]]
+        return vector * self.length_scale
+
+    def _direction(self, direction_id: Any, default: Tuple[float, float, float]) -> np.ndarray:
+        """IfcDirection as a 3D unit vector; directions are few and heavily shared"""
+        if not isinstance(direction_id, Ref):
+            return np.array(default, dtype=float)
+        vector = self._directions.get(direction_id)
+        if vector is None:
+            ratios = _arg(self.step.entity(direction_id).args, 0) or []
+            vector = np.zeros(3)
+            vector[:min(len(ratios), 3)] = [float(value) for value in ratios[:3]]
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm > 0 else np.array(default, dtype=float)
+            self._directions[direction_id] = vector
+        return vector
+
+    def axis_placement(self, placement_id: Any) -> np.ndarray:
+        """4x4 matrix of an IfcAxis2Placement3D/2D; identity if unset"""
+        if not isinstance(placement_id, Ref):
+            return _IDENTITY
+        matrix = self._axes.get(placement_id)
+        if matrix is not None:
+            return matrix
+        entity = self.step.entity(placement_id)
+        args = entity.args
+        location = self._point(args[0]) if isinstance(_arg(args, 0), Ref) else np.zeros(3)
+        if entity.type == "IFCAXIS2PLACEMENT3D":
+            z_axis = self._direction(_arg(args, 1), (0.0, 0.0, 1.0))
+            x_axis = self._direction(_arg(args, 2), (1.0, 0.0, 0.0))
+        elif entity.type == "IFCAXIS2PLACEMENT2D":
+            z_axis = np.array((0.0, 0.0, 1.0))
+            x_axis = self._direction(_arg(args, 1), (1.0, 0.0, 0.0))
+        else:
+            logger.debug(f"Unsupported placement {entity.type} #{placement_id}")
+            self._axes[placement_id] = _IDENTITY
+            return _IDENTITY
+        matrix = _frame(location, z_axis, x_axis)
+        self._axes[placement_id] = matrix
+        return matrix
+
+    def placement_transform(self, placement_id: Any) -> np.ndarray:
+        """World transform of an IfcLocalPlacement, composed along PlacementRelTo.
+
+        Every placement on the chain is cached, so a chain shared by many
+        products (site -> building -> storey -> space) is composed once.
+        """
+        if not isinstance(placement_id, Ref):
+            return _IDENTITY
+        # Walk up to the first placement already resolved (or the root)...
+        chain: List[Tuple[int, Any, Any]] = []
+        current = placement_id
+        seen = set()
+        while isinstance(current, Ref) and current not in self._transforms and current not in seen:
+            seen.add(current)
+            entity = self.step.entity(current)
+            if entity.type != "IFCLOCALPLACEMENT":  # e.g. IfcGridPlacement
+                self._transforms[current] = _IDENTITY
+                break
+            # IfcLocalPlacement: PlacementRelTo, RelativePlacement
+            relative_to, relative = _arg(entity.args, 0), _arg(entity.args, 1)
+            chain.append((current, relative_to, relative))
+            current = relative_to
+        # ...then compose back down, caching each step
+        for placement, relative_to, relative in reversed(chain):
+            parent = self._transforms.get(relative_to, _IDENTITY) if isinstance(relative_to, Ref) else _IDENTITY
+            self._transforms[placement] = parent @ self.axis_placement(relative)
+        return self._transforms.get(placement_id, _IDENTITY)
+
+    # Spatial hierarchy
+
+    def _relations(self, entity_type: str, children_at: int, parent_at: int) -> Dict[int, int]:
+        """child -> parent for one relationship type"""
+        parents: Dict[int, int] = {}
+        for relation in self.step.instances(entity_type):
+            parent = _arg(relation.args, parent_at)
+            if not isinstance(parent, Ref):
+                continue
+            for child in _arg(relation.args, children_at) or []:
+                if isinstance(child, Ref):
+                    parents[int(child)] = int(parent)
+        return parents
+
+    @property
+    def parents(self) -> Dict[int, int]:
+        """Decomposition: part -> whole, from IfcRelAggregates (RelatingObject, RelatedObjects)"""
+        if self._parents is None:
+            self._parents = self._relations("IFCRELAGGREGATES", children_at=5, parent_at=4)
+        return self._parents
+
+    @property
+    def containers(self) -> Dict[int, int]:
+        """Containment: element -> spatial structure, from IfcRelContainedInSpatialStructure.
+
+        These relationships list every building element, so they are only
+        decoded when a product is not part of the decomposition itself.
+        """
+        if self._containers is None:
+            self._containers = self._relations("IFCRELCONTAINEDINSPATIALSTRUCTURE", children_at=4, parent_at=5)
+        return self._containers
+
+    def storey_of(self, entity_id: int) -> Optional[int]:
+        """Id of the IfcBuildingStorey a product belongs to, if any"""
+        if entity_id in self._storeys:
+            return self._storeys[entity_id]
+        path = []
+        current: Optional[int] = entity_id
+        storey = None
+        while current is not None and len(path) < 64:
+            if current != entity_id:
+                if current not in self.step:
+                    # Dangling reference: nothing above it to belong to
+                    break
+                if self.step.type_of(current) == STOREY:
+                    storey = current
+                    break
+            if current in self._storeys:
+                storey = self._storeys[current]
+                break
+            path.append(current)
+            parent = self.parents.get(current)
+            if parent is None and current == entity_id:
+                parent = self.containers.get(current)
+            current = parent
+        for visited in path:
+            self._storeys[visited] = storey
+        return storey
+
+    def storey(self, storey_id: int) -> Tuple[Optional[str], Optional[float]]:
+        """(name, elevation in metres) of an IfcBuildingStorey"""
+        info = self._storey_info.get(storey_id)
+        if info is None:
+            # IfcBuildingStorey: ..., Name(2), ..., ObjectPlacement(5), ..., Elevation(9)
+            args = self.step.entity(storey_id).args
+            name = _arg(args, 2)
+            elevation = _arg(args, 9)
+            if isinstance(elevation, (int, float)):
+                elevation = float(elevation) * self.length_scale
+            else:
+                elevation = float(self.placement_transform(_arg(args, 5))[2, 3])
+            info = self._storey_info[storey_id] = (name if isinstance(name, str) else None, elevation)
+        return info
+
+    # Quantities
+
+    @property
+    def quantity_sets(self) -> Dict[int, List[int]]:
+        """Object id -> ids of the IfcElementQuantity sets attached to it"""
+        if self._quantity_sets is None:
+            self._quantity_sets = self._collect_quantity_sets()
+        return self._quantity_sets
+
+    def quantities_of(self, entity_id: int) -> Dict[str, Dict[str, float]]:
+        """Kind ("area", "volume", "length") -> quantity name -> SI value for one object"""
+        quantities: Dict[str, Dict[str, float]] = {}
+        for set_id in self.quantity_sets.get(entity_id, ()):
+            values = self._set_values.get(set_id)
+            if values is None:
+                values = self._set_values[set_id] = self._quantity_set(set_id)
+            for kind, named in values.items():
+                quantities.setdefault(kind, {}).update(named)
+        return quantities
+
+    def _collect_quantity_sets(self) -> Dict[int, List[int]]:
+        step = self.step
+        sets: Dict[int, List[int]] = {}
+        for relation_id in step.ids_of_type("IFCRELDEFINESBYPROPERTIES"):
+            # Most of these attach property sets; check the type of the relating
+            # definition before decoding the relationship and its objects
+            match = _LAST_REF.search(step.raw(relation_id))
+            if match is not None:
+                definition = int(match.group(1))
+                if definition not in step or step.type_of(definition) != "IFCELEMENTQUANTITY":
+                    continue
+            relation = step.entity(relation_id)
+            definition = _arg(relation.args, 5)
+            if not isinstance(definition, Ref) or step.type_of(definition) != "IFCELEMENTQUANTITY":
+                continue
+            for related in _arg(relation.args, 4) or []:
+                if isinstance(related, Ref):
+                    sets.setdefault(int(related), []).append(int(definition))
+        return sets
+
+    def _quantity_set(self, set_id: int) -> Dict[str, Dict[str, float]]:
+        """Values of an IfcElementQuantity (..., Quantities(5))"""
+        values: Dict[str, Dict[str, float]] = {}
+        for quantity_id in _arg(self.step.entity(set_id).args, 5) or []:
+            if not isinstance(quantity_id, Ref):
+                continue
+            quantity = self.step.entity(quantity_id)
+            kind = _QUANTITY_KINDS.get(quantity.type)
+            # IfcPhysicalSimpleQuantity: Name, Description, Unit, <Value>, ...
+            name, unit, value = _arg(quantity.args, 0), _arg(quantity.args, 2), _arg(quantity.args, 3)
+            if kind is None or not isinstance(value, (int, float)):
+                continue
+            factor = self._unit_factor(unit) if isinstance(unit, Ref) else self.units.get(kind[1])
+            if factor is None:
+                factor = self.length_scale ** _UNIT_POWERS[kind[1]]
+            values.setdefault(kind[0], {})[name if isinstance(name, str) else ""] = float(value) * factor
+        return values
+
+    # Geometry
+
+    def body(self, shape_id: Any, transform: np.ndarray) -> Optional[Solid]:
+        """World-space body geometry of an IfcProductDefinitionShape, if supported.
+
+        Swept solids (rectangle, circle and arbitrary closed profiles) and
+        bounding boxes are understood; 'Body' representations are preferred.
+        """
+        if not isinstance(shape_id, Ref):
+            return None
+        representations = []
+        for representation_id in _arg(self.step.entity(shape_id).args, 2) or []:
+            if isinstance(representation_id, Ref):
+                # IfcShapeRepresentation: ContextOfItems, Identifier, Type, Items
+                args = self.step.entity(representation_id).args
+                representations.append((_arg(args, 1) != "Body", _arg(args, 3) or []))
+        representations.sort(key=lambda item: item[0])
+
+        for _, items in representations:
+            solids = [self._item(item) for item in items if isinstance(item, Ref)]
+            solids = [solid for solid in solids if solid is not None]
+            if not solids:
+                continue
+            local = np.vstack([solid.points for solid in solids])
+            world = local @ transform[:3, :3].T + transform[:3, 3]
+            areas = [solid.area for solid in solids if solid.area is not None]
+            depths = [solid.depth for solid in solids if solid.depth is not None]
+            return Solid(world, sum(areas) if areas else None, max(depths) if depths else None)
+        return None
+
+    def _item(self, item_id: int) -> Optional[Solid]:
+        """Corner points of one representation item, in the product's coordinates"""
+        entity = self.step.entity(item_id)
+        args = entity.args
+        if entity.type == "IFCEXTRUDEDAREASOLID":
+            # SweptArea, Position, ExtrudedDirection, Depth
+            profile = self._profile(_arg(args, 0))
+            depth = _arg(args, 3)
+            if profile is None or not isinstance(depth, (int, float)):
+                return None
+            outline, area = profile
+            direction = self._direction(_arg(args, 2), (0.0, 0.0, 1.0))
+            depth = float(depth) * self.length_scale
+            base = np.column_stack([outline, np.zeros(len(outline))])
+            points = np.vstack([base, base + direction * depth])
+            position = self.axis_placement(_arg(args, 1))
+            points = points @ position[:3, :3].T + position[:3, 3]
+            return Solid(points, area, depth * abs(float(direction[2])))
+        if entity.type == "IFCBOUNDINGBOX":
+            # Corner, XDim, YDim, ZDim
+            dims = [_arg(args, position) for position in (1, 2, 3)]
+            if not isinstance(_arg(args, 0), Ref) or not all(isinstance(dim, (int, float)) for dim in dims):
+                return None
+            corner = self._point(args[0])
+            size = np.array(dims, dtype=float) * self.length_scale
+            points = corner + _UNIT_CUBE * size
+            return Solid(points, float(size[0] * size[1]), float(size[2]))
+        return None
+
+    def _profile(self, profile_id: Any) -> Optional[Tuple[np.ndarray, float]]:
+        """(2D outline points in metres, enclosed area in m²) of a profile definition"""
+        if not isinstance(profile_id, Ref):
+            return None
+        entity = self.step.entity(profile_id)
+        args = entity.args
+        if entity.type in ("IFCRECTANGLEPROFILEDEF", "IFCROUNDEDRECTANGLEPROFILEDEF"):
+            # ProfileType, ProfileName, Position, XDim, YDim
+            x_dim, y_dim = _arg(args, 3), _arg(args, 4)
+            if not isinstance(x_dim, (int, float)) or not isinstance(y_dim, (int, float)):
+                return None
+            half_x, half_y = float(x_dim) * self.length_scale / 2, float(y_dim) * self.length_scale / 2
+            outline = np.array([(-half_x, -half_y), (half_x, -half_y), (half_x, half_y), (-half_x, half_y)])
+            return _placed(outline, self.axis_placement(_arg(args, 2))), 4 * half_x * half_y
+        if entity.type == "IFCCIRCLEPROFILEDEF":
+            # ProfileType, ProfileName, Position, Radius
+            radius = _arg(args, 3)
+            if not isinstance(radius, (int, float)):
+                return None
+            radius = float(radius) * self.length_scale
+            outline = np.array([(-radius, -radius), (radius, -radius), (radius, radius), (-radius, radius)])
+            return _placed(outline, self.axis_placement(_arg(args, 2))), math.pi * radius * radius
+        if entity.type == "IFCARBITRARYCLOSEDPROFILEDEF":
+            # ProfileType, ProfileName, OuterCurve
+            outline = self._curve_points(_arg(args, 2))
+            if outline is None or len(outline) < 3:
+                return None
+            x, y = outline[:, 0], outline[:, 1]
+            area = abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))) / 2
+            return outline, area
+        return None
+
+    def _curve_points(self, curve_id: Any) -> Optional[np.ndarray]:
+        """2D points of an IfcPolyline or IfcIndexedPolyCurve, in metres"""
+        if not isinstance(curve_id, Ref):
+            return None
+        entity = self.step.entity(curve_id)
+        if entity.type == "IFCPOLYLINE":
+            points = [self._point(point)[:2] for point in _arg(entity.args, 0) or [] if isinstance(point, Ref)]
+            return np.array(points) if points else None
+        if entity.type == "IFCINDEXEDPOLYCURVE":
+            # Points (IfcCartesianPointList2D: CoordList, ...), Segments, SelfIntersect
+            point_list = _arg(entity.args, 0)
+            if not isinstance(point_list, Ref):
+                return None
+            coordinates = _arg(self.step.entity(point_list).args, 0) or []
+            points = [[float(value) for value in pair[:2]] for pair in coordinates if len(pair) >= 2]
+            return np.array(points) * self.length_scale if points else None
+        return None
+
+    # Products
+
+    def space_geometry(self, entity_id: int, args: List[Any]) -> Dict[str, Any]:
+        """Location, size, bounding box and storey of an IfcSpace.
+
+        Coordinates are the centre of the body's footprint at floor level
+        (the bounding box minimum z), or the placement origin when the body
+        geometry is not understood. Quantities take precedence over values
+        derived from the geometry.
+        """
+        # IfcSpace: ..., ObjectPlacement(5), Representation(6), ...
+        transform = self.placement_transform(_arg(args, 5))
+        solid = self.body(_arg(args, 6), transform)
+        box = BoundingBox.of_points(solid.points) if solid is not None else None
+
+        quantities = self.quantities_of(entity_id)
+        area = _pick(quantities.get("area"), AREA_QUANTITIES)
+        volume = _pick(quantities.get("volume"), VOLUME_QUANTITIES)
+        height = _pick(quantities.get("length"), HEIGHT_QUANTITIES, any_name=False)
+        if solid is not None:
+            if area is None:
+                area = solid.area
+            if height is None:
+                height = solid.depth
+        if volume is None and area is not None and height is not None:
+            volume = area * height
+
+        if box is not None:
+            x, y, _ = box.center
+            z = box.min_z
+        else:
+            x, y, z = (float(value) for value in transform[:3, 3])
+
+        level_name = level_elevation = None
+        storey = self.storey_of(entity_id)
+        if storey is not None:
+            level_name, level_elevation = self.storey(storey)
+
+        return {
+            "area": area,
+            "volume": volume,
+            "height": height,
+            "x_coordinate": x,
+            "y_coordinate": y,
+            "z_coordinate": z,
+            "level_name": level_name,
+            "level_elevation": level_elevation,
+            "bbox_min_x": box.min_x if box else None,
+            "bbox_min_y": box.min_y if box else None,
+            "bbox_min_z": box.min_z if box else None,
+            "bbox_max_x": box.max_x if box else None,
+            "bbox_max_y": box.max_y if box else None,
+            "bbox_max_z": box.max_z if box else None,
+        }
+
+
+_UNIT_CUBE = np.array([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=float)
+
+
+def _arg(args: List[Any], position: int) -> Any:
+    """Attribute at ``position``, or None when the entity has fewer"""
+    return args[position] if position < len(args) else None
+
+
+def _frame(location: np.ndarray, z_axis: np.ndarray, x_axis: np.ndarray) -> np.ndarray:
+    """Right-handed 4x4 frame from an origin, a Z axis and an approximate X axis"""
+    # Scalar arithmetic: np.cross and friends cost more than the math for 3-vectors
+    zx, zy, zz = (float(value) for value in z_axis)
+    xx, xy, xz = (float(value) for value in x_axis)
+    dot = xx * zx + xy * zy + xz * zz
+    xx, xy, xz = xx - dot * zx, xy - dot * zy, xz - dot * zz
+    norm = math.sqrt(xx * xx + xy * xy + xz * xz)
+    if norm < 1e-12:  # X parallel to Z: pick any perpendicular
+        xx, xy, xz = (0.0, zz, -zy) if abs(zx) < 0.9 else (-zz, 0.0, zx)
+        norm = math.sqrt(xx * xx + xy * xy + xz * xz)
+    xx, xy, xz = xx / norm, xy / norm, xz / norm
+    return np.array([
+        (xx, zy * xz - zz * xy, zx, location[0]),
+        (xy, zz * xx - zx * xz, zy, location[1]),
+        (xz, zx * xy - zy * xx, zz, location[2]),
+        (0.0, 0.0, 0.0, 1.0),
+    ])
+
+
+def _placed(outline: np.ndarray, placement: np.ndarray) -> np.ndarray:
+    """Apply a 2D axis placement (as a 4x4 matrix) to 2D points"""
+    return outline @ placement[:2, :2].T + placement[:2, 3]
+
+
+def _pick(values: Optional[Dict[str, float]], preferred: Tuple[str, ...], any_name: bool = True) -> Optional[float]:
+    """First preferred quantity present, else (if ``any_name``) any quantity of the kind"""
+    if not values:
+        return None
+    for name in preferred:
+        if name in values:
+            return values[name]
+    return next(iter(values.values())) if any_name else None
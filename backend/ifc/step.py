@@ -0,0 +1,449 @@
+"""
+Single-pass tokenizer for ISO-10303-21 (STEP physical file) data
+
+IFC files are STEP files: a HEADER section of a few statements followed by
+a DATA section of entity instances such as ``#12=IFCSPACE('2Xz...',#5,...);``.
+Statements end at ``;``, may span lines, and may contain ``;`` inside
+strings (quoted with ``'``, a quote escaped as ``''``) or comments.
+
+StepFile scans a memory-mapped file once, recording each instance's id,
+type and byte range in an EntityIndex, and decodes attributes only when an
+entity is asked for.
+"""
+
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+from backend.ifc.index import INDEX_SUFFIX, EntityIndex
+
+logger = logging.getLogger(__name__)
+
+# Smallest chunk worth a worker process when scanning in parallel
+PARALLEL_MIN_CHUNK = 16 * 1024 * 1024
+
+# One statement: optional "#id=TYPE(" prefix (type empty for complex instances
+# "#1=(A()B());"), then anything up to the ";" that is not inside a string or
+# comment. An escaped quote '' simply reads as two adjacent strings. The
+# possessive quantifiers (Python 3.11+) stop a malformed statement from
+# backtracking through the rest of the file.
+_STATEMENT = re.compile(rb"""
+    (?:\s|/\*.*?\*/)*
+    (?:(\#)(\d+)\s*=\s*([A-Za-z0-9_]*)\s*\()?
+    [^';/]*+(?:(?:'[^']*+'|/\*.*?\*/|/(?!\*))[^';/]*+)*+
+    ;""", re.S | re.X)
+
+# Start of an entity instance statement
+_INSTANCE = re.compile(rb"(?:\s|/\*.*?\*/)*(#)(\d+)\s*=\s*([A-Za-z0-9_]*)\s*\(", re.S)
+
+# Whitespace and comments after the last statement
+_TRAILER = re.compile(rb"(?:\s|/\*.*?\*/)*", re.S)
+
+# First keyword of a non-instance statement (HEADER, DATA, ENDSEC, FILE_NAME, ...)
+_KEYWORD = re.compile(rb"(?:\s|/\*.*?\*/)*([A-Za-z][A-Za-z0-9_-]*)", re.S)
+
+# Attribute tokens, each preceded by optional whitespace and comments
+_TOKEN = re.compile(rb"""
+    (?:\s|/\*.*?\*/)*
+    (?:
+        (?P<string>'[^']*+(?:''[^']*+)*+')
+      | \#(?P<ref>\d+)
+      | \.(?P<enum>[A-Za-z0-9_]+)\.
+      | (?P<number>[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<typed>[A-Za-z_][A-Za-z0-9_]*)\s*\(
+      | (?P<open>\()
+      | (?P<close>\))
+      | (?P<comma>,)
+      | (?P<null>\$)
+      | (?P<derived>\*)
+      | "(?P<binary>[0-9A-Fa-f]*)"
+    )""", re.S | re.X)
+
+# Control directives inside strings: \X2\<UTF-16 hex>\X0\, \X4\<UTF-32 hex>\X0\, \X\<hex byte>, \S\<char>
+_DIRECTIVE = re.compile(r"\\X2\\((?:[0-9A-Fa-f]{4})*)\\X0\\|\\X4\\((?:[0-9A-Fa-f]{8})*)\\X0\\|\\X\\([0-9A-Fa-f]{2})|\\S\\(.)|\\P[A-I]\\|\\\\")
+
+
+class StepSyntaxError(ValueError):
+    """The file is not well-formed STEP data"""
+
+
+class Ref(int):
+    """Reference to another entity instance (``#12``)"""
+
+    def __repr__(self):
+        return f"#{int(self)}"
+
+
+class EnumValue(str):
+    """Enumeration value (``.ELEMENT.``)"""
+
+    def __repr__(self):
+        return f".{str(self)}."
+
+
+class TypedValue(NamedTuple):
+    """Value wrapped in a defined type, e.g. ``IFCLABEL('Office')``"""
+    type: str
+    value: Any
+
+
+class Entity(NamedTuple):
+    """A decoded entity instance"""
+    id: int
+    type: str
+    args: List[Any]
+
+
+# Value of an attribute derived in a subtype (``*``)
+DERIVED = EnumValue("*")
+
+
+def _decode_directive(match) -> str:
+    utf16, utf32, byte, shifted = match.group(1, 2, 3, 4)
+    if utf16 is not None:
+        return bytes.fromhex(utf16).decode("utf-16-be", errors="replace")
+    if utf32 is not None:
+        return bytes.fromhex(utf32).decode("utf-32-be", errors="replace")
+    if byte is not None:
+        return chr(int(byte, 16))
+    if shifted is not None:
+        return chr(ord(shifted) + 128)
+    if match.group(0) == "\\\\":
+        return "\\"
+    return ""  # code page switch
+
+
+def decode_string(raw: bytes) -> str:
+    """Decode the contents of a STEP string literal (without the outer quotes)"""
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
+    if "''" in text:
+        text = text.replace("''", "'")
+    if "\\" in text:
+        text = _DIRECTIVE.sub(_decode_directive, text)
+    return text
+
+
+def parse_parameters(data: bytes, pos: int = 0) -> List[Any]:
+    """Decode a parenthesized attribute list starting at ``data[pos]``.
+
+    Strings become str, numbers int or float, ``$`` None, ``.T.``/``.F.``
+    booleans, other enumerations EnumValue, ``#n`` Ref, nested lists lists
+    and typed values TypedValue.
+    """
+    stack: List[Tuple[list, Optional[str]]] = []
+    match = _TOKEN.match
+    end = len(data)
+    while pos < end:
+        m = match(data, pos)
+        if m is None:
+            raise StepSyntaxError(f"Unexpected data at byte {pos}: {bytes(data[pos:pos + 20])!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "comma":
+            continue
+        if kind == "open" or kind == "typed":
+            stack.append(([], m.group("typed")))
+            continue
+        if not stack:
+            raise StepSyntaxError("Attribute list must start with '('")
+        if kind == "close":
+            values, typed = stack.pop()
+            value = values if typed is None else TypedValue(typed.decode("ascii"), values[0] if len(values) == 1 else values)
+            if not stack:
+                return value
+            stack[-1][0].append(value)
+            continue
+
+        text = m.group(kind)
+        if kind == "string":
+            value = decode_string(text[1:-1])
+        elif kind == "ref":
+            value = Ref(text)
+        elif kind == "number":
+            value = float(text) if (b"." in text or b"e" in text or b"E" in text) else int(text)
+        elif kind == "enum":
+            value = True if text == b"T" else False if text == b"F" else None if text == b"U" else EnumValue(text.decode("ascii"))
+        elif kind == "null":
+            value = None
+        elif kind == "derived":
+            value = DERIVED
+        else:  # binary
+            value = text.decode("ascii")
+        stack[-1][0].append(value)
+    raise StepSyntaxError("Unterminated attribute list")
+
+
+def _statements(buf, start: int = 0, end: Optional[int] = None):
+    """Yield a _STATEMENT match for every statement in ``buf[start:end]``"""
+    end = len(buf) if end is None else end
+    match = _STATEMENT.match
+    position = start
+    while True:
+        m = match(buf, position, end)
+        if m is None:
+            break
+        position = m.end()
+        yield m
+    if _TRAILER.match(buf, position, end).end() != end:
+        raise StepSyntaxError(f"Unterminated statement, string or comment at byte {position}")
+
+
+def iter_statements(buf, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """Yield the (start, end) byte range of every ``;``-terminated statement in ``buf[start:end]``"""
+    for m in _statements(buf, start, end):
+        yield m.start(), m.end()
+
+
+class StepFile:
+    """A STEP file indexed in one pass and decoded lazily.
+
+    ``index`` maps entity id to (type, byte offset, byte length); the
+    attribute values are only parsed by ``entity()``. ``header`` maps
+    header statement names (FILE_DESCRIPTION, FILE_NAME, FILE_SCHEMA) to
+    their decoded attributes.
+
+    The index is saved beside the file (``<path>.idx``) and memory-mapped
+    on the next open instead of scanning again, as long as the file's size
+    and modification time still match. Pass ``persist_index=False`` to
+    neither read nor write it; ``keep_index``, if given, is asked once the
+    scan is done whether the index is still worth writing (the file may
+    have been superseded meanwhile).
+
+    With ``workers`` > 1, a DATA section of at least two PARALLEL_MIN_CHUNK
+    is split at entity boundaries and the chunks are scanned in that many
+    processes (at most one per CPU), then merged into one index.
+    """
+
+    def __init__(self, path: str, persist_index: bool = True, workers: int = 1,
+                 keep_index: Optional[Callable[[], bool]] = None):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX if persist_index else None
+        self._keep_index = keep_index
+        self._file = open(path, "rb")
+        try:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self.buffer = b""
+        self._index_mapping = None
+        self._header_raw: Dict[str, bytes] = {}
+        if not self._load_index():
+            self._scan(workers)
+            self._save_index()
+        self.header: Dict[str, List[Any]] = {
+            name: parse_parameters(raw) for name, raw in self._header_raw.items()
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.index = None
+        for mapping in (self._index_mapping, self.buffer):
+            if isinstance(mapping, mmap.mmap):
+                try:
+                    mapping.close()
+                except BufferError:  # arrays still referenced elsewhere; closed when collected
+                    pass
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, entity_id: int) -> bool:
+        return entity_id in self.index
+
+    def _source_stamp(self) -> Dict[str, int]:
+        stat = os.fstat(self._file.fileno())
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _load_index(self) -> bool:
+        if self.index_path is None or not os.path.exists(self.index_path):
+            return False
+        loaded = EntityIndex.load(self.index_path)
+        if loaded is None:
+            return False
+        index, metadata, mapping = loaded
+        if metadata.get("source") != self._source_stamp():
+            # Stale: the file was replaced after it was indexed
+            del index, loaded
+            mapping.close()
+            return False
+        self.index = index
+        self._index_mapping = mapping
+        self._header_raw = {name: raw.encode("latin-1") for name, raw in metadata.get("header", {}).items()}
+        return True
+
+    def _save_index(self):
+        if self.index_path is None:
+            return
+        # A file removed or superseded while it was scanned would leave an orphan index
+        if not os.path.exists(self.path) or (self._keep_index is not None and not self._keep_index()):
+            return
+        metadata = {
+            "source": self._source_stamp(),
+            "header": {name: raw.decode("latin-1") for name, raw in self._header_raw.items()},
+        }
+        try:
+            self.index.save(self.index_path, metadata)
+        except OSError as e:
+            logger.warning(f"Could not write entity index {self.index_path}: {e}")
+
+    def _scan(self, workers: int):
+        buf = self.buffer
+        data_start = _scan_header(buf, self._header_raw)
+        parts = min(workers, os.cpu_count() or 1, (len(buf) - data_start) // PARALLEL_MIN_CHUNK)
+        if parts > 1:
+            try:
+                self.index = _scan_parallel(self.path, buf, data_start, parts)
+                return
+            except StepSyntaxError as e:
+                # A split point fell inside a string or comment (or the file
+                # is malformed); the sequential scan settles which
+                logger.debug(f"Parallel scan of {self.path} failed, rescanning sequentially: {e}")
+        self.index = EntityIndex(*_scan_range(buf, data_start, len(buf)))
+
+    def type_of(self, entity_id: int) -> str:
+        return self.index[entity_id][0]
+
+    def type_counts(self) -> Dict[str, int]:
+        return self.index.type_counts()
+
+    def ids_of_type(self, *entity_types: str) -> List[int]:
+        """Ids of the instances of the given types (exact, upper-case names), in file order per type"""
+        ids: List[int] = []
+        for entity_type in entity_types:
+            ids.extend(self.index.ids_of_type(entity_type).tolist())
+        return ids
+
+    def raw(self, entity_id: int) -> bytes:
+        """The statement text of an entity, e.g. ``#5=IFCWALL(...);``"""
+        _, offset, length = self.index[entity_id]
+        return self.buffer[offset:offset + length]
+
+    def body(self, entity_id: int) -> bytes:
+        """The statement text from the type name on, e.g. ``IFCWALL(...);``"""
+        raw = self.raw(entity_id)
+        return raw[_INSTANCE.match(raw).start(3):]
+
+    def entity(self, entity_id: int) -> Entity:
+        """Decode one entity's attributes"""
+        entity_type, offset, length = self.index[entity_id]
+        raw = self.buffer[offset:offset + length]
+        # For a complex instance (empty type) the list holds one TypedValue per entity type
+        return Entity(entity_id, entity_type, parse_parameters(raw, _INSTANCE.match(raw).end() - 1))
+
+    def instances(self, *entity_types: str) -> Iterator[Entity]:
+        """Decode every instance of the given types"""
+        for entity_id in self.ids_of_type(*entity_types):
+            yield self.entity(entity_id)
+
+
+def _scan_header(buf, header_raw: Dict[str, bytes]) -> int:
+    """Collect the HEADER section statements; returns where the DATA section starts"""
+    section = None
+    for m in _statements(buf):
+        if m.start(1) >= 0:  # an instance: no (more) header
+            return m.start()
+        keyword = _KEYWORD.match(buf, m.start(), m.end())
+        if keyword is None:
+            continue
+        name = keyword.group(1).decode("ascii").upper()
+        if name == "DATA":
+            return m.end()
+        if name in ("HEADER", "ENDSEC"):
+            section = name
+        elif section == "HEADER":
+            header_raw[name] = bytes(buf[keyword.end():m.end()])
+    return len(buf)
+
+
+def _scan_range(buf, start: int, end: int) -> Tuple[array, array, array, array, List[str]]:
+    """Index the instances in ``buf[start:end]``: (ids, offsets, lengths, type codes, types).
+
+    Raises StepSyntaxError unless the range ends at a statement boundary.
+    """
+    ids, offsets, lengths, type_codes = array("q"), array("q"), array("I"), array("H")
+    codes: Dict[bytes, int] = {}
+    types: List[str] = []
+    for m in _statements(buf, start, end):
+        offset = m.start(1)
+        if offset < 0:  # ENDSEC and other keywords
+            continue
+        raw_type = m.group(3)
+        code = codes.get(raw_type)
+        if code is None:
+            entity_type = raw_type.decode("ascii").upper()
+            code = codes[raw_type] = types.index(entity_type) if entity_type in types else len(types)
+            if code == len(types):
+                types.append(entity_type)
+        ids.append(int(m.group(2)))
+        offsets.append(offset)
+        lengths.append(m.end() - offset)
+        type_codes.append(code)
+    return ids, offsets, lengths, type_codes, types
+
+
+def _scan_chunk(path: str, start: int, end: int) -> Tuple[array, array, array, array, List[str]]:
+    """_scan_range over part of a file; runs in a worker process"""
+    with open(path, "rb") as file:
+        buf = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _scan_range(buf, start, end)
+    finally:
+        buf.close()
+
+
+def _split_points(buf, start: int, parts: int) -> List[int]:
+    """Offsets cutting ``buf[start:]`` into about ``parts`` chunks, each at the start of a line beginning an instance.
+
+    A line may also start with ``#`` inside a multi-line string or comment;
+    scanning the chunk before such a point then fails, which is how a bad
+    split is detected.
+    """
+    points = [start]
+    size = len(buf) - start
+    for part in range(1, parts):
+        found = buf.find(b"\n#", max(start + size * part // parts, points[-1]))
+        if found < 0:
+            break
+        points.append(found + 1)
+    points.append(len(buf))
+    return points
+
+
+def _scan_parallel(path: str, buf, start: int, parts: int) -> EntityIndex:
+    """Scan ``buf[start:]`` in ``parts`` processes and merge the chunk indexes.
+
+    Each chunk is scanned from its start to the next split point. Chunk 0
+    starts at a statement boundary, and a chunk only scans cleanly if it
+    ends on one, so when every chunk succeeds every split point was a true
+    statement boundary and the result equals a sequential scan.
+    """
+    points = _split_points(buf, start, parts)
+    starts, ends = points[:-1], points[1:]
+    # Spawned, not forked: the caller may hold open connections or run an event loop
+    with ProcessPoolExecutor(max_workers=len(starts), mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks = list(pool.map(_scan_chunk, repeat(path, len(starts)), starts, ends))
+
+    # Chunks number their types independently; map them onto one list
+    codes: Dict[str, int] = {}
+    columns: Dict[str, list] = {"ids": [], "offsets": [], "lengths": [], "type_codes": []}
+    for ids, offsets, lengths, type_codes, types in chunks:
+        remap = np.array([codes.setdefault(entity_type, len(codes)) for entity_type in types], dtype=np.uint16)
+        columns["ids"].append(np.frombuffer(ids, dtype=np.int64))
+        columns["offsets"].append(np.frombuffer(offsets, dtype=np.int64))
+        columns["lengths"].append(np.frombuffer(lengths, dtype=np.uint32))
+        columns["type_codes"].append(remap[np.frombuffer(type_codes, dtype=np.uint16)])
+    return EntityIndex(types=list(codes), **{name: np.concatenate(arrays) for name, arrays in columns.items()})
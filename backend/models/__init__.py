@@ -5,19 +5,26 @@ Database models for IFC Monitoring System
 from backend.core.database import Base
 from backend.models.sensor import Sensor
 from backend.models.reading import SensorReading
+from backend.models.reading_rollup import ReadingRollup, RollupWatermark
+from backend.models.sensor_latest import SensorLatestReading
 from backend.models.alert import Alert
 from backend.models.user import User
 from backend.models.location import Location
 from backend.models.ifc_file import IFCFile
+from backend.models.ifc_job import IFCJob
 from backend.models.ifc_space import IFCSpace
 
 __all__ = [
     "Base",
     "Sensor",
     "SensorReading", 
+    "ReadingRollup",
+    "RollupWatermark",
+    "SensorLatestReading",
     "Alert",
     "User",
     "Location",
     "IFCFile",
+    "IFCJob",
     "IFCSpace"
 ]
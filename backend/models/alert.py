@@ -30,7 +30,7 @@ class Alert(Base):
     __tablename__ = "alerts"
     
     id = Column(Integer, primary_key=True, index=True)
-    sensor_id = Column(Integer, ForeignKey("sensors.id"), nullable=False)
+    sensor_id = Column(Integer, ForeignKey("sensors.id", ondelete="CASCADE"), nullable=False)
     alert_type = Column(String(50), nullable=False)  # threshold_exceeded, sensor_offline, etc.
     severity = Column(Enum(AlertSeverity), nullable=False, default=AlertSeverity.MEDIUM)
     status = Column(Enum(AlertStatus), nullable=False, default=AlertStatus.ACTIVE)
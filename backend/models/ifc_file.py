@@ -19,6 +19,10 @@ class IFCFile(Base):
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
     file_type = Column(String(50), default="IFC")
+    file_hash = Column(String(64), index=True)  # SHA-256 of the file contents
+    processed_hash = Column(String(64))  # file_hash the extracted spaces were built from
+    spaces_version = Column(Integer, default=0)  # bumped whenever processing changes the spaces
+    geometry_etag = Column(String(32))  # content hash of the spaces' geometry artifact (ifc_geometry)
     
     # IFC specific metadata
     ifc_version = Column(String(20))
@@ -0,0 +1,49 @@
+"""
+IFC processing job model for the database-backed job queue
+"""
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Enum, Index
+from sqlalchemy.sql import func
+import enum
+from backend.core.database import Base
+
+
+class IFCJobStatus(str, enum.Enum):
+    """Processing job status"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class IFCJob(Base):
+    """One request to process an IFC file, claimed and run by a worker process"""
+
+    __tablename__ = "ifc_jobs"
+    __table_args__ = (
+        Index("ix_ifc_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ifc_file_id = Column(Integer, ForeignKey("ifc_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(Enum(IFCJobStatus), nullable=False, default=IFCJobStatus.QUEUED)
+
+    # Progress reported by the worker
+    stage = Column(String(50))  # parsing, extracting, saving
+    progress = Column(Float, default=0.0)  # 0.0 - 1.0
+    error = Column(Text)
+    force = Column(Boolean, default=False)  # reprocess even if the file is unchanged
+
+    # Claiming and crash recovery
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String(100))
+    heartbeat_at = Column(DateTime(timezone=True))
+
+    # Metadata
+    requested_by = Column(Integer)  # User ID who queued the job
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<IFCJob(id={self.id}, ifc_file_id={self.ifc_file_id}, status='{self.status}')>"
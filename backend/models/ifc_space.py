@@ -18,6 +18,7 @@ class IFCSpace(Base):
     
     # IFC Space properties
     ifc_id = Column(String(100), nullable=False, index=True)  # IFC GlobalId
+    fingerprint = Column(String(32))  # digest of the IfcSpace and everything it depends on
     name = Column(String(255))
     long_name = Column(String(500))
     description = Column(Text)
@@ -31,11 +32,19 @@ class IFCSpace(Base):
     volume = Column(Float)  # cubic meters
     height = Column(Float)  # meters
     
-    # Coordinates (if available)
+    # Coordinates (if available): footprint centre at floor level, meters
     x_coordinate = Column(Float)
     y_coordinate = Column(Float)
     z_coordinate = Column(Float)
     
+    # World-space bounding box of the body geometry (if available)
+    bbox_min_x = Column(Float)
+    bbox_min_y = Column(Float)
+    bbox_min_z = Column(Float)
+    bbox_max_x = Column(Float)
+    bbox_max_y = Column(Float)
+    bbox_max_z = Column(Float)
+    
     # Level information
     level_name = Column(String(100))
     level_elevation = Column(Float)
@@ -0,0 +1,48 @@
+"""
+Downsampled sensor reading models for IFC monitoring system
+"""
+
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, UniqueConstraint
+from backend.core.database import Base
+
+# Rollup resolutions maintained by the rollup job, in seconds
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+
+
+class ReadingRollup(Base):
+    """Aggregate of the valid readings of one sensor over one time bucket"""
+
+    __tablename__ = "sensor_reading_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sensor_id = Column(Integer, ForeignKey("sensors.id", ondelete="CASCADE"), nullable=False)
+    resolution = Column(Integer, nullable=False)  # bucket width in seconds
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+
+    # Aggregates; avg is value_sum / count
+    count = Column(Integer, nullable=False)
+    value_sum = Column(Float, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    quality_sum = Column(Float, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('sensor_id', 'resolution', 'bucket_start', name='uq_rollup_bucket'),
+        Index('ix_rollup_resolution_bucket', 'resolution', 'bucket_start'),
+    )
+
+    def __repr__(self):
+        return f"<ReadingRollup(sensor_id={self.sensor_id}, resolution={self.resolution}, bucket_start='{self.bucket_start}', count={self.count})>"
+
+
+class RollupWatermark(Base):
+    """Per-sensor progress of the rollup job"""
+
+    __tablename__ = "sensor_rollup_watermarks"
+
+    sensor_id = Column(Integer, ForeignKey("sensors.id", ondelete="CASCADE"), primary_key=True)
+    last_reading_id = Column(Integer, nullable=False, default=0)  # highest reading id rolled up
+    rolled_until = Column(DateTime(timezone=True))  # latest reading timestamp rolled up
+
+    def __repr__(self):
+        return f"<RollupWatermark(sensor_id={self.sensor_id}, last_reading_id={self.last_reading_id})>"
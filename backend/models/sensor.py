@@ -22,6 +22,13 @@ class Sensor(Base):
     manufacturer = Column(String(100))
     serial_number = Column(String(100), unique=True)
     
+    # Position in a building model: coordinates in the IFC file's frame, meters
+    ifc_file_id = Column(Integer, ForeignKey("ifc_files.id"), index=True)
+    x_coordinate = Column(Float)
+    y_coordinate = Column(Float)
+    z_coordinate = Column(Float)
+    ifc_space_id = Column(Integer, ForeignKey("ifc_spaces.id"), index=True)  # assigned from the coordinates when given
+    
     # Calibration data
     min_value = Column(Float)
     max_value = Column(Float)
@@ -42,8 +49,9 @@ class Sensor(Base):
     
     # Relationships
     location = relationship("Location", back_populates="sensors")
-    readings = relationship("SensorReading", back_populates="sensor", cascade="all, delete-orphan")
-    alerts = relationship("Alert", back_populates="sensor", cascade="all, delete-orphan")
+    # passive_deletes: never load readings/alerts just to delete them (see delete_sensor)
+    readings = relationship("SensorReading", back_populates="sensor", cascade="all, delete-orphan", passive_deletes=True)
+    alerts = relationship("Alert", back_populates="sensor", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Sensor(id={self.id}, name='{self.name}', type='{self.sensor_type}')>"
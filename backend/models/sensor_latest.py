@@ -0,0 +1,23 @@
+"""
+Last-value model for IFC monitoring system
+"""
+
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from backend.core.database import Base
+
+
+class SensorLatestReading(Base):
+    """Most recent reading of each sensor, maintained on every ingest"""
+
+    __tablename__ = "sensor_latest"
+
+    sensor_id = Column(Integer, ForeignKey("sensors.id", ondelete="CASCADE"), primary_key=True)
+    reading_id = Column(Integer, nullable=False)
+    value = Column(Float, nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    quality_score = Column(Float, default=1.0)
+    is_valid = Column(Integer, default=1)
+    created_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<SensorLatestReading(sensor_id={self.sensor_id}, value={self.value}, timestamp='{self.timestamp}')>"
@@ -50,6 +50,8 @@ class AlertResponse(AlertBase):
 class AlertListResponse(BaseModel):
     """Schema for alert list response"""
     alerts: List[AlertResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
     size: int
+    next_cursor: Optional[str] = None
@@ -5,6 +5,7 @@ Pydantic schemas for IFC file operations
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from backend.models.ifc_job import IFCJobStatus
 
 
 class IFCFileBase(BaseModel):
@@ -44,6 +45,9 @@ class IFCFileResponse(IFCFileBase):
     id: int
     file_path: str
     file_type: str
+    file_hash: Optional[str] = None
+    processed_hash: Optional[str] = None
+    geometry_etag: Optional[str] = None
     is_processed: bool
     processing_status: str
     processing_error: Optional[str] = None
@@ -58,6 +62,25 @@ class IFCFileResponse(IFCFileBase):
         from_attributes = True
 
 
+class IFCJobResponse(BaseModel):
+    """Schema for IFC processing job status and progress"""
+    id: int
+    ifc_file_id: int
+    status: IFCJobStatus
+    stage: Optional[str] = None
+    progress: float = 0.0
+    error: Optional[str] = None
+    force: Optional[bool] = False
+    attempts: int = 0
+    requested_by: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
 class IFCSpaceBase(BaseModel):
     """Base IFC space schema"""
     ifc_id: str
@@ -72,6 +95,12 @@ class IFCSpaceBase(BaseModel):
     x_coordinate: Optional[float] = None
     y_coordinate: Optional[float] = None
     z_coordinate: Optional[float] = None
+    bbox_min_x: Optional[float] = None
+    bbox_min_y: Optional[float] = None
+    bbox_min_z: Optional[float] = None
+    bbox_max_x: Optional[float] = None
+    bbox_max_y: Optional[float] = None
+    bbox_max_z: Optional[float] = None
     level_name: Optional[str] = None
     level_elevation: Optional[float] = None
 
@@ -96,6 +125,32 @@ class IFCFileListResponse(BaseModel):
 class IFCSpaceListResponse(BaseModel):
     """Schema for IFC space list response"""
     spaces: List[IFCSpaceResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
     size: int
+    next_cursor: Optional[str] = None
+
+
+class IFCSpaceMatch(IFCSpaceResponse):
+    """Schema for a space found by a spatial query"""
+    distance: Optional[float] = None  # meters to the space's box, for nearest-space queries
+
+
+class IFCSpaceQueryResponse(BaseModel):
+    """Schema for spatial query results"""
+    spaces: List[IFCSpaceMatch]
+    total: int
+
+
+class IFCHeatmapResponse(BaseModel):
+    """Schema for a building heatmap: per-space values as parallel arrays"""
+    ifc_file_id: int
+    sensor_type: str
+    space_ids: List[int]
+    values: List[float]  # mean latest value of the space's sensors
+    sensor_counts: List[int]
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    updated_at: Optional[datetime] = None  # newest reading included
+    generated_at: datetime
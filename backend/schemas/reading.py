@@ -33,6 +33,36 @@ class ReadingResponse(ReadingBase):
 class ReadingListResponse(BaseModel):
     """Schema for reading list response"""
     readings: List[ReadingResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
     size: int
+    next_cursor: Optional[str] = None
+
+
+class ReadingBulkError(BaseModel):
+    """Schema for a rejected row in a bulk ingestion request"""
+    index: int
+    error: str
+
+
+class ReadingBulkResponse(BaseModel):
+    """Schema for bulk ingestion response"""
+    accepted: int
+    rejected: int
+    errors: List[ReadingBulkError] = []
+
+
+class ReadingAggregateResponse(BaseModel):
+    """Schema for time-bucketed readings; each series is parallel to ``timestamps``"""
+    sensor_id: int
+    start: datetime
+    end: datetime
+    bucket: str
+    bucket_seconds: int
+    timestamps: List[datetime]
+    avg: Optional[List[Optional[float]]] = None
+    min: Optional[List[Optional[float]]] = None
+    max: Optional[List[Optional[float]]] = None
+    count: Optional[List[int]] = None
+    sum: Optional[List[Optional[float]]] = None
@@ -17,6 +17,11 @@ class SensorBase(BaseModel):
     model: Optional[str] = Field(None, max_length=100)
     manufacturer: Optional[str] = Field(None, max_length=100)
     serial_number: Optional[str] = Field(None, max_length=100)
+    ifc_file_id: Optional[int] = None
+    x_coordinate: Optional[float] = None
+    y_coordinate: Optional[float] = None
+    z_coordinate: Optional[float] = None
+    ifc_space_id: Optional[int] = None
     min_value: Optional[float] = None
     max_value: Optional[float] = None
     unit: Optional[str] = Field(None, max_length=20)
@@ -42,6 +47,11 @@ class SensorUpdate(BaseModel):
     model: Optional[str] = Field(None, max_length=100)
     manufacturer: Optional[str] = Field(None, max_length=100)
     serial_number: Optional[str] = Field(None, max_length=100)
+    ifc_file_id: Optional[int] = None
+    x_coordinate: Optional[float] = None
+    y_coordinate: Optional[float] = None
+    z_coordinate: Optional[float] = None
+    ifc_space_id: Optional[int] = None
     min_value: Optional[float] = None
     max_value: Optional[float] = None
     unit: Optional[str] = Field(None, max_length=20)
@@ -68,6 +78,8 @@ class SensorResponse(SensorBase):
 class SensorListResponse(BaseModel):
     """Schema for sensor list response"""
     sensors: List[SensorResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
     size: int
+    next_cursor: Optional[str] = None
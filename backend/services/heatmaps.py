@@ -0,0 +1,138 @@
+"""
+Per-space sensor values of IFC files for building heatmaps
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import settings
+from backend.models.sensor import Sensor
+from backend.models.sensor_latest import SensorLatestReading
+
+
+async def build_heatmap(db: AsyncSession, file_id: int, sensor_type: str) -> Dict:
+    """Latest values of a file's active sensors of one type, averaged per space.
+
+    One grouped join of ``sensors`` with the ``sensor_latest`` table. The
+    result is columnar: ``space_ids`` (ascending) with the matching
+    ``values`` and ``sensor_counts``; spaces without a valid reading are
+    left out.
+    """
+    rows = (await db.execute(
+        select(
+            Sensor.ifc_space_id,
+            func.avg(SensorLatestReading.value).label("value"),
+            func.count().label("sensors"),
+            func.max(SensorLatestReading.timestamp).label("timestamp")
+        )
+        .join(SensorLatestReading, SensorLatestReading.sensor_id == Sensor.id)
+        .where(
+            Sensor.ifc_file_id == file_id,
+            Sensor.sensor_type == sensor_type,
+            Sensor.ifc_space_id.is_not(None),
+            Sensor.is_active.is_(True),
+            SensorLatestReading.is_valid == 1
+        )
+        .group_by(Sensor.ifc_space_id)
+        .order_by(Sensor.ifc_space_id)
+    )).all()
+    values = [row.value for row in rows]
+    return {
+        "ifc_file_id": file_id,
+        "sensor_type": sensor_type,
+        "space_ids": [row.ifc_space_id for row in rows],
+        "values": values,
+        "sensor_counts": [row.sensors for row in rows],
+        "min_value": min(values) if values else None,
+        "max_value": max(values) if values else None,
+        "updated_at": max(row.timestamp for row in rows).isoformat() if rows else None,
+        "generated_at": datetime.utcnow().isoformat(),
+    }
+
+
+class HeatmapCache:
+    """Serialized heatmaps keyed by (file id, sensor type), kept ``ttl`` seconds, LRU beyond ``max_size``.
+
+    Every dashboard polling a building gets the same JSON bytes until they
+    expire, so the aggregate query runs at most once per TTL per heatmap
+    however many clients refresh; concurrent misses for the same heatmap
+    wait for one build, while misses for other heatmaps build in parallel.
+    A TTL of 0 disables caching.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None, clock=time.monotonic):
+        self._ttl = ttl
+        self._max_size = max_size
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[bytes, float]]" = OrderedDict()
+        # Per-heatmap build lock and the number of requests holding or awaiting it
+        self._locks: Dict[Tuple[int, str], List] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self) -> float:
+        return settings.IFC_HEATMAP_TTL if self._ttl is None else self._ttl
+
+    @property
+    def max_size(self) -> int:
+        return settings.IFC_HEATMAP_CACHE_SIZE if self._max_size is None else self._max_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cached(self, file_id: int, sensor_type: str) -> Optional[bytes]:
+        """Heatmap of a file as JSON if a fresh one is cached"""
+        key = (file_id, sensor_type)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= self.clock():
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    async def get(self, db: AsyncSession, file_id: int, sensor_type: str) -> bytes:
+        """Heatmap of a file as JSON, from the cache while fresh"""
+        payload = self.cached(file_id, sensor_type)
+        if payload is not None:
+            return payload
+        key = (file_id, sensor_type)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = [asyncio.Lock(), 0]
+        lock[1] += 1
+        try:
+            async with lock[0]:
+                payload = self.cached(file_id, sensor_type)
+                if payload is not None:
+                    return payload
+                self.misses += 1
+                payload = json.dumps(await build_heatmap(db, file_id, sensor_type), separators=(",", ":")).encode()
+                if self.ttl > 0 and self.max_size > 0:
+                    self._entries[key] = (payload, self.clock() + self.ttl)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                return payload
+        finally:
+            lock[1] -= 1
+            if not lock[1]:
+                del self._locks[key]
+
+    def invalidate(self, file_id: int):
+        """Forget every heatmap of a file"""
+        for key in [key for key in self._entries if key[0] == file_id]:
+            del self._entries[key]
+
+    def clear(self):
+        """Forget every heatmap"""
+        self._entries.clear()
+
+
+# Global heatmap cache instance
+heatmaps = HeatmapCache()
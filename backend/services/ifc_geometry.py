@@ -0,0 +1,138 @@
+"""
+Compact binary geometry of IFC spaces for the 3D viewer
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from backend.core.database import SessionLocal
+from backend.models.ifc_file import IFCFile
+from backend.models.ifc_space import IFCSpace
+
+# Artifact layout (gzip-compressed):
+#   GEOMETRY_MAGIC, uint32 little-endian header length, JSON header,
+#   zero padding to a multiple of 4 bytes, then the columns back to back,
+#   each ``count`` values of the dtype given in the header. Strings are in
+#   the header; missing numbers are NaN.
+GEOMETRY_MAGIC = b"IFCGEOM1"
+GEOMETRY_SUFFIX = ".geom.gz"
+GEOMETRY_MEDIA_TYPE = "application/x-ifc-geometry"
+
+# (column in the artifact, IFCSpace attribute, dtype)
+NUMERIC_COLUMNS = (
+    ("id", "id", "<i4"),
+    ("x", "x_coordinate", "<f4"),
+    ("y", "y_coordinate", "<f4"),
+    ("z", "z_coordinate", "<f4"),
+    ("min_x", "bbox_min_x", "<f4"),
+    ("min_y", "bbox_min_y", "<f4"),
+    ("min_z", "bbox_min_z", "<f4"),
+    ("max_x", "bbox_max_x", "<f4"),
+    ("max_y", "bbox_max_y", "<f4"),
+    ("max_z", "bbox_max_z", "<f4"),
+    ("area", "area", "<f4"),
+    ("volume", "volume", "<f4"),
+    ("height", "height", "<f4"),
+    ("level_elevation", "level_elevation", "<f4"),
+)
+STRING_COLUMNS = ("name", "space_type", "level_name")
+
+GEOMETRY_COLUMNS = [getattr(IFCSpace, attribute) for _, attribute, _ in NUMERIC_COLUMNS] + [
+    getattr(IFCSpace, attribute) for attribute in STRING_COLUMNS
+]
+
+
+def encode_geometry(rows: List[Any]) -> bytes:
+    """Gzipped artifact of rows of the GEOMETRY_COLUMNS, in that order"""
+    columns = list(zip(*rows)) or [()] * len(GEOMETRY_COLUMNS)
+    numeric, strings = columns[:len(NUMERIC_COLUMNS)], columns[len(NUMERIC_COLUMNS):]
+    header = json.dumps({
+        "count": len(rows),
+        "columns": [[column, dtype] for column, _, dtype in NUMERIC_COLUMNS],
+        "strings": {attribute: list(values) for attribute, values in zip(STRING_COLUMNS, strings)},
+    }, separators=(",", ":")).encode("utf-8")
+    parts = [GEOMETRY_MAGIC, struct.pack("<I", len(header)), header, b"\0" * (-len(header) % 4)]
+    for (_, _, dtype), values in zip(NUMERIC_COLUMNS, numeric):
+        # None becomes NaN on the way through float64
+        parts.append(np.array(values, dtype=np.float64).astype(dtype).tobytes())
+    # mtime=0 keeps the output, and so the ETag, a function of the spaces alone
+    return gzip.compress(b"".join(parts), compresslevel=6, mtime=0)
+
+
+def decode_geometry(data: bytes) -> Dict[str, Any]:
+    """Columns of an artifact (gzipped or not): numpy arrays, and lists for strings"""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    if data[:len(GEOMETRY_MAGIC)] != GEOMETRY_MAGIC:
+        raise ValueError("Not an IFC geometry artifact")
+    offset = len(GEOMETRY_MAGIC)
+    (header_size,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    header = json.loads(data[offset:offset + header_size])
+    offset += header_size + (-header_size % 4)
+    count = header["count"]
+    columns: Dict[str, Any] = dict(header["strings"])
+    for column, dtype in header["columns"]:
+        columns[column] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += count * np.dtype(dtype).itemsize
+    return columns
+
+
+def geometry_path(directory: str, file_id: int, etag: str) -> str:
+    """Location of an artifact; content-addressed so a new one never overwrites the one being served"""
+    return os.path.join(directory, f"{file_id}.{etag}{GEOMETRY_SUFFIX}")
+
+
+def write_geometry(db: Session, file_id: int, directory: str) -> str:
+    """Build the artifact of a file's spaces as seen by ``db`` and write it; returns its ETag"""
+    rows = db.execute(
+        select(*GEOMETRY_COLUMNS).where(IFCSpace.ifc_file_id == file_id).order_by(IFCSpace.id)
+    ).all()
+    data = encode_geometry(rows)
+    etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+    path = geometry_path(directory, file_id, etag)
+    if not os.path.exists(path):
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return etag
+
+
+def rebuild_geometry(file_id: int) -> Optional[str]:
+    """Write a file's artifact again, e.g. after the upload disk was reset; returns its ETag"""
+    db = SessionLocal()
+    try:
+        ifc_file = db.get(IFCFile, file_id)
+        if ifc_file is None:
+            return None
+        directory = os.path.dirname(ifc_file.file_path)
+        etag = write_geometry(db, file_id, directory)
+        if etag != ifc_file.geometry_etag:
+            previous_etag = ifc_file.geometry_etag
+            ifc_file.geometry_etag = etag
+            db.commit()
+            remove_geometry(directory, file_id, previous_etag)
+        return etag
+    finally:
+        db.close()
+
+
+def remove_geometry(directory: str, file_id: int, etag: Optional[str]):
+    """Delete an artifact if it exists"""
+    if etag:
+        path = geometry_path(directory, file_id, etag)
+        if os.path.exists(path):
+            os.remove(path)
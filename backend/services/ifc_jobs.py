@@ -0,0 +1,348 @@
+"""
+Database-backed job queue for IFC file processing
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Optional, Set
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal, SessionLocal
+from backend.models.ifc_file import IFCFile
+from backend.models.ifc_job import IFCJob, IFCJobStatus
+from backend.services.heatmaps import heatmaps
+from backend.services.sensor_spaces import assign_file_sensors
+from backend.services.space_index import space_indexes
+
+logger = logging.getLogger(__name__)
+
+async def enqueue_job(
+    db: AsyncSession,
+    ifc_file: IFCFile,
+    requested_by: Optional[int] = None,
+    force: bool = False
+) -> IFCJob:
+    """Queue processing of ``ifc_file`` unless a job for it is already queued.
+
+    A queued job reads the file when it starts, so it covers any change made
+    before then; a running one may not, so it does not count. Jobs of one
+    file never run concurrently (see ``_claim_next``). With ``force`` the
+    file is processed even if it is unchanged since it was last processed.
+    The job is added to ``db`` and committed with the caller's changes.
+    """
+    job = await db.scalar(
+        select(IFCJob)
+        .where(IFCJob.ifc_file_id == ifc_file.id, IFCJob.status == IFCJobStatus.QUEUED)
+        .order_by(IFCJob.id.desc())
+        .limit(1)
+    )
+    if job is None:
+        job = IFCJob(
+            ifc_file_id=ifc_file.id,
+            status=IFCJobStatus.QUEUED,
+            progress=0.0,
+            force=force,
+            requested_by=requested_by
+        )
+        db.add(job)
+        ifc_file.processing_status = "pending"
+        ifc_file.processing_error = None
+    elif force:
+        job.force = True
+    await db.commit()
+    await db.refresh(job)
+    ifc_job_runner.wake()
+    return job
+
+
+def _send_heartbeats(job_id: int, worker_id: Optional[str], stop: threading.Event):
+    """Refresh a job's heartbeat every ``IFC_JOB_HEARTBEAT_INTERVAL`` seconds until ``stop`` is set.
+
+    Runs in a thread beside the processor, so a long parse or insert keeps
+    its job alive between progress reports. Stops once the job is no longer
+    running under ``worker_id``.
+    """
+    while not stop.wait(settings.IFC_JOB_HEARTBEAT_INTERVAL):
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(IFCJob)
+                .where(IFCJob.id == job_id, IFCJob.status == IFCJobStatus.RUNNING, IFCJob.worker_id == worker_id)
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            db.commit()
+            if result.rowcount == 0:
+                return
+        except Exception as e:
+            logger.warning(f"Could not send heartbeat of IFC job {job_id}: {e}")
+        finally:
+            db.close()
+
+
+def run_job(job_id: int) -> Optional[int]:
+    """Process one claimed job; runs inside a worker process.
+
+    Progress and the final status are written to the job row through a
+    session of its own, separate from the one the processor uses, and a
+    heartbeat thread keeps the job alive while it runs. Returns the IFC
+    file id if the job completed.
+    """
+    from backend.services.ifc_processor import IFCProcessor
+
+    db = SessionLocal()
+    stop_heartbeats = threading.Event()
+    heartbeats = None
+    try:
+        job = db.get(IFCJob, job_id)
+        if job is None:
+            return
+
+        heartbeats = threading.Thread(
+            target=_send_heartbeats, args=(job_id, job.worker_id, stop_heartbeats),
+            name=f"ifc-job-{job_id}-heartbeat", daemon=True
+        )
+        heartbeats.start()
+
+        def report(stage: str, fraction: float):
+            job.stage = stage
+            job.progress = fraction
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+
+        try:
+            IFCProcessor().process_ifc_file(job.ifc_file_id, progress=report, force=bool(job.force))
+        except Exception as e:
+            job.status = IFCJobStatus.FAILED
+            job.error = str(e)
+        else:
+            job.status = IFCJobStatus.COMPLETED
+            job.stage = "done"
+            job.progress = 1.0
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        return job.ifc_file_id if job.status == IFCJobStatus.COMPLETED else None
+    finally:
+        stop_heartbeats.set()
+        if heartbeats is not None:
+            heartbeats.join()
+        db.close()
+
+
+class IFCJobRunner:
+    """Claims queued jobs and runs them on a pool of worker processes.
+
+    Every API process may run a runner: a job is claimed with a
+    conditional UPDATE, so only one runner gets it. Jobs whose worker
+    stopped sending heartbeats for ``IFC_JOB_TIMEOUT`` seconds (a crashed
+    or killed process) are queued again, up to ``IFC_JOB_MAX_ATTEMPTS``
+    attempts, unless their worker is known to be still alive.
+    """
+
+    def __init__(self):
+        self.is_running = False
+        self.task = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self._running_jobs: Set[int] = set()
+        self._wake = asyncio.Event()
+
+    @property
+    def workers(self) -> int:
+        return settings.IFC_WORKER_PROCESSES
+
+    async def start(self):
+        """Start claiming jobs"""
+        if self.is_running or self.workers <= 0:
+            return
+        self.is_running = True
+        self.task = asyncio.create_task(self._run_loop())
+        logger.info(f"IFC job runner started with {self.workers} worker processes")
+
+    async def stop(self):
+        """Stop claiming jobs; running jobs are left to finish or time out"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def wake(self):
+        """Look for queued jobs now instead of at the next poll"""
+        self._wake.set()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned, not forked, so workers do not inherit the event loop or open connections
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _run_loop(self):
+        """Fill free worker slots with queued jobs, then wait for a slot or a wakeup"""
+        while self.is_running:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self._requeue_stale(db)
+                    while len(self._in_flight) < self.workers:
+                        job_id = await self._claim_next(db)
+                        if job_id is None:
+                            break
+                        task = asyncio.create_task(self._execute(job_id))
+                        self._in_flight.add(task)
+                        task.add_done_callback(self._on_done)
+            except Exception as e:
+                logger.error(f"Error in IFC job loop: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.IFC_JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _on_done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self.wake()
+
+    async def _claim_next(self, db: AsyncSession) -> Optional[int]:
+        """Atomically move the oldest queued job to running; returns its id.
+
+        Jobs of files that already have a running job wait for it to finish.
+        """
+        running = aliased(IFCJob)
+        while True:
+            job_id = await db.scalar(
+                select(IFCJob.id)
+                .where(
+                    IFCJob.status == IFCJobStatus.QUEUED,
+                    ~exists().where(running.ifc_file_id == IFCJob.ifc_file_id, running.status == IFCJobStatus.RUNNING)
+                )
+                .order_by(IFCJob.id)
+                .limit(1)
+            )
+            if job_id is None:
+                return None
+            now = datetime.utcnow()
+            result = await db.execute(
+                update(IFCJob)
+                .where(IFCJob.id == job_id, IFCJob.status == IFCJobStatus.QUEUED)
+                .values(
+                    status=IFCJobStatus.RUNNING,
+                    worker_id=self.worker_id,
+                    attempts=IFCJob.attempts + 1,
+                    started_at=now,
+                    heartbeat_at=now,
+                    stage="starting",
+                    error=None
+                )
+            )
+            await db.commit()
+            if result.rowcount == 1:
+                return job_id
+            # Another runner claimed it first
+
+    def _worker_alive(self, worker_id: Optional[str], job_id: int) -> bool:
+        """Whether the runner that claimed a job is known to be still running it.
+
+        This runner knows its own jobs; another runner on this host is alive
+        while its process exists. Runners on other hosts cannot be checked,
+        so their jobs are judged by the heartbeat alone.
+        """
+        if worker_id == self.worker_id:
+            return job_id in self._running_jobs
+        host, _, pid = (worker_id or "").rpartition(":")
+        # os.kill(pid, 0) would terminate the process on Windows
+        if host != socket.gethostname() or not pid.isdigit() or os.name == "nt":
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    async def _requeue_stale(self, db: AsyncSession):
+        """Retry or fail running jobs whose worker stopped sending heartbeats and is gone"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.IFC_JOB_TIMEOUT)
+        stale = (IFCJob.status == IFCJobStatus.RUNNING, IFCJob.heartbeat_at < cutoff)
+        rows = (await db.execute(select(IFCJob.id, IFCJob.worker_id).where(*stale))).all()
+        dead = [row.id for row in rows if not self._worker_alive(row.worker_id, row.id)]
+        if len(dead) < len(rows):
+            logger.warning(f"{len(rows) - len(dead)} IFC jobs missed heartbeats but their workers are alive")
+        if not dead:
+            return
+        # Conditional on the job still being stale, in case a heartbeat arrived meanwhile
+        retried = await db.execute(
+            update(IFCJob)
+            .where(IFCJob.id.in_(dead), *stale, IFCJob.attempts < settings.IFC_JOB_MAX_ATTEMPTS)
+            .values(status=IFCJobStatus.QUEUED, worker_id=None)
+        )
+        failed = await db.execute(
+            update(IFCJob)
+            .where(IFCJob.id.in_(dead), *stale)
+            .values(status=IFCJobStatus.FAILED, error="Worker stopped responding", finished_at=datetime.utcnow())
+        )
+        await db.commit()
+        if retried.rowcount or failed.rowcount:
+            logger.warning(f"Requeued {retried.rowcount} and failed {failed.rowcount} stalled IFC jobs")
+
+    async def _execute(self, job_id: int):
+        """Run a claimed job in the process pool"""
+        loop = asyncio.get_running_loop()
+        self._running_jobs.add(job_id)
+        try:
+            file_id = await loop.run_in_executor(self._get_pool(), run_job, job_id)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._pool = None
+            logger.error(f"IFC job {job_id} crashed: {e}")
+            await self._fail(job_id, f"Worker process failed: {e}")
+            return
+        finally:
+            self._running_jobs.discard(job_id)
+        if file_id is not None:
+            # Build the spatial index now rather than on the first spatial query,
+            # and move sensors to the spaces now at their coordinates
+            try:
+                async with AsyncSessionLocal() as db:
+                    await space_indexes.get(db, file_id)
+                    if await assign_file_sensors(db, file_id):
+                        await db.commit()
+                heatmaps.invalidate(file_id)
+            except Exception as e:
+                logger.warning(f"Could not update spatial index and sensors of IFC file {file_id}: {e}")
+
+    async def _fail(self, job_id: int, error: str):
+        async with AsyncSessionLocal() as db:
+            job = await db.get(IFCJob, job_id)
+            if job is None:
+                return
+            job.status = IFCJobStatus.FAILED
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            ifc_file = await db.get(IFCFile, job.ifc_file_id)
+            if ifc_file is not None:
+                ifc_file.processing_status = "failed"
+                ifc_file.processing_error = error
+            await db.commit()
+
+
+# Global IFC job runner instance
+ifc_job_runner = IFCJobRunner()
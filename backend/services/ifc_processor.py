@@ -5,14 +5,42 @@ IFC file processing service
 import os
 import json
 import logging
-from typing import Dict, List, Any
+import re
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.orm import Session
+from backend.core.config import settings
 from backend.core.database import SessionLocal
+from backend.ifc.fingerprint import Fingerprinter
+from backend.ifc.spatial import SpatialModel
+from backend.ifc.step import Entity, StepFile, TypedValue, decode_string
 from backend.models.ifc_file import IFCFile
 from backend.models.ifc_space import IFCSpace
+from backend.models.sensor import Sensor
+from backend.services.ifc_geometry import remove_geometry, write_geometry
+from backend.services.ifc_storage import hash_file
 
 logger = logging.getLogger(__name__)
 
+# First attribute of an entity when it is a string, as for an IfcRoot's GlobalId
+_GLOBAL_ID = re.compile(rb"[A-Za-z0-9_]+\s*\(\s*'((?:[^']|'')*)'")
+
+
+# Space data stored in IFCSpace columns
+SPACE_FIELDS = (
+    "ifc_id", "fingerprint", "name", "long_name", "description", "space_type", "usage_type",
+    "area", "volume", "height", "x_coordinate", "y_coordinate", "z_coordinate",
+    "bbox_min_x", "bbox_min_y", "bbox_min_z", "bbox_max_x", "bbox_max_y", "bbox_max_z",
+    "level_name", "level_elevation",
+)
+
+# Rows per multi-row statement when saving spaces
+SPACE_WRITE_CHUNK_SIZE = 1000
+
+# Part of every space fingerprint; bump it when the extracted space data
+# changes so that stored spaces are rewritten on their next processing
+SPACE_EXTRACTION_VERSION = "1"
+
 
 class IFCProcessor:
     """Service for processing IFC files"""
@@ -20,264 +48,319 @@ class IFCProcessor:
     def __init__(self):
         self.supported_versions = ["IFC2x3", "IFC4", "IFC4x1"]
     
-    async def process_ifc_file(self, file_id: int, db: Session = None):
-        """Process IFC file and extract building information"""
-        if not db:
+    def process_ifc_file(
+        self,
+        file_id: int,
+        db: Session = None,
+        progress: Optional[Callable[[str, float], None]] = None,
+        force: bool = False
+    ):
+        """Process IFC file and extract building information.
+
+        Processing is incremental: a file whose content hash matches the one
+        its spaces were extracted from is skipped, and otherwise only spaces
+        whose fingerprint changed are extracted and written, matched to the
+        stored ones by GlobalId. ``force`` reprocesses everything.
+        ``progress(stage, fraction)`` is called as processing advances.
+        """
+        report = progress or (lambda stage, fraction: None)
+        owns_session = db is None
+        if owns_session:
             db = SessionLocal()
         
+        ifc_file = None
+        geometry_etag = None
         try:
             ifc_file = db.query(IFCFile).filter(IFCFile.id == file_id).first()
             if not ifc_file:
                 raise ValueError(f"IFC file {file_id} not found")
             
+            # Skip a file identical to the one the stored spaces came from
+            content_hash = ifc_file.file_hash or hash_file(ifc_file.file_path)
+            ifc_file.file_hash = content_hash
+            if not force and ifc_file.is_processed and ifc_file.processed_hash == content_hash:
+                ifc_file.processing_status = "completed"
+                if not ifc_file.geometry_etag:
+                    ifc_file.geometry_etag = write_geometry(db, file_id, os.path.dirname(ifc_file.file_path))
+                db.commit()
+                logger.info(f"IFC file {file_id} is unchanged since it was processed; skipping")
+                return
+            
             # Update processing status
             ifc_file.processing_status = "processing"
             db.commit()
             
+            # Fingerprints of the stored spaces (the first row of each GlobalId)
+            stored = db.execute(
+                select(IFCSpace.id, IFCSpace.ifc_id, IFCSpace.fingerprint)
+                .where(IFCSpace.ifc_file_id == file_id)
+                .order_by(IFCSpace.id)
+            ).all()
+            known = {}
+            if not force:
+                for row in reversed(stored):
+                    known[row.ifc_id] = row.fingerprint
+            
             # Parse IFC file
-            ifc_data = await self._parse_ifc_file(ifc_file.file_path)
+            report("parsing", 0.05)
+            file_path = ifc_file.file_path
+            ifc_data = self._parse_ifc_file(
+                file_path, known,
+                # A revision uploaded meanwhile replaces the file; its index would be an orphan
+                keep_index=lambda: db.scalar(select(IFCFile.file_path).where(IFCFile.id == file_id)) == file_path
+            )
             
             # Extract metadata
-            metadata = await self._extract_metadata(ifc_data)
+            report("extracting", 0.5)
+            metadata = self._extract_metadata(ifc_data)
             
             # Update file metadata
             ifc_file.project_name = metadata.get("project_name")
             ifc_file.project_description = metadata.get("project_description")
             ifc_file.ifc_version = metadata.get("ifc_version")
-            ifc_file.building_width = metadata.get("building_width")
-            ifc_file.building_height = metadata.get("building_height")
-            ifc_file.building_depth = metadata.get("building_depth")
             
-            # Extract spaces
-            spaces = await self._extract_spaces(ifc_data)
+            # Save spaces; committed below together with the file's status
+            report("saving", 0.7)
+            inserted, updated, removed = self._write_spaces(
+                db, file_id, ifc_data["spaces"], ifc_data["unchanged"], stored
+            )
+            if inserted or updated or removed:
+                ifc_file.spaces_version = (ifc_file.spaces_version or 0) + 1
+            
+            (ifc_file.building_width,
+             ifc_file.building_depth,
+             ifc_file.building_height) = self._building_dimensions(db, file_id)
             
-            # Save spaces to database
-            for space_data in spaces:
-                space = IFCSpace(
-                    ifc_file_id=file_id,
-                    ifc_id=space_data.get("ifc_id"),
-                    name=space_data.get("name"),
-                    long_name=space_data.get("long_name"),
-                    description=space_data.get("description"),
-                    space_type=space_data.get("space_type"),
-                    usage_type=space_data.get("usage_type"),
-                    area=space_data.get("area"),
-                    volume=space_data.get("volume"),
-                    height=space_data.get("height"),
-                    x_coordinate=space_data.get("x_coordinate"),
-                    y_coordinate=space_data.get("y_coordinate"),
-                    z_coordinate=space_data.get("z_coordinate"),
-                    level_name=space_data.get("level_name"),
-                    level_elevation=space_data.get("level_elevation")
-                )
-                db.add(space)
+            # Viewer geometry; the artifact it replaces is removed once this commits
+            previous_etag = ifc_file.geometry_etag
+            geometry_dir = os.path.dirname(ifc_file.file_path)
+            if inserted or updated or removed or not previous_etag:
+                geometry_etag = write_geometry(db, file_id, geometry_dir)
+                ifc_file.geometry_etag = geometry_etag
             
             # Mark as processed
             ifc_file.processing_status = "completed"
             ifc_file.is_processed = True
+            ifc_file.processed_hash = content_hash
             db.commit()
+            if ifc_file.geometry_etag != previous_etag:
+                remove_geometry(geometry_dir, file_id, previous_etag)
             
-            logger.info(f"Successfully processed IFC file {file_id}")
+            logger.info(
+                f"Successfully processed IFC file {file_id}: {inserted} spaces added, {updated} updated, "
+                f"{len(ifc_data['unchanged'])} unchanged, {removed} removed"
+            )
             
         except Exception as e:
             logger.error(f"Error processing IFC file {file_id}: {str(e)}")
-            ifc_file.processing_status = "failed"
-            ifc_file.processing_error = str(e)
-            db.commit()
+            db.rollback()
+            if ifc_file is not None and geometry_etag is not None and geometry_etag != ifc_file.geometry_etag:
+                remove_geometry(os.path.dirname(ifc_file.file_path), file_id, geometry_etag)
+            if ifc_file is not None:
+                ifc_file.processing_status = "failed"
+                ifc_file.processing_error = str(e)
+                db.commit()
             raise
         finally:
-            if not db:
+            if owns_session:
                 db.close()
     
-    async def _parse_ifc_file(self, file_path: str) -> Dict[str, Any]:
-        """Parse IFC file and return structured data"""
+    def _write_spaces(
+        self,
+        db: Session,
+        file_id: int,
+        spaces: List[Dict[str, Any]],
+        unchanged: List[str],
+        stored: List[Any]
+    ) -> Tuple[int, int, int]:
+        """Bring the file's stored spaces in line with the model; returns (inserted, updated, removed).
+
+        ``stored`` are the (id, ifc_id) rows before processing. Spaces are
+        matched by GlobalId: changed ones are updated in place, new ones
+        inserted, and rows of spaces no longer in the model (or duplicating
+        another row's GlobalId) deleted. Everything goes through multi-row
+        statements of up to SPACE_WRITE_CHUNK_SIZE rows, without ORM
+        objects, in the caller's transaction: until it commits, readers see
+        the previous spaces, and a rollback leaves them untouched.
+        """
+        row_ids: Dict[str, int] = {}
+        stale: List[int] = []
+        for row in stored:
+            if row.ifc_id in row_ids:
+                stale.append(row.id)
+            else:
+                row_ids[row.ifc_id] = row.id
+        
+        inserts, updates = [], []
+        for space_data in spaces:
+            values = {field: space_data.get(field) for field in SPACE_FIELDS}
+            row_id = row_ids.pop(values["ifc_id"], None)
+            if row_id is None:
+                values["ifc_file_id"] = file_id
+                inserts.append(values)
+            else:
+                values["id"] = row_id
+                updates.append(values)
+        for ifc_id in unchanged:
+            row_ids.pop(ifc_id, None)
+        stale.extend(row_ids.values())
+        
+        for start in range(0, len(stale), SPACE_WRITE_CHUNK_SIZE):
+            # Sensors in removed spaces are reassigned once the file is processed
+            db.execute(
+                update(Sensor)
+                .where(Sensor.ifc_space_id.in_(stale[start:start + SPACE_WRITE_CHUNK_SIZE]))
+                .values(ifc_space_id=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(
+                delete(IFCSpace)
+                .where(IFCSpace.id.in_(stale[start:start + SPACE_WRITE_CHUNK_SIZE]))
+                .execution_options(synchronize_session=False)
+            )
+        for start in range(0, len(updates), SPACE_WRITE_CHUNK_SIZE):
+            db.execute(update(IFCSpace), updates[start:start + SPACE_WRITE_CHUNK_SIZE])
+        for start in range(0, len(inserts), SPACE_WRITE_CHUNK_SIZE):
+            db.execute(insert(IFCSpace), inserts[start:start + SPACE_WRITE_CHUNK_SIZE])
+        return len(inserts), len(updates), len(stale)
+    
+    def _parse_ifc_file(self, file_path: str, known: Optional[Dict[str, str]] = None,
+                        keep_index: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Parse IFC file and return structured data.
+
+        ``known`` maps GlobalIds to stored space fingerprints; spaces that
+        still match are listed under "unchanged" instead of being extracted.
+        ``keep_index`` is passed on to StepFile.
+        """
         try:
-            # This is a simplified IFC parser
-            # In a real implementation, you would use a proper IFC library like ifcopenshell
-            
-            ifc_data = {
-                "header": {},
-                "entities": {},
-                "spaces": [],
-                "building_elements": []
-            }
-            
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Parse header
-            ifc_data["header"] = await self._parse_header(content)
-            
-            # Extract basic entities (simplified parsing)
-            ifc_data["entities"] = await self._parse_entities(content)
-            
-            # Extract spaces
-            ifc_data["spaces"] = await self._extract_spaces_from_content(content)
-            
-            return ifc_data
+            # One pass over the memory-mapped file (split across processes
+            # for large files) indexes every entity; only the entities used
+            # below are decoded
+            with StepFile(file_path, workers=settings.IFC_PARSE_WORKERS, keep_index=keep_index) as step:
+                spaces, unchanged = self._parse_spaces(step, known or {})
+                return {
+                    "header": self._parse_header(step),
+                    "project": self._parse_project(step),
+                    "entity_count": len(step),
+                    "spaces": spaces,
+                    "unchanged": unchanged,
+                    "building_elements": []
+                }
             
         except Exception as e:
             logger.error(f"Error parsing IFC file {file_path}: {str(e)}")
             raise
     
-    async def _parse_header(self, content: str) -> Dict[str, Any]:
-        """Parse IFC file header"""
-        header = {}
-        
-        lines = content.split('\n')
-        in_header = False
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('HEADER'):
-                in_header = True
-                continue
-            elif line.startswith('ENDSEC'):
-                break
-            elif in_header:
-                # Parse header properties (simplified)
-                if 'FILE_NAME' in line:
-                    header['file_name'] = self._extract_value(line)
-                elif 'FILE_DESCRIPTION' in line:
-                    header['file_description'] = self._extract_value(line)
-                elif 'FILE_SCHEMA' in line:
-                    header['file_schema'] = self._extract_value(line)
-        
-        return header
-    
-    async def _parse_entities(self, content: str) -> Dict[str, Any]:
-        """Parse IFC entities (simplified)"""
-        entities = {}
-        
-        # This is a very simplified parser
-        # Real IFC parsing would require a proper IFC library
-        
-        lines = content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#'):
-                # Extract entity ID and type
-                parts = line.split('=')
-                if len(parts) >= 2:
-                    entity_id = parts[0].strip('#')
-                    entity_def = parts[1].split('(')[0].strip()
-                    entities[entity_id] = {
-                        'type': entity_def,
-                        'raw': line
-                    }
-        
-        return entities
+    def _parse_header(self, step: StepFile) -> Dict[str, Any]:
+        """Read file name, description and schema from the STEP header"""
+        file_name = step.header.get("FILE_NAME") or [None]
+        description = step.header.get("FILE_DESCRIPTION") or [[]]
+        schema = step.header.get("FILE_SCHEMA") or [[]]
+        return {
+            "file_name": _text(file_name, 0),
+            "file_description": "; ".join(str(item) for item in _list(description, 0)),
+            "file_schema": ", ".join(str(item) for item in _list(schema, 0)),
+        }
     
-    async def _extract_spaces_from_content(self, content: str) -> List[Dict[str, Any]]:
-        """Extract spaces from IFC content"""
-        spaces = []
-        
-        # Find IFCSPACE entities
-        lines = content.split('\n')
-        for line in lines:
-            if 'IFCSPACE' in line:
-                space_data = await self._parse_space_entity(line)
-                if space_data:
-                    spaces.append(space_data)
-        
-        return spaces
+    def _parse_project(self, step: StepFile) -> Dict[str, Any]:
+        """Read name and description of the IfcProject, if any"""
+        project_ids = step.ids_of_type("IFCPROJECT")
+        if not project_ids:
+            return {}
+        args = step.entity(project_ids[0]).args
+        return {
+            "name": _text(args, 2),
+            "description": _text(args, 3),
+            "long_name": _text(args, 5),
+        }
     
-    async def _parse_space_entity(self, line: str) -> Dict[str, Any]:
-        """Parse individual IFCSPACE entity"""
-        try:
-            # This is a simplified parser
-            # Extract basic information from IFCSPACE entity
-            
-            space_data = {
-                'ifc_id': None,
-                'name': None,
-                'long_name': None,
-                'description': None,
-                'space_type': 'space',
-                'usage_type': None,
-                'area': None,
-                'volume': None,
-                'height': None,
-                'x_coordinate': None,
-                'y_coordinate': None,
-                'z_coordinate': None,
-                'level_name': None,
-                'level_elevation': None
-            }
-            
-            # Extract entity ID
-            if line.startswith('#'):
-                entity_id = line.split('=')[0].strip('#')
-                space_data['ifc_id'] = entity_id
-            
-            # This is where you would implement proper IFC parsing
-            # For now, we'll create some sample data
+    def _parse_spaces(self, step: StepFile, known: Dict[str, str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Extract the IfcSpaces whose fingerprint is not in ``known``; returns (spaces, unchanged GlobalIds)"""
+        model = SpatialModel(step)
+        fingerprints = Fingerprinter(step)
+        project_ids = step.ids_of_type("IFCPROJECT")
+        project = project_ids[0] if project_ids else None
+        spaces, unchanged = [], []
+        seen = set()
+        for position, entity_id in enumerate(step.ids_of_type("IFCSPACE")):
+            # Read just the GlobalId; the space is only decoded if it changed
+            match = _GLOBAL_ID.match(step.body(entity_id))
+            ifc_id = decode_string(match.group(1)) if match and match.group(1) else f"#{entity_id}"
+            if ifc_id in seen:
+                logger.warning(f"Skipping IfcSpace #{entity_id}: GlobalId {ifc_id} is used more than once")
+                continue
+            seen.add(ifc_id)
             
-            return space_data
+            # Covers the space with its placement chain and geometry, its
+            # quantity sets, its storey and the project (units)
+            fingerprint = fingerprints.of(
+                SPACE_EXTRACTION_VERSION, project, entity_id, model.storey_of(entity_id),
+                *model.quantity_sets.get(entity_id, ())
+            )
+            if known.get(ifc_id) == fingerprint:
+                unchanged.append(ifc_id)
+                continue
             
-        except Exception as e:
-            logger.error(f"Error parsing space entity: {str(e)}")
-            return None
+            space = self._parse_space_entity(step.entity(entity_id), model)
+            space["fingerprint"] = fingerprint
+            if not space["name"]:
+                space["name"] = f"Space {position + 1}"
+            spaces.append(space)
+        return spaces, unchanged
     
-    async def _extract_metadata(self, ifc_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _parse_space_entity(self, entity: Entity, model: SpatialModel) -> Dict[str, Any]:
+        """Map the attributes and resolved geometry of an IfcSpace to space data"""
+        # IfcSpace: GlobalId, OwnerHistory, Name, Description, ObjectType,
+        # ObjectPlacement, Representation, LongName, ...
+        args = entity.args
+        space = {
+            'ifc_id': _text(args, 0) or f"#{entity.id}",
+            'name': _text(args, 2),
+            'long_name': _text(args, 7),
+            'description': _text(args, 3),
+            'space_type': 'space',
+            'usage_type': _text(args, 4),
+        }
+        # Location, size, bounding box and level
+        space.update(model.space_geometry(entity.id, args))
+        return space
+    
+    def _extract_metadata(self, ifc_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract building metadata"""
         metadata = {}
         
-        # Extract from header
+        # Extract from the IfcProject, falling back to the header
         header = ifc_data.get("header", {})
-        metadata["project_name"] = header.get("file_name", "Unknown Project")
-        metadata["project_description"] = header.get("file_description", "")
-        metadata["ifc_version"] = header.get("file_schema", "Unknown")
-        
-        # Calculate building dimensions (simplified)
-        spaces = ifc_data.get("spaces", [])
-        if spaces:
-            # This would be calculated from actual space coordinates
-            metadata["building_width"] = 50.0  # meters
-            metadata["building_height"] = 10.0  # meters
-            metadata["building_depth"] = 30.0   # meters
+        project = ifc_data.get("project", {})
+        metadata["project_name"] = project.get("name") or header.get("file_name") or "Unknown Project"
+        metadata["project_description"] = project.get("description") or header.get("file_description", "")
+        metadata["ifc_version"] = header.get("file_schema") or "Unknown"
         
         return metadata
     
-    async def _extract_spaces(self, ifc_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Extract and format space data"""
-        spaces = []
-        
-        raw_spaces = ifc_data.get("spaces", [])
-        
-        for i, space in enumerate(raw_spaces):
-            # Enhance space data with calculated values
-            enhanced_space = space.copy()
-            
-            # Add calculated coordinates if not present
-            if not enhanced_space.get("x_coordinate"):
-                enhanced_space["x_coordinate"] = (i % 10) * 5.0  # Sample positioning
-            if not enhanced_space.get("y_coordinate"):
-                enhanced_space["y_coordinate"] = (i // 10) * 5.0
-            if not enhanced_space.get("z_coordinate"):
-                enhanced_space["z_coordinate"] = 0.0
-            
-            # Add calculated area if not present
-            if not enhanced_space.get("area"):
-                enhanced_space["area"] = 25.0  # Sample area
-            
-            # Add name if not present
-            if not enhanced_space.get("name"):
-                enhanced_space["name"] = f"Space {i+1}"
-            
-            spaces.append(enhanced_space)
-        
-        return spaces
-    
-    def _extract_value(self, line: str) -> str:
-        """Extract value from IFC property line"""
-        try:
-            # Simple value extraction (would need more sophisticated parsing)
-            if '(' in line and ')' in line:
-                start = line.find('(') + 1
-                end = line.rfind(')')
-                return line[start:end].strip("'\"")
-            return ""
-        except:
-            return ""
+    def _building_dimensions(self, db: Session, file_id: int) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        """Width (x), depth (y) and height (z) in meters of the box around the file's stored spaces.
+
+        Uses each space's bounding box, or its coordinates when it has none.
+        """
+        low = [func.min(func.coalesce(getattr(IFCSpace, f"bbox_min_{axis}"), getattr(IFCSpace, f"{axis}_coordinate")))
+               for axis in "xyz"]
+        high = [func.max(func.coalesce(getattr(IFCSpace, f"bbox_max_{axis}"), getattr(IFCSpace, f"{axis}_coordinate")))
+                for axis in "xyz"]
+        row = db.query(*low, *high).filter(IFCSpace.ifc_file_id == file_id).one()
+        return tuple(None if row[i] is None else row[i + 3] - row[i] for i in range(3))
+
+
+def _text(args: List[Any], position: int) -> Optional[str]:
+    """String attribute at ``position``, unwrapping typed values; None if unset"""
+    value = args[position] if position < len(args) else None
+    if isinstance(value, TypedValue):
+        value = value.value
+    return value if isinstance(value, str) and value else None
+
+
+def _list(args: List[Any], position: int) -> List[Any]:
+    """List attribute at ``position``; empty if unset"""
+    value = args[position] if position < len(args) else None
+    return value if isinstance(value, list) else []
+
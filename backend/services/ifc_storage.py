@@ -0,0 +1,86 @@
+"""
+Streaming storage of uploaded IFC files
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Bytes read from the upload and written to disk at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded the maximum allowed size"""
+
+
+class StoredUpload(NamedTuple):
+    """A finished upload in its final location"""
+    path: str
+    size: int
+    sha256: str
+
+
+def _write_chunk(out, digest, chunk: bytes):
+    out.write(chunk)
+    digest.update(chunk)
+
+
+def _finish(out, temp_path: str, final_path: str):
+    out.flush()
+    os.fsync(out.fileno())
+    out.close()
+    os.replace(temp_path, final_path)
+
+
+async def store_upload(
+    upload: UploadFile,
+    directory: str,
+    filename: str,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StoredUpload:
+    """Copy ``upload`` to ``directory/filename`` one chunk at a time.
+
+    The data goes to a temporary file in the same directory, is hashed as
+    it is written and is renamed into place only once complete, so readers
+    never see a partial file. Raises UploadTooLarge as soon as more than
+    ``max_size`` bytes have been received.
+    """
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLarge(f"Upload exceeds {max_size} bytes")
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(f"Upload exceeds {max_size} bytes")
+            await run_in_threadpool(_write_chunk, out, digest, chunk)
+
+        final_path = os.path.join(directory, filename)
+        await run_in_threadpool(_finish, out, temp_path, final_path)
+    except BaseException:
+        out.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return StoredUpload(path=final_path, size=size, sha256=digest.hexdigest())
+
+
+def hash_file(path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """SHA-256 of a stored file, read one chunk at a time"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
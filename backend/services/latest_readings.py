@@ -0,0 +1,122 @@
+"""
+Last-value table maintenance for sensor readings
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+from backend.models.reading import SensorReading
+from backend.models.sensor_latest import SensorLatestReading
+from backend.services.reading_rollups import UPSERT_CHUNK_SIZE, upsert
+
+logger = logging.getLogger(__name__)
+
+# Columns returned from reading inserts to feed the last-value table
+RETURNED_COLUMNS = (
+    SensorReading.id,
+    SensorReading.sensor_id,
+    SensorReading.value,
+    SensorReading.timestamp,
+    SensorReading.quality_score,
+    SensorReading.is_valid,
+    SensorReading.created_at,
+)
+
+
+async def insert_readings(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[Any]:
+    """Bulk insert readings and update ``sensor_latest``; returns the inserted rows"""
+    if not rows:
+        return []
+    result = await db.execute(
+        insert(SensorReading).returning(*RETURNED_COLUMNS),
+        rows
+    )
+    inserted = result.all()
+    await record_latest(db, inserted)
+    return inserted
+
+
+async def record_latest(db: AsyncSession, readings: List[Any]):
+    """Upsert the newest of ``readings`` per sensor into ``sensor_latest``.
+
+    ``readings`` are rows with the RETURNED_COLUMNS attributes. A stored
+    value is only replaced by a reading with a later (timestamp, id), so
+    backfilled history never overwrites the current value.
+    """
+    newest: Dict[int, Any] = {}
+    for reading in readings:
+        current = newest.get(reading.sensor_id)
+        if current is None or (reading.timestamp, reading.id) > (current.timestamp, current.id):
+            newest[reading.sensor_id] = reading
+    if not newest:
+        return
+
+    values = [
+        {
+            "sensor_id": reading.sensor_id,
+            "reading_id": reading.id,
+            "value": reading.value,
+            "timestamp": reading.timestamp,
+            "quality_score": reading.quality_score,
+            "is_valid": reading.is_valid,
+            "created_at": reading.created_at,
+        }
+        for reading in newest.values()
+    ]
+    stmt = upsert(db.bind.dialect.name, SensorLatestReading)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sensor_id"],
+        set_={
+            column: getattr(stmt.excluded, column)
+            for column in ("reading_id", "value", "timestamp", "quality_score", "is_valid", "created_at")
+        },
+        where=or_(
+            stmt.excluded.timestamp > SensorLatestReading.timestamp,
+            and_(
+                stmt.excluded.timestamp == SensorLatestReading.timestamp,
+                stmt.excluded.reading_id > SensorLatestReading.reading_id
+            )
+        )
+    )
+    for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        await db.execute(stmt, values[start:start + UPSERT_CHUNK_SIZE])
+
+
+async def get_latest(db: AsyncSession, sensor_ids: Optional[List[int]] = None) -> List[Any]:
+    """Latest reading of every sensor, or of ``sensor_ids``, by primary key lookup.
+
+    Returns plain rows rather than ORM objects; the dashboard polls this.
+    """
+    query = select(*SensorLatestReading.__table__.columns).order_by(SensorLatestReading.sensor_id)
+    if sensor_ids:
+        query = query.where(SensorLatestReading.sensor_id.in_(sensor_ids))
+    return (await db.execute(query)).all()
+
+
+async def rebuild_latest(db: AsyncSession):
+    """Populate ``sensor_latest`` from ``sensor_readings`` if it is empty.
+
+    Used once when upgrading a database that predates the table.
+    """
+    if await db.scalar(select(func.count()).select_from(SensorLatestReading)):
+        return
+    newest = (
+        select(SensorReading.sensor_id, func.max(SensorReading.timestamp).label("max_timestamp"))
+        .group_by(SensorReading.sensor_id)
+        .subquery()
+    )
+    readings = (await db.execute(
+        select(*RETURNED_COLUMNS).join(
+            newest,
+            and_(
+                SensorReading.sensor_id == newest.c.sensor_id,
+                SensorReading.timestamp == newest.c.max_timestamp
+            )
+        )
+    )).all()
+    await record_latest(db, readings)
+    await db.commit()
+    if readings:
+        logger.info(f"Initialized latest readings for {len(readings)} sensors")
@@ -4,17 +4,29 @@ Monitoring service for IFC system
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
-from backend.core.database import SessionLocal
+from typing import List, Dict, Any, Optional, Set
+import numpy as np
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.database import AsyncSessionLocal
 from backend.models.sensor import Sensor
-from backend.models.reading import SensorReading
 from backend.models.alert import Alert, AlertSeverity, AlertStatus
 from backend.core.config import settings
+from backend.drivers.base import SensorDriver
+from backend.drivers.registry import driver_registry
+from backend.services.latest_readings import insert_readings
+from backend.services.reading_rollups import reading_rollup_service
+from backend.services.retention_service import retention_service
+from backend.services.sensor_registry import sensor_registry
+from backend.services.sensor_scheduler import SensorScheduler
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of ids bound into a single IN (...) clause
+BULK_CHUNK_SIZE = 500
+
 
 class MonitoringService:
     """Service for monitoring sensors and processing alerts"""
@@ -22,6 +34,11 @@ class MonitoringService:
     def __init__(self):
         self.is_running = False
         self.task = None
+        self.rollup_task = None
+        self.retention_task = None
+        self.scheduler = SensorScheduler(resolution=settings.SENSOR_SCHEDULE_RESOLUTION)
+        self._schedule_changed = asyncio.Event()
+        self.last_tick_metrics: Dict[str, Any] = {}
     
     async def start_monitoring(self):
         """Start the monitoring service"""
@@ -32,7 +49,7 @@ class MonitoringService:
         self.is_running = True
         logger.info("Starting monitoring service...")
         
-        # Start background task
+        # Start background tasks
         self.task = asyncio.create_task(self._monitoring_loop())
     
     async def stop_monitoring(self):
@@ -41,154 +58,386 @@ class MonitoringService:
             return
         
         self.is_running = False
-        if self.task:
-            self.task.cancel()
+        await self._cancel(self.task)
+        
+        await driver_registry.close()
+        logger.info("Monitoring service stopped")
+    
+    async def start_rollups(self):
+        """Start keeping the reading rollups up to date, whether or not sensors are polled here.
+
+        Readings also arrive through the bulk endpoint, so the rollup loop
+        runs for the lifetime of the application. ``ROLLUP_INTERVAL = 0``
+        disables it.
+        """
+        if self.rollup_task:
+            return
+        if settings.ROLLUP_INTERVAL <= 0:
+            logger.info("Reading rollups are disabled")
+            return
+        self.rollup_task = asyncio.create_task(self._rollup_loop())
+    
+    async def stop_rollups(self):
+        """Stop the rollup loop"""
+        await self._cancel(self.rollup_task)
+        self.rollup_task = None
+    
+    async def start_retention(self):
+        """Start enforcing the retention policies, if any is configured.
+
+        Raw readings are only deleted once rolled up, so with rollups
+        disabled retention deletes resolved alerts only.
+        """
+        if self.retention_task:
+            return
+        reading_retention = (
+            settings.READING_RETENTION_DAYS is not None or bool(settings.READING_RETENTION_DAYS_BY_TYPE)
+        )
+        if not reading_retention and settings.RESOLVED_ALERT_RETENTION_DAYS is None:
+            return
+        if reading_retention and settings.ROLLUP_INTERVAL <= 0:
+            logger.warning(
+                "Reading retention is configured but rollups are disabled (ROLLUP_INTERVAL = 0); "
+                "raw readings are only deleted once rolled up, so none will be deleted"
+            )
+        self.retention_task = asyncio.create_task(self._retention_loop())
+    
+    async def stop_retention(self):
+        """Stop the retention loop"""
+        await self._cancel(self.retention_task)
+        self.retention_task = None
+    
+    @staticmethod
+    async def _cancel(task: Optional[asyncio.Task]):
+        """Cancel a background task and wait for it to finish"""
+        if task:
+            task.cancel()
             try:
-                await self.task
+                await task
             except asyncio.CancelledError:
                 pass
-        
-        logger.info("Monitoring service stopped")
+    
+    def schedule_sensor(self, sensor: Sensor):
+        """Add, reconfigure or remove a sensor in the polling schedule"""
+        if sensor.is_active:
+            self.scheduler.schedule(sensor.id, sensor.update_interval or settings.SENSOR_UPDATE_INTERVAL)
+        else:
+            self.scheduler.remove(sensor.id)
+        self._schedule_changed.set()
+    
+    def unschedule_sensor(self, sensor_id: int):
+        """Stop polling a sensor"""
+        self.scheduler.remove(sensor_id)
+        self._schedule_changed.set()
+    
+    async def _load_schedule(self):
+        """Rebuild the polling schedule from the active sensors"""
+        async with AsyncSessionLocal() as db:
+            sensors = await sensor_registry.active(db)
+        self.scheduler.load(
+            (sensor.id, sensor.update_interval or settings.SENSOR_UPDATE_INTERVAL) for sensor in sensors
+        )
+        logger.info(f"Scheduled {len(self.scheduler)} active sensors")
     
     async def _monitoring_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop.
+
+        Each wakeup polls only the sensors that are due according to their
+        own update_interval, then sleeps until the next sensor is due or the
+        schedule is changed through the sensors endpoints.
+        """
+        await self._load_schedule()
         while self.is_running:
             try:
-                await self._check_sensors()
-                await self._process_alerts()
-                await asyncio.sleep(settings.SENSOR_UPDATE_INTERVAL)
+                due_ids = self.scheduler.pop_due()
+                if due_ids:
+                    await self._check_sensors(due_ids)
+                    await self._process_alerts()
+                await self._wait_for_next_due()
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
                 await asyncio.sleep(30)  # Wait before retrying
     
-    async def _check_sensors(self):
-        """Check sensor status and create readings"""
-        db = SessionLocal()
+    async def _rollup_loop(self):
+        """Keep the 1m/1h/1d reading rollups up to date"""
+        while True:
+            try:
+                await reading_rollup_service.refresh()
+            except Exception as e:
+                logger.error(f"Error in rollup loop: {e}")
+            await asyncio.sleep(settings.ROLLUP_INTERVAL)
+    
+    async def _retention_loop(self):
+        """Periodically delete raw readings and resolved alerts past retention"""
+        while True:
+            try:
+                await retention_service.enforce()
+            except Exception as e:
+                logger.error(f"Error in retention loop: {e}")
+            await asyncio.sleep(settings.RETENTION_INTERVAL)
+    
+    async def _wait_for_next_due(self):
+        """Sleep until the next sensor is due or the schedule changes"""
+        next_due = self.scheduler.next_due()
+        if next_due is None:
+            timeout = settings.SENSOR_UPDATE_INTERVAL
+        else:
+            timeout = min(max(next_due - self.scheduler.clock(), 0), settings.SENSOR_UPDATE_INTERVAL)
+        
+        self._schedule_changed.clear()
+        try:
+            await asyncio.wait_for(self._schedule_changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _check_sensors(self, sensor_ids: Optional[List[int]] = None):
+        """Check sensor status and create readings.
+
+        One tick is a set-based pipeline: the requested active sensors (all
+        of them when ``sensor_ids`` is None) come from the in-memory sensor
+        registry, one query finds which have an open threshold alert,
+        devices are read concurrently and
+        completed readings are streamed in batches through threshold
+        evaluation and bulk inserts.
+        """
+        db = AsyncSessionLocal()
+        tick_start = time.perf_counter()
+        latencies = []
+        timeouts = 0
+        errors = 0
+        stored = 0
         try:
-            # Get active sensors
-            sensors = db.query(Sensor).filter(Sensor.is_active == True).all()
+            sensors = await sensor_registry.active(db, sensor_ids)
             
-            for sensor in sensors:
-                try:
-                    # Simulate sensor reading (replace with actual sensor communication)
-                    reading_data = await self._simulate_sensor_reading(sensor)
+            # Drop sensors that were deactivated or deleted outside the API
+            if sensor_ids is not None and len(sensors) < len(sensor_ids):
+                for sensor_id in set(sensor_ids) - {sensor.id for sensor in sensors}:
+                    self.scheduler.remove(sensor_id)
+            
+            if not sensors:
+                return
+            open_alerts = await self._load_open_alerts(db, [sensor.id for sensor in sensors])
+            
+            semaphore = asyncio.Semaphore(settings.SENSOR_ACQUISITION_CONCURRENCY)
+            tasks = [
+                asyncio.create_task(self._acquire_batch(driver, batch, semaphore))
+                for driver, batch in self._plan_batches(sensors)
+            ]
+            
+            batch_sensors = []
+            batch_readings = []
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    driver, batch, results, latency, error = await next_result
+                    latencies.append(latency)
+                    if isinstance(error, asyncio.TimeoutError):
+                        timeouts += len(batch)
+                        logger.warning(f"Timed out reading {len(batch)} sensors with driver {driver.name}")
+                        continue
+                    if error is not None:
+                        errors += len(batch)
+                        logger.error(f"Error reading {len(batch)} sensors with driver {driver.name}: {error}")
+                        continue
                     
-                    if reading_data:
-                        # Create reading record
-                        reading = SensorReading(
-                            sensor_id=sensor.id,
-                            value=reading_data['value'],
-                            timestamp=reading_data['timestamp'],
-                            quality_score=reading_data.get('quality_score', 1.0),
-                            is_valid=reading_data.get('is_valid', 1)
-                        )
-                        db.add(reading)
-                        
-                        # Check for alerts
-                        await self._check_sensor_thresholds(sensor, reading_data['value'], db)
-                        
-                except Exception as e:
-                    logger.error(f"Error checking sensor {sensor.id}: {e}")
+                    for sensor in batch:
+                        reading_data = results.get(sensor.id)
+                        if not reading_data:
+                            errors += 1
+                            continue
+                        batch_sensors.append(sensor)
+                        batch_readings.append(self._reading_row(sensor, reading_data))
+                    
+                    if len(batch_readings) >= settings.SENSOR_PERSIST_BATCH_SIZE:
+                        await self._persist_batch(db, batch_sensors, batch_readings, open_alerts)
+                        stored += len(batch_readings)
+                        batch_sensors, batch_readings = [], []
+                
+                await self._persist_batch(db, batch_sensors, batch_readings, open_alerts)
+                stored += len(batch_readings)
+            finally:
+                for task in tasks:
+                    task.cancel()
             
-            db.commit()
+            await db.commit()
             
         except Exception as e:
             logger.error(f"Error in sensor check: {e}")
-            db.rollback()
+            await db.rollback()
         finally:
-            db.close()
+            await db.close()
+            if latencies:
+                self._record_tick_metrics(
+                    len(sensors), stored, timeouts, errors, latencies,
+                    time.perf_counter() - tick_start
+                )
     
-    async def _simulate_sensor_reading(self, sensor: Sensor) -> Dict[str, Any]:
-        """Simulate sensor reading (replace with actual sensor communication)"""
-        import random
-        from datetime import datetime
-        
-        # Simulate different sensor types
-        if sensor.sensor_type == "temperature":
-            base_value = 25.0
-            variation = 10.0
-        elif sensor.sensor_type == "humidity":
-            base_value = 60.0
-            variation = 20.0
-        elif sensor.sensor_type == "pressure":
-            base_value = 1013.25
-            variation = 50.0
-        else:
-            base_value = 50.0
-            variation = 20.0
-        
-        # Add some randomness
-        value = base_value + random.uniform(-variation, variation)
-        
-        # Ensure value is within sensor limits
-        if sensor.min_value is not None:
-            value = max(value, sensor.min_value)
-        if sensor.max_value is not None:
-            value = min(value, sensor.max_value)
-        
+    def _plan_batches(self, sensors: List[Any]):
+        """Split sensors into (driver, batch) pairs sized for each driver"""
+        for driver, driver_sensors in driver_registry.group(sensors).items():
+            size = max(1, driver.max_batch_size)
+            for start in range(0, len(driver_sensors), size):
+                yield driver, driver_sensors[start:start + size]
+    
+    async def _acquire_batch(self, driver: SensorDriver, batch: List[Any], semaphore: asyncio.Semaphore):
+        """Read one batch under the concurrency limit and read timeout.
+
+        Drivers that time out their own requests are not given an overall
+        deadline, since a batch may take several requests.
+
+        Returns ``(driver, batch, readings_by_sensor_id, latency_seconds, error)``.
+        """
+        timeout = None if driver.enforces_timeout else settings.SENSOR_READ_TIMEOUT
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                results = await asyncio.wait_for(driver.read_batch(batch), timeout)
+                return driver, batch, results, time.perf_counter() - start, None
+            except Exception as e:
+                return driver, batch, {}, time.perf_counter() - start, e
+    
+    def _reading_row(self, sensor: Any, reading_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a sensor_readings row from acquired reading data"""
         return {
-            'value': round(value, 2),
-            'timestamp': datetime.utcnow(),
-            'quality_score': random.uniform(0.8, 1.0),
-            'is_valid': 1 if random.random() > 0.05 else 0  # 5% chance of invalid reading
+            'sensor_id': sensor.id,
+            'value': reading_data['value'],
+            'timestamp': reading_data['timestamp'],
+            'quality_score': reading_data.get('quality_score', 1.0),
+            'is_valid': reading_data.get('is_valid', 1)
+        }
+    
+    async def _persist_batch(self, db: AsyncSession, sensors: List[Any], readings: List[Dict[str, Any]],
+                             open_alerts: Set[int]):
+        """Evaluate thresholds for a batch of readings and write it"""
+        if not readings:
+            return
+        new_alerts, resolved_sensor_ids = self._evaluate_thresholds(
+            sensors, [reading['value'] for reading in readings], open_alerts
+        )
+        await self._persist_tick(db, readings, new_alerts, resolved_sensor_ids)
+    
+    def _record_tick_metrics(self, polled: int, stored: int, timeouts: int, errors: int,
+                             latencies: List[float], duration: float):
+        """Keep and log acquisition metrics for the last tick.
+
+        Latencies are per driver request, each covering one batch of sensors.
+        """
+        p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000.0, [50, 95, 99])
+        self.last_tick_metrics = {
+            'polled': polled,
+            'requests': len(latencies),
+            'stored': stored,
+            'timeouts': timeouts,
+            'errors': errors,
+            'latency_p50_ms': round(float(p50), 3),
+            'latency_p95_ms': round(float(p95), 3),
+            'latency_p99_ms': round(float(p99), 3),
+            'latency_max_ms': round(max(latencies) * 1000.0, 3),
+            'duration_s': round(duration, 3)
         }
+        logger.info(f"Monitoring tick: {self.last_tick_metrics}")
+    
+    async def _load_open_alerts(self, db: AsyncSession, sensor_ids: List[int]) -> Set[int]:
+        """Ids of the given sensors that have an open threshold alert"""
+        open_alerts = set()
+        for start in range(0, len(sensor_ids), BULK_CHUNK_SIZE):
+            open_alerts.update((await db.scalars(
+                select(Alert.sensor_id.distinct()).where(
+                    Alert.sensor_id.in_(sensor_ids[start:start + BULK_CHUNK_SIZE]),
+                    Alert.status == AlertStatus.ACTIVE,
+                    Alert.alert_type == "threshold_exceeded"
+                )
+            )).all())
+        return open_alerts
     
-    async def _check_sensor_thresholds(self, sensor: Sensor, value: float, db: Session):
-        """Check if sensor value exceeds thresholds and create alerts"""
+    def _evaluate_thresholds(self, sensors: List[Any], values: List[float], open_alerts: Set[int]):
+        """Evaluate thresholds for a batch of sensors at once.
+
+        Returns the alert rows to insert and the ids of sensors whose open
+        threshold alert should be resolved.
+        """
+        if not sensors:
+            return [], []
         
-        # Check if there are existing active alerts for this sensor
-        existing_alert = db.query(Alert).filter(
-            Alert.sensor_id == sensor.id,
-            Alert.status == AlertStatus.ACTIVE,
-            Alert.alert_type == "threshold_exceeded"
-        ).first()
+        value_arr = np.asarray(values, dtype=float)
+        threshold_min = np.array(
+            [np.nan if s.alert_threshold_min is None else s.alert_threshold_min for s in sensors],
+            dtype=float
+        )
+        threshold_max = np.array(
+            [np.nan if s.alert_threshold_max is None else s.alert_threshold_max for s in sensors],
+            dtype=float
+        )
+        has_open_alert = np.array([s.id in open_alerts for s in sensors], dtype=bool)
         
-        alert_triggered = False
-        severity = AlertSeverity.MEDIUM
+        # Comparisons against NaN are False, so missing thresholds never trigger
+        below = value_arr < threshold_min
+        above = ~below & (value_arr > threshold_max)
+        triggered = below | above
+        high = (below & (value_arr < threshold_min * 0.8)) | (above & (value_arr > threshold_max * 1.2))
         
-        # Check thresholds
-        if sensor.alert_threshold_min is not None and value < sensor.alert_threshold_min:
-            alert_triggered = True
-            severity = AlertSeverity.HIGH if value < sensor.alert_threshold_min * 0.8 else AlertSeverity.MEDIUM
-            title = f"Low {sensor.sensor_type} Alert"
-            message = f"Sensor {sensor.name} reading ({value} {sensor.unit or ''}) is below threshold ({sensor.alert_threshold_min} {sensor.unit or ''})"
+        now = datetime.utcnow()
+        new_alerts = []
+        for i in np.flatnonzero(triggered & ~has_open_alert):
+            sensor = sensors[i]
+            value = values[i]
+            unit = sensor.unit or ''
+            if below[i]:
+                threshold = sensor.alert_threshold_min
+                title = f"Low {sensor.sensor_type} Alert"
+                message = f"Sensor {sensor.name} reading ({value} {unit}) is below threshold ({threshold} {unit})"
+            else:
+                threshold = sensor.alert_threshold_max
+                title = f"High {sensor.sensor_type} Alert"
+                message = f"Sensor {sensor.name} reading ({value} {unit}) exceeds threshold ({threshold} {unit})"
+            
+            new_alerts.append({
+                'sensor_id': sensor.id,
+                'alert_type': "threshold_exceeded",
+                'severity': AlertSeverity.HIGH if high[i] else AlertSeverity.MEDIUM,
+                'status': AlertStatus.ACTIVE,
+                'title': title,
+                'message': message,
+                'threshold_value': threshold,
+                'actual_value': value,
+                'triggered_at': now
+            })
+            logger.warning(f"Alert created: {message}")
         
-        elif sensor.alert_threshold_max is not None and value > sensor.alert_threshold_max:
-            alert_triggered = True
-            severity = AlertSeverity.HIGH if value > sensor.alert_threshold_max * 1.2 else AlertSeverity.MEDIUM
-            title = f"High {sensor.sensor_type} Alert"
-            message = f"Sensor {sensor.name} reading ({value} {sensor.unit or ''}) exceeds threshold ({sensor.alert_threshold_max} {sensor.unit or ''})"
+        resolved_sensor_ids = [sensors[i].id for i in np.flatnonzero(~triggered & has_open_alert)]
+        return new_alerts, resolved_sensor_ids
+    
+    async def _persist_tick(self, db: AsyncSession, readings: List[Dict[str, Any]],
+                            new_alerts: List[Dict[str, Any]], resolved_sensor_ids: List[int]):
+        """Write one tick's readings and alert changes with bulk statements"""
+        await insert_readings(db, readings)
+        if new_alerts:
+            await db.execute(insert(Alert), new_alerts)
         
-        # Create new alert if threshold exceeded and no existing alert
-        if alert_triggered and not existing_alert:
-            alert = Alert(
-                sensor_id=sensor.id,
-                alert_type="threshold_exceeded",
-                severity=severity,
-                title=title,
-                message=message,
-                threshold_value=sensor.alert_threshold_min if value < (sensor.alert_threshold_min or 0) else sensor.alert_threshold_max,
-                actual_value=value,
-                triggered_at=datetime.utcnow()
+        # Resolve open threshold alerts for sensors that are back to normal
+        now = datetime.utcnow()
+        for start in range(0, len(resolved_sensor_ids), BULK_CHUNK_SIZE):
+            await db.execute(
+                update(Alert)
+                .where(
+                    Alert.sensor_id.in_(resolved_sensor_ids[start:start + BULK_CHUNK_SIZE]),
+                    Alert.status == AlertStatus.ACTIVE,
+                    Alert.alert_type == "threshold_exceeded"
+                )
+                .values(status=AlertStatus.RESOLVED, resolved_at=now)
+                .execution_options(synchronize_session=False)
             )
-            db.add(alert)
-            logger.warning(f"Alert created: {message}")
-        
-        # Resolve existing alert if value is back to normal
-        elif not alert_triggered and existing_alert:
-            existing_alert.status = AlertStatus.RESOLVED
-            existing_alert.resolved_at = datetime.utcnow()
-            logger.info(f"Alert resolved for sensor {sensor.name}")
+        if resolved_sensor_ids:
+            logger.info(f"Alerts resolved for {len(resolved_sensor_ids)} sensors")
     
     async def _process_alerts(self):
         """Process pending alerts (send notifications, etc.)"""
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             # Get unprocessed alerts
-            alerts = db.query(Alert).filter(
+            alerts = (await db.scalars(select(Alert).where(
                 Alert.status == AlertStatus.ACTIVE,
                 Alert.email_sent == False
-            ).all()
+            ))).all()
             
             for alert in alerts:
                 try:
@@ -199,13 +448,13 @@ class MonitoringService:
                 except Exception as e:
                     logger.error(f"Error sending notification for alert {alert.id}: {e}")
             
-            db.commit()
+            await db.commit()
             
         except Exception as e:
             logger.error(f"Error processing alerts: {e}")
-            db.rollback()
+            await db.rollback()
         finally:
-            db.close()
+            await db.close()
     
     async def _send_alert_notification(self, alert: Alert):
         """Send alert notification (email, SMS, etc.)"""
@@ -0,0 +1,211 @@
+"""
+Time-bucket aggregation of sensor readings
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import BigInteger, Integer, cast, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+from backend.models.reading import SensorReading
+from backend.models.reading_rollup import ROLLUP_RESOLUTIONS, ReadingRollup, RollupWatermark
+
+# Aggregate functions a client may request
+AGGREGATE_FUNCTIONS = ("avg", "min", "max", "count", "sum")
+
+BUCKET_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_BUCKET_PATTERN = re.compile(r"^\s*(\d+)\s*([smhdw])\s*$")
+
+
+def parse_bucket(bucket: str) -> int:
+    """Parse a bucket width such as ``30s``, ``5m``, ``1h`` or ``1d`` into seconds"""
+    match = _BUCKET_PATTERN.match(bucket.lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid bucket '{bucket}'. Use a positive number followed by s, m, h, d or w")
+    return int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+
+
+def parse_functions(fn: str) -> List[str]:
+    """Parse a comma separated list of aggregate functions, keeping request order"""
+    functions = []
+    for name in fn.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Unknown aggregate function '{name}'. Supported: {', '.join(AGGREGATE_FUNCTIONS)}")
+        if name not in functions:
+            functions.append(name)
+    if not functions:
+        raise ValueError("At least one aggregate function is required")
+    return functions
+
+
+def bucket_expression(dialect_name: str, column, bucket_seconds: int):
+    """SQL expression flooring ``column`` to the start of its bucket, in epoch seconds.
+
+    The width is inlined rather than bound so the SELECT and GROUP BY
+    expressions compare equal on PostgreSQL.
+    """
+    width = literal_column(str(int(bucket_seconds)), Integer)
+    if dialect_name == "sqlite":
+        epoch = cast(func.strftime("%s", column), Integer)
+    else:
+        epoch = cast(func.floor(func.extract("epoch", column)), BigInteger)
+    return (epoch // width) * width
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """``value`` as a naive UTC datetime; naive values are taken to be UTC already"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _to_epoch(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _from_epoch(epoch: int, like: datetime) -> datetime:
+    """Datetime for ``epoch`` that is naive or aware like ``like``"""
+    value = datetime.fromtimestamp(epoch, tz=timezone.utc)
+    return value.replace(tzinfo=None) if like.tzinfo is None else value
+
+
+def choose_rollup_resolution(bucket_seconds: int) -> Optional[int]:
+    """Coarsest rollup resolution whose buckets nest exactly in ``bucket_seconds``"""
+    for resolution in sorted(ROLLUP_RESOLUTIONS, reverse=True):
+        if bucket_seconds % resolution == 0:
+            return resolution
+    return None
+
+
+def _merge(buckets: Dict[int, list], rows):
+    """Fold (bucket, count, sum, min, max) rows into ``buckets``"""
+    for bucket, count, value_sum, value_min, value_max in rows:
+        bucket = int(bucket)
+        current = buckets.get(bucket)
+        if current is None:
+            buckets[bucket] = [count, value_sum, value_min, value_max]
+        else:
+            current[0] += count
+            current[1] += value_sum
+            current[2] = min(current[2], value_min)
+            current[3] = max(current[3], value_max)
+
+
+async def _aggregate_raw(db: AsyncSession, sensor_id: int, start: datetime, end: datetime, bucket_of,
+                         after_id: Optional[int] = None):
+    """Aggregate raw readings in [start, end), only those with an id above ``after_id`` if given"""
+    bucket = bucket_of(SensorReading.timestamp)
+    pending = (SensorReading.id > after_id,) if after_id is not None else ()
+    return (await db.execute(
+        select(
+            bucket,
+            func.count(SensorReading.id),
+            func.sum(SensorReading.value),
+            func.min(SensorReading.value),
+            func.max(SensorReading.value)
+        )
+        .where(
+            SensorReading.sensor_id == sensor_id,
+            SensorReading.timestamp >= start,
+            SensorReading.timestamp < end,
+            SensorReading.is_valid == 1,
+            *pending
+        )
+        .group_by(bucket)
+    )).all()
+
+
+async def _aggregate_rollups(db: AsyncSession, sensor_id: int, resolution: int,
+                             start: datetime, end: datetime, bucket_of):
+    """Re-aggregate rollup rows with bucket_start in [start, end)"""
+    bucket = bucket_of(ReadingRollup.bucket_start)
+    return (await db.execute(
+        select(
+            bucket,
+            func.sum(ReadingRollup.count),
+            func.sum(ReadingRollup.value_sum),
+            func.min(ReadingRollup.value_min),
+            func.max(ReadingRollup.value_max)
+        )
+        .where(
+            ReadingRollup.sensor_id == sensor_id,
+            ReadingRollup.resolution == resolution,
+            ReadingRollup.bucket_start >= start,
+            ReadingRollup.bucket_start < end
+        )
+        .group_by(bucket)
+    )).all()
+
+
+async def aggregate_readings(
+    db: AsyncSession,
+    sensor_id: int,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int,
+    functions: Sequence[str]
+) -> Dict[str, List]:
+    """Aggregate the valid readings of one sensor into fixed-width time buckets.
+
+    Buckets are aligned to multiples of ``bucket_seconds`` since the epoch
+    (UTC) and only buckets containing readings are returned. The part of the
+    range already covered by the coarsest matching rollup is read from
+    ``sensor_reading_rollups``, plus the raw readings in it that were stored
+    after the sensor's rollup watermark (backfills and late devices); the
+    unaligned edges and anything newer than the watermark come from raw
+    readings. The result maps
+    ``"timestamps"`` and each requested function to parallel lists.
+    """
+    dialect_name = db.bind.dialect.name
+
+    def bucket_of(column):
+        return bucket_expression(dialect_name, column, bucket_seconds).label("bucket")
+
+    buckets: Dict[int, list] = {}
+    raw_ranges = [(start, end)]
+
+    resolution = choose_rollup_resolution(bucket_seconds)
+    watermark = await db.get(RollupWatermark, sensor_id) if resolution else None
+    if watermark is not None and watermark.rolled_until is not None:
+        # Buckets before the one holding the latest rolled-up reading are complete
+        inner_start = -(-_to_epoch(start) // resolution) * resolution
+        inner_end = min(_to_epoch(end), _to_epoch(watermark.rolled_until)) // resolution * resolution
+        if inner_start < inner_end:
+            inner_start, inner_end = _from_epoch(inner_start, start), _from_epoch(inner_end, start)
+            _merge(buckets, await _aggregate_rollups(db, sensor_id, resolution, inner_start, inner_end, bucket_of))
+            _merge(buckets, await _aggregate_raw(
+                db, sensor_id, inner_start, inner_end, bucket_of, after_id=watermark.last_reading_id
+            ))
+            raw_ranges = [(start, inner_start), (inner_end, end)]
+
+    for range_start, range_end in raw_ranges:
+        if range_start < range_end:
+            _merge(buckets, await _aggregate_raw(db, sensor_id, range_start, range_end, bucket_of))
+
+    series: Dict[str, List] = {"timestamps": [], **{name: [] for name in functions}}
+    for epoch in sorted(buckets):
+        count, value_sum, value_min, value_max = buckets[epoch]
+        values = {
+            "avg": value_sum / count if count else None,
+            "min": value_min,
+            "max": value_max,
+            "count": int(count),
+            "sum": value_sum,
+        }
+        series["timestamps"].append(datetime.fromtimestamp(epoch, tz=timezone.utc))
+        for name in functions:
+            series[name].append(values[name])
+    return series
+
+
+def bucket_count(start: datetime, end: datetime, bucket_seconds: int) -> int:
+    """Number of buckets spanned by [start, end)"""
+    first = _to_epoch(start) // bucket_seconds
+    last = (_to_epoch(end) - 1) // bucket_seconds
+    return max(0, last - first + 1)
@@ -0,0 +1,204 @@
+"""
+Incremental downsampling of sensor readings into rollup tables
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+from sqlalchemy import and_, case, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal
+from backend.models.reading import SensorReading
+from backend.models.reading_rollup import ROLLUP_RESOLUTIONS, ReadingRollup, RollupWatermark
+from backend.services.reading_aggregation import bucket_expression
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row upsert
+UPSERT_CHUNK_SIZE = 500
+
+# Dialects with INSERT ... ON CONFLICT, which rollups and sensor_latest rely on
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def check_upsert_support(dialect_name: str):
+    """Refuse to start on a database the rollup and last-value upserts cannot run on"""
+    if dialect_name not in UPSERT_DIALECTS:
+        raise RuntimeError(
+            f"Unsupported database {dialect_name}; use one of: {', '.join(sorted(UPSERT_DIALECTS))}"
+        )
+
+
+def upsert(dialect_name: str, table):
+    """INSERT statement supporting ON CONFLICT for the session's dialect"""
+    if dialect_name not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
+    return UPSERT_DIALECTS[dialect_name](table)
+
+
+class ReadingRollupService:
+    """Maintain 1m/1h/1d rollups of sensor readings.
+
+    Readings are append-only, so progress is tracked per sensor as the
+    highest reading id already rolled up. Each pass aggregates the next
+    range of reading ids in SQL and merges the partial aggregates into the
+    existing buckets, which also picks up readings ingested late with old
+    timestamps.
+
+    On PostgreSQL ids come from a sequence when a row is inserted, not when
+    its transaction commits, so a pass may see id N committed while a lower
+    id is still in flight. Advancing the watermark to N would skip that
+    reading for good, so a pass only rolls up to the highest id the
+    previous pass saw: by then every transaction holding such an id has had
+    ``ROLLUP_INTERVAL`` seconds to commit. SQLite has a single writer and
+    commits ids in order, so it rolls up to the current highest id.
+    """
+
+    def __init__(self, resolutions=ROLLUP_RESOLUTIONS):
+        self.resolutions = resolutions
+        self._settled_id: Optional[int] = None
+
+    async def refresh(self) -> int:
+        """Roll up all pending readings; returns the number of readings processed"""
+        processed = 0
+        async with AsyncSessionLocal() as db:
+            until_id = await db.scalar(select(func.max(SensorReading.id))) or 0
+            if db.bind.dialect.name != "sqlite":
+                until_id, self._settled_id = self._settled_id, until_id
+                if until_id is None:
+                    return 0
+            while True:
+                count, caught_up = await self.run_once(db, until_id=until_id)
+                processed += count
+                if caught_up:
+                    break
+        if processed:
+            logger.info(f"Rolled up {processed} readings")
+        return processed
+
+    async def run_once(self, db: AsyncSession, batch_size: int = None, until_id: Optional[int] = None):
+        """Roll up one bounded range of reading ids, up to ``until_id`` (default: the highest id).
+
+        Returns ``(readings_processed, caught_up)``.
+        """
+        batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+        max_id = until_id if until_id is not None else await db.scalar(select(func.max(SensorReading.id)))
+        if not max_id:
+            return 0, True
+
+        low = await db.scalar(select(func.min(RollupWatermark.last_reading_id))) or 0
+        if low >= max_id:
+            return 0, True
+        high = min(max_id, low + batch_size)
+
+        pending = and_(
+            SensorReading.id > low,
+            SensorReading.id <= high,
+            SensorReading.id > func.coalesce(RollupWatermark.last_reading_id, 0),
+        )
+        source = SensorReading.__table__.outerjoin(
+            RollupWatermark.__table__, RollupWatermark.sensor_id == SensorReading.sensor_id
+        )
+        dialect_name = db.bind.dialect.name
+
+        for resolution in self.resolutions:
+            bucket = bucket_expression(dialect_name, SensorReading.timestamp, resolution).label("bucket")
+            rows = (await db.execute(
+                select(
+                    SensorReading.sensor_id,
+                    bucket,
+                    func.count(SensorReading.id).label("count"),
+                    func.sum(SensorReading.value).label("value_sum"),
+                    func.min(SensorReading.value).label("value_min"),
+                    func.max(SensorReading.value).label("value_max"),
+                    func.sum(func.coalesce(SensorReading.quality_score, 1.0)).label("quality_sum"),
+                )
+                .select_from(source)
+                .where(pending, SensorReading.is_valid == 1)
+                .group_by(SensorReading.sensor_id, bucket)
+            )).all()
+            await self._merge_rollups(db, dialect_name, resolution, rows)
+
+        # Advance the watermarks of every sensor that had readings in the range
+        progress = (await db.execute(
+            select(SensorReading.sensor_id, func.max(SensorReading.timestamp), func.count(SensorReading.id))
+            .select_from(source)
+            .where(pending)
+            .group_by(SensorReading.sensor_id)
+        )).all()
+        await self._advance_watermarks(db, dialect_name, high, progress)
+        await db.commit()
+        return sum(count for _, _, count in progress), high >= max_id
+
+    async def _merge_rollups(self, db: AsyncSession, dialect_name: str, resolution: int, rows: List[Any]):
+        """Add partial aggregates to existing buckets, creating missing ones"""
+        if not rows:
+            return
+        values = [
+            {
+                "sensor_id": row.sensor_id,
+                "resolution": resolution,
+                "bucket_start": datetime.fromtimestamp(int(row.bucket), tz=timezone.utc),
+                "count": row.count,
+                "value_sum": row.value_sum,
+                "value_min": row.value_min,
+                "value_max": row.value_max,
+                "quality_sum": row.quality_sum,
+            }
+            for row in rows
+        ]
+        stmt = upsert(dialect_name, ReadingRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sensor_id", "resolution", "bucket_start"],
+            set_={
+                "count": ReadingRollup.count + stmt.excluded.count,
+                "value_sum": ReadingRollup.value_sum + stmt.excluded.value_sum,
+                "value_min": case(
+                    (stmt.excluded.value_min < ReadingRollup.value_min, stmt.excluded.value_min),
+                    else_=ReadingRollup.value_min
+                ),
+                "value_max": case(
+                    (stmt.excluded.value_max > ReadingRollup.value_max, stmt.excluded.value_max),
+                    else_=ReadingRollup.value_max
+                ),
+                "quality_sum": ReadingRollup.quality_sum + stmt.excluded.quality_sum,
+            }
+        )
+        for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+            await db.execute(stmt, values[start:start + UPSERT_CHUNK_SIZE])
+
+    async def _advance_watermarks(self, db: AsyncSession, dialect_name: str, high: int, progress: List[Any]):
+        """Record ``high`` as rolled up for the given sensors and every lagging sensor"""
+        if progress:
+            stmt = upsert(dialect_name, RollupWatermark)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["sensor_id"],
+                set_={
+                    "last_reading_id": stmt.excluded.last_reading_id,
+                    "rolled_until": case(
+                        (RollupWatermark.rolled_until.is_(None), stmt.excluded.rolled_until),
+                        (stmt.excluded.rolled_until > RollupWatermark.rolled_until, stmt.excluded.rolled_until),
+                        else_=RollupWatermark.rolled_until
+                    ),
+                }
+            )
+            values = [
+                {"sensor_id": sensor_id, "last_reading_id": high, "rolled_until": rolled_until}
+                for sensor_id, rolled_until, _ in progress
+            ]
+            for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+                await db.execute(stmt, values[start:start + UPSERT_CHUNK_SIZE])
+
+        # Sensors without readings in the range are still rolled up to ``high``
+        await db.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.last_reading_id < high)
+            .values(last_reading_id=high)
+        )
+
+
+# Global rollup service instance
+reading_rollup_service = ReadingRollupService()
@@ -0,0 +1,112 @@
+"""
+Retention policy enforcement for raw readings and resolved alerts
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal
+from backend.models.alert import Alert, AlertStatus
+from backend.models.reading import SensorReading
+from backend.models.reading_rollup import RollupWatermark
+from backend.models.sensor import Sensor
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    """Delete raw readings and resolved alerts past their retention period.
+
+    Readings are kept per sensor type (``READING_RETENTION_DAYS_BY_TYPE``,
+    falling back to ``READING_RETENTION_DAYS``); rollups are never deleted,
+    and raw readings are only deleted once the rollup job has processed
+    them (``id <= RollupWatermark.last_reading_id``), so reading retention
+    needs rollups enabled; with ``ROLLUP_INTERVAL = 0`` no reading is
+    ever deleted. Rows are deleted oldest first in chunks of
+    ``RETENTION_DELETE_CHUNK_SIZE``, committing after each chunk so no
+    single statement holds locks for long.
+    """
+
+    async def enforce(self) -> Dict[str, int]:
+        """Apply every configured policy once; returns deleted row counts"""
+        deleted = {"readings": 0, "alerts": 0}
+        async with AsyncSessionLocal() as db:
+            now = datetime.utcnow()
+            by_type = {
+                sensor_type.strip().lower(): days
+                for sensor_type, days in settings.READING_RETENTION_DAYS_BY_TYPE.items()
+            }
+
+            for sensor_type, days in by_type.items():
+                sensors = select(Sensor.id).where(func.lower(Sensor.sensor_type) == sensor_type)
+                deleted["readings"] += await self._delete_readings(db, sensors, now - timedelta(days=days))
+
+            if settings.READING_RETENTION_DAYS is not None:
+                sensors = select(Sensor.id)
+                if by_type:
+                    sensors = sensors.where(func.lower(Sensor.sensor_type).not_in(list(by_type)))
+                cutoff = now - timedelta(days=settings.READING_RETENTION_DAYS)
+                deleted["readings"] += await self._delete_readings(db, sensors, cutoff)
+
+            if settings.RESOLVED_ALERT_RETENTION_DAYS is not None:
+                cutoff = now - timedelta(days=settings.RESOLVED_ALERT_RETENTION_DAYS)
+                deleted["alerts"] += await self._delete_alerts(db, cutoff)
+
+        if deleted["readings"] or deleted["alerts"]:
+            logger.info(
+                f"Retention deleted {deleted['readings']} readings and {deleted['alerts']} resolved alerts"
+            )
+        return deleted
+
+    async def _delete_readings(self, db: AsyncSession, sensors, cutoff: datetime) -> int:
+        """Delete readings older than ``cutoff`` of the sensors selected by ``sensors``"""
+        rolled_up_to = (
+            select(RollupWatermark.last_reading_id)
+            .where(RollupWatermark.sensor_id == SensorReading.sensor_id)
+            .scalar_subquery()
+        )
+        expired = (
+            select(SensorReading.id)
+            .where(
+                SensorReading.sensor_id.in_(sensors),
+                SensorReading.timestamp < cutoff,
+                SensorReading.id <= rolled_up_to
+            )
+            .order_by(SensorReading.timestamp)
+        )
+        return await self._delete_in_chunks(db, SensorReading, expired)
+
+    async def _delete_alerts(self, db: AsyncSession, cutoff: datetime) -> int:
+        """Delete alerts resolved before ``cutoff``"""
+        expired = (
+            select(Alert.id)
+            .where(Alert.status == AlertStatus.RESOLVED, Alert.resolved_at < cutoff)
+            .order_by(Alert.resolved_at)
+        )
+        return await self._delete_in_chunks(db, Alert, expired)
+
+    async def _delete_in_chunks(self, db: AsyncSession, model, expired, chunk_size: Optional[int] = None) -> int:
+        """Delete the rows whose ids ``expired`` selects, one bounded chunk per transaction"""
+        chunk_size = chunk_size or settings.RETENTION_DELETE_CHUNK_SIZE
+        total = 0
+        while True:
+            result = await db.execute(
+                delete(model)
+                .where(model.id.in_(expired.limit(chunk_size)))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            total += result.rowcount
+            if result.rowcount < chunk_size:
+                return total
+            # Let API requests and sensor polling run between chunks
+            await asyncio.sleep(0)
+
+
+# Global retention service instance
+retention_service = RetentionService()
@@ -0,0 +1,125 @@
+"""
+Process-wide in-memory registry of sensor metadata
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import settings
+from backend.models.sensor import Sensor
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of ids bound into a single IN (...) clause
+LOOKUP_CHUNK_SIZE = 500
+
+
+class SensorRecord(NamedTuple):
+    """Immutable snapshot of the sensor fields used by ingestion and monitoring"""
+    id: int
+    name: str
+    sensor_type: str
+    location_id: int
+    device_id: str
+    manufacturer: Optional[str]
+    unit: Optional[str]
+    min_value: Optional[float]
+    max_value: Optional[float]
+    alert_threshold_min: Optional[float]
+    alert_threshold_max: Optional[float]
+    is_active: bool
+    update_interval: Optional[int]
+
+
+RECORD_COLUMNS = [getattr(Sensor, field) for field in SensorRecord._fields]
+
+
+def to_record(sensor) -> SensorRecord:
+    """Build a record from a Sensor instance or a row with the same attributes"""
+    return SensorRecord(*(getattr(sensor, field) for field in SensorRecord._fields))
+
+
+class SensorRegistry:
+    """Sensor metadata loaded once and kept in memory.
+
+    The sensors endpoints update the registry on create, update and delete,
+    so reads in the ingestion and monitoring hot paths need no database
+    query. Changes made outside this process (other workers, scripts) are
+    picked up by a full reload every ``SENSOR_REGISTRY_TTL`` seconds, and an
+    id that is not cached is looked up in the database once.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._records: Dict[int, SensorRecord] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def invalidate(self):
+        """Drop everything; the next read reloads from the database"""
+        self._records = {}
+        self._loaded_at = None
+
+    def put(self, sensor):
+        """Add or replace a sensor after it was created or updated"""
+        self._records[sensor.id] = to_record(sensor)
+
+    def remove(self, sensor_id: int):
+        """Forget a deleted sensor"""
+        self._records.pop(sensor_id, None)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """Load every sensor if the registry is empty or older than the TTL"""
+        if self._loaded_at is not None and self.clock() - self._loaded_at < settings.SENSOR_REGISTRY_TTL:
+            return
+        async with self._lock:
+            if self._loaded_at is not None and self.clock() - self._loaded_at < settings.SENSOR_REGISTRY_TTL:
+                return
+            rows = (await db.execute(select(*RECORD_COLUMNS))).all()
+            self._records = {row.id: to_record(row) for row in rows}
+            self._loaded_at = self.clock()
+            logger.info(f"Sensor registry loaded {len(self._records)} sensors")
+
+    async def get(self, db: AsyncSession, sensor_id: int) -> Optional[SensorRecord]:
+        """Return the record of one sensor, or None if it does not exist"""
+        return (await self.get_many(db, [sensor_id])).get(sensor_id)
+
+    async def get_many(self, db: AsyncSession, sensor_ids: Iterable[int]) -> Dict[int, SensorRecord]:
+        """Return the records of the given sensors that exist"""
+        await self.ensure_loaded(db)
+        found = {}
+        missing = []
+        for sensor_id in set(sensor_ids):
+            record = self._records.get(sensor_id)
+            if record is None:
+                missing.append(sensor_id)
+            else:
+                found[sensor_id] = record
+
+        # Sensors created by another process since the last load
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            rows = (await db.execute(
+                select(*RECORD_COLUMNS).where(Sensor.id.in_(missing[start:start + LOOKUP_CHUNK_SIZE]))
+            )).all()
+            for row in rows:
+                found[row.id] = self._records[row.id] = to_record(row)
+        return found
+
+    async def active(self, db: AsyncSession, sensor_ids: Optional[Iterable[int]] = None) -> List[SensorRecord]:
+        """Active sensors, restricted to ``sensor_ids`` when given"""
+        if sensor_ids is None:
+            await self.ensure_loaded(db)
+            records = self._records.values()
+        else:
+            records = (await self.get_many(db, sensor_ids)).values()
+        return [record for record in records if record.is_active]
+
+
+# Global sensor registry instance
+sensor_registry = SensorRegistry()
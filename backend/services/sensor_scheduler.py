@@ -0,0 +1,109 @@
+"""
+Per-sensor polling scheduler for the monitoring service
+"""
+
+import heapq
+import itertools
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_REMOVED = None  # placeholder for an invalidated heap entry
+
+
+class SensorScheduler:
+    """Heap-based scheduler that tracks when each sensor is next due.
+
+    Every sensor has one live heap entry ``[due, seq, sensor_id]``.
+    Rescheduling or removing a sensor invalidates its entry in place and
+    pushes a new one, so all operations stay O(log n). Sensors whose due
+    times fall within ``resolution`` seconds of each other are dispatched
+    together in a single wakeup.
+    """
+
+    def __init__(self, resolution: float = 1.0, clock=time.monotonic):
+        self.resolution = resolution
+        self.clock = clock
+        self._heap: List[list] = []
+        self._entries: Dict[int, list] = {}
+        self._intervals: Dict[int, float] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, sensor_id: int) -> bool:
+        return sensor_id in self._entries
+
+    def clear(self):
+        """Remove every sensor from the schedule"""
+        self._heap.clear()
+        self._entries.clear()
+        self._intervals.clear()
+
+    def load(self, sensors: Iterable[Tuple[int, float]]):
+        """Replace the schedule with ``(sensor_id, interval)`` pairs, all due now"""
+        self.clear()
+        now = self.clock()
+        for sensor_id, interval in sensors:
+            self._intervals[sensor_id] = interval
+            self._push(sensor_id, now)
+
+    def schedule(self, sensor_id: int, interval: float):
+        """Add a sensor or change its interval.
+
+        New sensors are due immediately. For a known sensor the next poll is
+        brought forward if the new interval is shorter than what remains.
+        """
+        now = self.clock()
+        entry = self._entries.get(sensor_id)
+        due = now if entry is None else min(entry[0], now + interval)
+        self._intervals[sensor_id] = interval
+        self._push(sensor_id, due)
+
+    def remove(self, sensor_id: int):
+        """Stop polling a sensor"""
+        entry = self._entries.pop(sensor_id, None)
+        if entry is not None:
+            entry[2] = _REMOVED
+        self._intervals.pop(sensor_id, None)
+
+    def next_due(self) -> Optional[float]:
+        """Clock time at which the earliest sensor is due, or None if empty"""
+        while self._heap and self._heap[0][2] is _REMOVED:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[int]:
+        """Return the sensors due by ``now`` (plus resolution) and reschedule them.
+
+        Each sensor's next due time advances by its interval from the slot it
+        was due in; sensors that fell more than a whole interval behind are
+        rescheduled from ``now`` instead of firing repeatedly to catch up.
+        """
+        if now is None:
+            now = self.clock()
+        horizon = now + self.resolution
+        due_ids = []
+        rescheduled = []
+        while self._heap and self._heap[0][0] <= horizon:
+            due, _, sensor_id = heapq.heappop(self._heap)
+            if sensor_id is _REMOVED:
+                continue
+            due_ids.append(sensor_id)
+            next_due = due + self._intervals[sensor_id]
+            if next_due <= now:
+                next_due = now + self._intervals[sensor_id]
+            rescheduled.append((sensor_id, next_due))
+
+        # Push after draining so a short interval cannot fire twice in one wakeup
+        for sensor_id, next_due in rescheduled:
+            self._push(sensor_id, next_due)
+        return due_ids
+
+    def _push(self, sensor_id: int, due: float):
+        entry = self._entries.get(sensor_id)
+        if entry is not None:
+            entry[2] = _REMOVED
+        entry = [due, next(self._counter), sensor_id]
+        self._entries[sensor_id] = entry
+        heapq.heappush(self._heap, entry)
@@ -0,0 +1,85 @@
+"""
+Assignment of sensors to the IFC spaces they are located in
+"""
+
+import logging
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import settings
+from backend.models.ifc_space import IFCSpace
+from backend.models.sensor import Sensor
+from backend.services.space_index import SpaceIndex, space_indexes
+
+logger = logging.getLogger(__name__)
+
+# Sensors updated per executemany when reassigning a file's sensors
+ASSIGN_CHUNK_SIZE = 500
+
+
+def space_at(index: SpaceIndex, x: float, y: float, z: Optional[float]) -> Optional[int]:
+    """Id of the space a sensor at (x, y, z) belongs to, if any.
+
+    The smallest space containing the point wins. A sensor just outside
+    every space (mounted on a wall or ceiling) goes to the nearest space
+    within ``SENSOR_SPACE_TOLERANCE`` meters.
+    """
+    containing = index.containing(x, y, z)
+    if containing:
+        return containing[0]
+    nearest = index.nearest(x, y, z, 1)
+    if nearest and nearest[0][1] <= settings.SENSOR_SPACE_TOLERANCE:
+        return nearest[0][0]
+    return None
+
+
+async def assign_space(db: AsyncSession, sensor: Sensor, space_given: bool = False) -> bool:
+    """Set ``sensor.ifc_space_id`` from its position; False if its IFC file or given space is invalid.
+
+    A sensor with an IFC file and coordinates is assigned the space at its
+    coordinates, unless ``space_given`` (the space was set explicitly), in
+    which case that space has to belong to the file. A space that does not
+    belong to the sensor's file any more is cleared.
+    """
+    if sensor.ifc_file_id is None:
+        if space_given and sensor.ifc_space_id is not None:
+            return False
+        sensor.ifc_space_id = None
+        return True
+    index = await space_indexes.get(db, sensor.ifc_file_id)
+    if index is None:
+        return False
+    if not space_given and sensor.x_coordinate is not None and sensor.y_coordinate is not None:
+        sensor.ifc_space_id = space_at(index, sensor.x_coordinate, sensor.y_coordinate, sensor.z_coordinate)
+    elif sensor.ifc_space_id is not None:
+        space_file_id = await db.scalar(select(IFCSpace.ifc_file_id).where(IFCSpace.id == sensor.ifc_space_id))
+        if space_file_id != sensor.ifc_file_id:
+            if space_given:
+                return False
+            sensor.ifc_space_id = None
+    return True
+
+
+async def assign_file_sensors(db: AsyncSession, file_id: int) -> int:
+    """Reassign every sensor positioned in a file to the space at its coordinates; returns how many changed.
+
+    Run after the file's spaces were rewritten. Sensors without coordinates
+    keep their explicitly set space. The caller commits.
+    """
+    index = await space_indexes.get(db, file_id)
+    if index is None:
+        return 0
+    rows = (await db.execute(
+        select(Sensor.id, Sensor.x_coordinate, Sensor.y_coordinate, Sensor.z_coordinate, Sensor.ifc_space_id)
+        .where(Sensor.ifc_file_id == file_id, Sensor.x_coordinate.is_not(None), Sensor.y_coordinate.is_not(None))
+    )).all()
+    changes = []
+    for row in rows:
+        space_id = space_at(index, row.x_coordinate, row.y_coordinate, row.z_coordinate)
+        if space_id != row.ifc_space_id:
+            changes.append({"id": row.id, "ifc_space_id": space_id})
+    for start in range(0, len(changes), ASSIGN_CHUNK_SIZE):
+        await db.execute(update(Sensor), changes[start:start + ASSIGN_CHUNK_SIZE])
+    if changes:
+        logger.info(f"Reassigned {len(changes)} of {len(rows)} sensors to spaces of IFC file {file_id}")
+    return len(changes)
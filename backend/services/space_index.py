@@ -0,0 +1,280 @@
+"""
+In-memory spatial indexes over the spaces of IFC files
+"""
+
+import logging
+import math
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.config import settings
+from backend.models.ifc_file import IFCFile
+from backend.models.ifc_space import IFCSpace
+
+logger = logging.getLogger(__name__)
+
+# Space columns an index is built from
+INDEX_COLUMNS = (
+    IFCSpace.id,
+    IFCSpace.x_coordinate, IFCSpace.y_coordinate, IFCSpace.z_coordinate, IFCSpace.height,
+    IFCSpace.bbox_min_x, IFCSpace.bbox_min_y, IFCSpace.bbox_min_z,
+    IFCSpace.bbox_max_x, IFCSpace.bbox_max_y, IFCSpace.bbox_max_z,
+)
+
+# Upper bound on grid cells per space, so a few huge spaces cannot blow up the grid
+MAX_CELLS_PER_SPACE = 4
+
+
+class SpaceIndex:
+    """Bounding boxes of a file's spaces in a uniform 3D grid.
+
+    Every space is listed in each grid cell its box overlaps; the cells are
+    stored as one CSR array (``starts``/``members``), so a lookup is an array
+    slice followed by a vectorized box test. Cell sizes follow the typical
+    space footprint and storey height, which keeps a cell's list down to a
+    handful of spaces. Spaces without a bounding box are indexed by their
+    coordinates (a vertical segment of their height); spaces without
+    coordinates are not indexed.
+    """
+
+    def __init__(self, ids: np.ndarray, boxes: np.ndarray, version: Optional[int] = None):
+        self.ids = ids
+        self.boxes = boxes  # (n, 6): min x, y, z, max x, y, z
+        self.version = version
+        self._build_grid()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, version: Optional[int] = None) -> "SpaceIndex":
+        """Build from rows with the INDEX_COLUMNS attributes"""
+        ids, boxes = [], []
+        for row in rows:
+            if row.bbox_min_x is not None:
+                box = (row.bbox_min_x, row.bbox_min_y, row.bbox_min_z, row.bbox_max_x, row.bbox_max_y, row.bbox_max_z)
+            elif row.x_coordinate is not None and row.y_coordinate is not None:
+                z = row.z_coordinate or 0.0
+                box = (row.x_coordinate, row.y_coordinate, z, row.x_coordinate, row.y_coordinate, z + (row.height or 0.0))
+            else:
+                continue
+            ids.append(row.id)
+            boxes.append(box)
+        return cls(np.array(ids, dtype=np.int64), np.array(boxes, dtype=np.float64).reshape(-1, 6), version)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build_grid(self):
+        boxes = self.boxes
+        if not len(boxes):
+            self.origin = np.zeros(3)
+            self.cell_size = np.ones(3)
+            self.shape = (1, 1, 1)
+            self.starts = np.zeros(2, dtype=np.int64)
+            self.members = np.zeros(0, dtype=np.int64)
+            return
+        self.origin = boxes[:, :3].min(axis=0)
+        extent = np.maximum(boxes[:, 3:].max(axis=0) - self.origin, 1e-9)
+        sizes = boxes[:, 3:] - boxes[:, :3]
+        footprint = float(np.median(np.maximum(sizes[:, 0], sizes[:, 1])))
+        if footprint <= 0:
+            footprint = math.sqrt(extent[0] * extent[1] / len(boxes))
+        storey = float(np.median(sizes[:, 2]))
+        cell_size = np.maximum([footprint, footprint, storey if storey > 0 else footprint], extent * 1e-6)
+        max_cells = MAX_CELLS_PER_SPACE * len(boxes) + 64
+        while True:
+            shape = (np.floor(extent / cell_size) + 1).astype(np.int64)
+            first = self._cells(boxes[:, :3], cell_size, shape)
+            span = self._cells(boxes[:, 3:], cell_size, shape) - first + 1
+            counts = span.prod(axis=1)
+            if shape.prod() + counts.sum() <= 2 * max_cells:
+                break
+            cell_size *= 2
+        self.cell_size = cell_size
+        self.shape = tuple(int(size) for size in shape)
+        nx, ny, nz = self.shape
+
+        # One (cell, space) pair per cell a box overlaps, grouped by cell
+        positions = np.repeat(np.arange(len(boxes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        span_x, span_xy = span[positions, 0], span[positions, 0] * span[positions, 1]
+        cx = first[positions, 0] + offsets % span_x
+        cy = first[positions, 1] + offsets % span_xy // span_x
+        cz = first[positions, 2] + offsets // span_xy
+        cells = (cz * ny + cy) * nx + cx
+        order = np.argsort(cells, kind="stable")
+        self.members = positions[order]
+        self.starts = np.zeros(nx * ny * nz + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=nx * ny * nz), out=self.starts[1:])
+
+    def _cells(self, points: np.ndarray, cell_size: np.ndarray, shape: np.ndarray) -> np.ndarray:
+        """Grid cells of (n, 3) coordinates, clamped to the grid"""
+        return np.clip(np.floor((points - self.origin) / cell_size), 0, shape - 1).astype(np.int64)
+
+    def _cell(self, value: float, axis: int) -> int:
+        cell = math.floor((value - self.origin[axis]) / self.cell_size[axis])
+        return min(max(cell, 0), self.shape[axis] - 1)
+
+    def _range(self, low: Optional[float], high: Optional[float], axis: int) -> Tuple[int, int]:
+        """Cells covering [low, high] along an axis; a missing bound is open"""
+        return (
+            0 if low is None else self._cell(low, axis),
+            self.shape[axis] - 1 if high is None else self._cell(high, axis),
+        )
+
+    def _candidates(self, cells: List[Tuple[int, int]]) -> np.ndarray:
+        """Positions of the spaces listed in a box of cells, given (first, last) per axis, each once"""
+        (cx0, cx1), (cy0, cy1), (cz0, cz1) = cells
+        nx, ny, _ = self.shape
+        if cx0 == cx1 and cy0 == cy1 and cz0 == cz1:
+            cell = (cz0 * ny + cy0) * nx + cx0
+            return self.members[self.starts[cell]:self.starts[cell + 1]]
+        # Cells of one grid row are contiguous in the CSR arrays
+        rows = []
+        for cz in range(cz0, cz1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                row = (cz * ny + cy) * nx
+                rows.append(self.members[self.starts[row + cx0]:self.starts[row + cx1 + 1]])
+        return np.unique(np.concatenate(rows))
+
+    def containing(self, x: float, y: float, z: Optional[float] = None) -> List[int]:
+        """Ids of the spaces whose box contains the point, smallest footprint first.
+
+        Without ``z`` only the floor plan is tested, so stacked spaces of all
+        storeys are returned.
+        """
+        if not len(self.ids):
+            return []
+        candidates = self._candidates([self._range(x, x, 0), self._range(y, y, 1), self._range(z, z, 2)])
+        boxes = self.boxes[candidates]
+        inside = (boxes[:, 0] <= x) & (x <= boxes[:, 3]) & (boxes[:, 1] <= y) & (y <= boxes[:, 4])
+        if z is not None:
+            inside &= (boxes[:, 2] <= z) & (z <= boxes[:, 5])
+        candidates, boxes = candidates[inside], boxes[inside]
+        footprint = (boxes[:, 3] - boxes[:, 0]) * (boxes[:, 4] - boxes[:, 1])
+        return self.ids[candidates[np.argsort(footprint, kind="stable")]].tolist()
+
+    def intersecting(
+        self,
+        min_x: float, min_y: float, max_x: float, max_y: float,
+        min_z: Optional[float] = None, max_z: Optional[float] = None
+    ) -> List[int]:
+        """Ids of the spaces whose box intersects the given box, by id; a missing z bound is open"""
+        if not len(self.ids) or min_x > max_x or min_y > max_y:
+            return []
+        if min_z is not None and max_z is not None and min_z > max_z:
+            return []
+        candidates = self._candidates([
+            self._range(min_x, max_x, 0), self._range(min_y, max_y, 1), self._range(min_z, max_z, 2)
+        ])
+        boxes = self.boxes[candidates]
+        hit = (boxes[:, 0] <= max_x) & (min_x <= boxes[:, 3]) & (boxes[:, 1] <= max_y) & (min_y <= boxes[:, 4])
+        if min_z is not None:
+            hit &= min_z <= boxes[:, 5]
+        if max_z is not None:
+            hit &= boxes[:, 2] <= max_z
+        return np.sort(self.ids[candidates[hit]]).tolist()
+
+    def nearest(self, x: float, y: float, z: Optional[float] = None, k: int = 1) -> List[Tuple[int, float]]:
+        """The ``k`` spaces closest to the point as (id, distance to the box), nearest first.
+
+        Distance is 0 inside a box; without ``z`` it is measured in the floor
+        plan. Searches boxes of cells around the point, doubling their
+        radius until ``k`` spaces are closer than anything outside.
+        """
+        if not len(self.ids) or k <= 0:
+            return []
+        k = min(k, len(self.ids))
+        point = (x, y, z)
+        center = [None if value is None else self._cell(value, axis) for axis, value in enumerate(point)]
+        radius = 0
+        while True:
+            cells, bound = [], math.inf
+            for axis, value in enumerate(point):
+                last = self.shape[axis] - 1
+                if value is None:
+                    cells.append((0, last))
+                    continue
+                low, high = max(center[axis] - radius, 0), min(center[axis] + radius, last)
+                cells.append((low, high))
+                # Anything not yet seen lies outside the box of cells, beyond one of its inner faces
+                if low > 0:
+                    bound = min(bound, value - (self.origin[axis] + low * self.cell_size[axis]))
+                if high < last:
+                    bound = min(bound, self.origin[axis] + (high + 1) * self.cell_size[axis] - value)
+            candidates = self._candidates(cells)
+            if len(candidates) >= k:
+                distances = self._distances(candidates, x, y, z)
+                order = np.argsort(distances, kind="stable")[:k]
+                if distances[order[-1]] <= bound:
+                    return [(int(self.ids[candidates[i]]), float(distances[i])) for i in order]
+            radius = max(1, radius * 2)
+
+    def _distances(self, candidates: np.ndarray, x: float, y: float, z: Optional[float]) -> np.ndarray:
+        boxes = self.boxes[candidates]
+        dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 3]), 0)
+        dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 4]), 0)
+        squared = dx * dx + dy * dy
+        if z is not None:
+            dz = np.maximum(np.maximum(boxes[:, 2] - z, z - boxes[:, 5]), 0)
+            squared += dz * dz
+        return np.sqrt(squared)
+
+
+class SpaceIndexCache:
+    """Spatial indexes keyed by IFC file id, LRU beyond ``max_size``.
+
+    An index is tagged with the file's ``spaces_version``, which processing
+    bumps whenever it writes spaces; checking it is a primary key lookup, and
+    an index whose version is outdated is rebuilt from the spaces table.
+    The job runner builds a file's index as soon as processing finishes.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self._max_size = max_size
+        self._entries: "OrderedDict[int, SpaceIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self) -> int:
+        return settings.IFC_SPACE_INDEX_CACHE_SIZE if self._max_size is None else self._max_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, db: AsyncSession, file_id: int) -> Optional[SpaceIndex]:
+        """Index of a file's spaces, built if missing or outdated; None if there is no such file"""
+        row = (await db.execute(select(IFCFile.spaces_version).where(IFCFile.id == file_id))).first()
+        if row is None:
+            self.invalidate(file_id)
+            return None
+        version = row.spaces_version or 0
+        index = self._entries.get(file_id)
+        if index is not None and index.version == version:
+            self._entries.move_to_end(file_id)
+            self.hits += 1
+            return index
+
+        self.misses += 1
+        rows = (await db.execute(select(*INDEX_COLUMNS).where(IFCSpace.ifc_file_id == file_id))).all()
+        index = SpaceIndex.from_rows(rows, version)
+        if self.max_size > 0:
+            self._entries[file_id] = index
+            self._entries.move_to_end(file_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        logger.debug(f"Built spatial index of IFC file {file_id}: {len(index)} spaces, {index.shape} cells")
+        return index
+
+    def invalidate(self, file_id: int):
+        """Forget one file's index"""
+        self._entries.pop(file_id, None)
+
+    def clear(self):
+        """Forget every index"""
+        self._entries.clear()
+
+
+# Global spatial index cache instance
+space_indexes = SpaceIndexCache()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: POST /readings/ (one row per request) vs POST /readings/bulk
+
+Usage: python benchmarks/bench_bulk_readings.py [--single 1000] [--bulk 50000]
+"""
+
+import argparse
+import json
+from datetime import datetime, timedelta
+
+import common
+
+
+def make_rows(sensor_ids, count):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "sensor_id": sensor_ids[i % len(sensor_ids)],
+            "value": 20.0 + (i % 100) / 10.0,
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "quality_score": 1.0,
+            "is_valid": 1,
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--single", type=int, default=1000, help="rows sent one by one")
+    parser.add_argument("--bulk", type=int, default=50000, help="rows sent per bulk request")
+    parser.add_argument("--sensors", type=int, default=100)
+    args = parser.parse_args()
+
+    common.create_schema()
+    common.create_user()
+    sensor_ids = common.seed_sensors(args.sensors)
+    client = common.get_client()
+    headers = common.auth_headers()
+    url = "/api/v1/readings"
+
+    rows = make_rows(sensor_ids, args.single)
+
+    def send_single():
+        for row in rows:
+            response = client.post(f"{url}/", json=row, headers=headers)
+            response.raise_for_status()
+
+    _, elapsed = common.timed(send_single)
+    common.report("single-row POST /readings/", len(rows), elapsed)
+
+    rows = make_rows(sensor_ids, args.bulk)
+    body = json.dumps(rows)
+    _, elapsed = common.timed(
+        client.post, f"{url}/bulk", content=body,
+        headers={**headers, "Content-Type": "application/json"}
+    )
+    common.report("bulk POST /readings/bulk (JSON)", len(rows), elapsed)
+
+    body = "\n".join(json.dumps(row) for row in rows)
+    response, elapsed = common.timed(
+        client.post, f"{url}/bulk", content=body,
+        headers={**headers, "Content-Type": "application/x-ndjson"}
+    )
+    common.report("bulk POST /readings/bulk (NDJSON)", len(rows), elapsed)
+    print(f"last bulk response: accepted={response.json()['accepted']} rejected={response.json()['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
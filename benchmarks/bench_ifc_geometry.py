@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Viewer payload benchmark: space geometry artifact vs paged JSON
+
+Seeds an IFC file with ``--spaces`` spaces and compares loading all of them
+for the 3D viewer by paging GET /ifc/files/{id}/spaces (1000 per page, by
+cursor) with one GET /ifc/files/{id}/geometry, reporting bytes on the wire
+and time including decoding. Also times building the artifact.
+
+Usage: python benchmarks/bench_ifc_geometry.py [--spaces 50000] [--repeat 5]
+"""
+
+import argparse
+import json
+
+import common
+
+
+def seed(space_count):
+    """Create a file with synthetic spaces; returns its id"""
+    from sqlalchemy import insert
+    from backend.core.database import SessionLocal
+    from backend.models.ifc_file import IFCFile
+    from backend.models.ifc_space import IFCSpace
+
+    db = SessionLocal()
+    try:
+        ifc_file = IFCFile(filename="model.ifc", original_filename="model.ifc", file_path="model.ifc", file_size=0)
+        db.add(ifc_file)
+        db.flush()
+        rows = []
+        for index in range(space_count):
+            storey, position = divmod(index, 400)
+            x0, y0, z0 = (position % 20) * 10.0, (position // 20) * 10.0, storey * 3.5
+            rows.append({
+                "ifc_file_id": ifc_file.id, "ifc_id": f"S{index:07d}", "name": f"{storey:03d}.{position:03d}",
+                "long_name": f"Office {storey}.{position}", "space_type": "INTERNAL",
+                "area": 64.0, "volume": 192.0, "height": 3.0,
+                "x_coordinate": x0 + 4, "y_coordinate": y0 + 4, "z_coordinate": z0,
+                "bbox_min_x": x0, "bbox_min_y": y0, "bbox_min_z": z0,
+                "bbox_max_x": x0 + 8, "bbox_max_y": y0 + 8, "bbox_max_z": z0 + 3,
+                "level_name": f"Level {storey}", "level_elevation": z0,
+            })
+        db.execute(insert(IFCSpace), rows)
+        db.commit()
+        return ifc_file.id
+    finally:
+        db.close()
+
+
+def build_artifact(file_id):
+    from backend.core.database import SessionLocal
+    from backend.models.ifc_file import IFCFile
+    from backend.services.ifc_geometry import write_geometry
+
+    db = SessionLocal()
+    try:
+        ifc_file = db.get(IFCFile, file_id)
+        ifc_file.geometry_etag = write_geometry(db, file_id, common.WORK_DIR)
+        db.commit()
+        return ifc_file.geometry_etag
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spaces", type=int, default=50000, help="spaces in the building")
+    parser.add_argument("--repeat", type=int, default=5, help="loads per method; the fastest is reported")
+    args = parser.parse_args()
+
+    from backend.services.ifc_geometry import decode_geometry
+
+    common.create_schema()
+    common.create_user()
+    file_id = seed(args.spaces)
+    etag, elapsed = common.timed(build_artifact, file_id)
+    common.report("build geometry artifact", args.spaces, elapsed, unit="spaces")
+
+    headers = common.auth_headers()
+    with common.get_client() as client:
+        def paged_json():
+            spaces, wire, cursor = [], 0, None
+            while True:
+                params = {"limit": 1000, "count": "none"}
+                if cursor:
+                    params["cursor"] = cursor
+                response = client.get(f"/api/v1/ifc/files/{file_id}/spaces", params=params, headers=headers)
+                response.raise_for_status()
+                wire += len(response.content)
+                page = response.json()
+                spaces.extend(page["spaces"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    return len(spaces), wire, len(spaces) // 1000 + 1
+
+        def artifact():
+            response = client.get(
+                f"/api/v1/ifc/files/{file_id}/geometry", params={"v": etag},
+                headers={**headers, "Accept-Encoding": "gzip"}
+            )
+            response.raise_for_status()
+            columns = decode_geometry(response.content)
+            return len(columns["id"]), int(response.headers["content-length"]), 1
+
+        for label, load in (("paged JSON /spaces", paged_json), ("binary /geometry", artifact)):
+            best = None
+            for _ in range(args.repeat):
+                (count, wire, requests), elapsed = common.timed(load)
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{label:<24} {count:>7} spaces  {requests:>4} requests  {wire / 1024:9.0f} KiB  {best:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Heatmap benchmark: per-space sensor values of a whole building
+
+Seeds an IFC file with ``--spaces`` spaces on a grid of storeys and
+``--sensors`` temperature sensors positioned inside them, each with a
+latest value. Times assigning every sensor to its space through the
+spatial index, building the heatmap (the grouped join of sensors with
+sensor_latest), and GET /ifc/files/{id}/heatmap with a cold and a warm
+cache.
+
+Usage: python benchmarks/bench_ifc_heatmap.py [--spaces 10000] [--sensors 50000] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import common
+
+SPACES_PER_STOREY = 400
+
+
+def seed(space_count, sensor_count):
+    """Create the file, its spaces and positioned sensors with a latest value; returns the file id"""
+    from sqlalchemy import insert, update
+    from backend.core.database import SessionLocal
+    from backend.models.ifc_file import IFCFile
+    from backend.models.ifc_space import IFCSpace
+    from backend.models.sensor import Sensor
+    from backend.models.sensor_latest import SensorLatestReading
+
+    db = SessionLocal()
+    try:
+        ifc_file = IFCFile(filename="model.ifc", original_filename="model.ifc", file_path="model.ifc", file_size=0)
+        db.add(ifc_file)
+        db.flush()
+        spaces = []
+        for index in range(space_count):
+            storey, position = divmod(index, SPACES_PER_STOREY)
+            x0, y0, z0 = (position % 20) * 10.0, (position // 20) * 10.0, storey * 3.5
+            spaces.append({
+                "ifc_file_id": ifc_file.id, "ifc_id": f"S{index:07d}", "name": f"Office {index}",
+                "x_coordinate": x0 + 4, "y_coordinate": y0 + 4, "z_coordinate": z0,
+                "bbox_min_x": x0, "bbox_min_y": y0, "bbox_min_z": z0,
+                "bbox_max_x": x0 + 8, "bbox_max_y": y0 + 8, "bbox_max_z": z0 + 3,
+            })
+        db.execute(insert(IFCSpace), spaces)
+        db.commit()
+        file_id = ifc_file.id
+    finally:
+        db.close()
+
+    sensor_ids = common.seed_sensors(sensor_count)
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        positions, latest = [], []
+        for number, sensor_id in enumerate(sensor_ids):
+            space = spaces[number % space_count]
+            offset = (number // space_count) % 7
+            positions.append({
+                "id": sensor_id, "ifc_file_id": file_id,
+                "x_coordinate": space["bbox_min_x"] + 1 + offset, "y_coordinate": space["bbox_min_y"] + 1,
+                "z_coordinate": space["bbox_min_z"] + 1.5,
+            })
+            latest.append({
+                "sensor_id": sensor_id, "reading_id": number + 1, "value": 18.0 + number % 80 / 10.0,
+                "timestamp": now, "quality_score": 1.0, "is_valid": 1, "created_at": now,
+            })
+        db.execute(update(Sensor), positions)
+        db.execute(insert(SensorLatestReading), latest)
+        db.commit()
+    finally:
+        db.close()
+    return file_id
+
+
+async def time_services(file_id, sensor_count):
+    from backend.core.database import AsyncSessionLocal
+    from backend.services.heatmaps import build_heatmap
+    from backend.services.sensor_spaces import assign_file_sensors
+
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        changed = await assign_file_sensors(db, file_id)
+        await db.commit()
+        common.report("assign sensors to spaces", sensor_count, time.perf_counter() - start, unit="sensors")
+        print(f"  {changed} sensors assigned")
+
+        start = time.perf_counter()
+        heatmap = await build_heatmap(db, file_id, "temperature")
+        elapsed = time.perf_counter() - start
+        common.report("build heatmap", len(heatmap["space_ids"]), elapsed, unit="spaces")
+
+
+def time_endpoint(file_id, repeat):
+    from backend.services.heatmaps import heatmaps
+
+    headers = common.auth_headers()
+    url = f"/api/v1/ifc/files/{file_id}/heatmap"
+    with common.get_client() as client:
+        for label, cache in (("cold cache", False), ("warm cache", True)):
+            samples = []
+            for _ in range(repeat):
+                if not cache:
+                    heatmaps.clear()
+                response, elapsed = common.timed(client.get, url, params={"sensor_type": "temperature"}, headers=headers)
+                response.raise_for_status()
+                samples.append(elapsed)
+            print(f"{'GET heatmap, ' + label:<40} p50 {common.percentile(samples, 50) * 1000:8.3f} ms  "
+                  f"p99 {common.percentile(samples, 99) * 1000:8.3f} ms  ({len(response.content) / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spaces", type=int, default=10000, help="spaces in the building")
+    parser.add_argument("--sensors", type=int, default=50000, help="sensors placed in the spaces")
+    parser.add_argument("--repeat", type=int, default=200, help="requests per cache state")
+    args = parser.parse_args()
+
+    common.create_schema()
+    common.create_user()
+    file_id, elapsed = common.timed(seed, args.spaces, args.sensors)
+    print(f"seeded {args.spaces} spaces and {args.sensors} sensors in {elapsed:.1f}s")
+    asyncio.run(time_services(file_id, args.sensors))
+    time_endpoint(file_id, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
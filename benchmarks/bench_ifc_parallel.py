@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark: tokenizing one large IFC model across processes
+
+Writes a synthetic IFC4 model (benchmarks/common.py) and times building its
+entity index with StepFile(workers=N) for each worker count, reporting
+MB/s, speedup and parallel efficiency against one worker. Every parallel
+index is checked to be identical to the sequential one. Process start-up
+and the merge are included in the timings; StepFile caps the worker count
+at the number of CPUs.
+
+Usage: python benchmarks/bench_ifc_parallel.py [--size 256] [--workers 1,2,4,8] [--repeat 3]
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+import common
+
+
+def build_index(path, workers):
+    from backend.ifc.step import StepFile
+
+    step = StepFile(path, persist_index=False, workers=workers)
+    index = step.index
+    step.close()
+    return index
+
+
+def same_index(a, b):
+    return (
+        [a.types[code] for code in a.type_codes] == [b.types[code] for code in b.type_codes]
+        and all(np.array_equal(getattr(a, name), getattr(b, name)) for name in ("ids", "offsets", "lengths"))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=float, default=256, help="model size in MB")
+    parser.add_argument("--workers", default=None, help="worker counts (default: powers of two up to the CPU count)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per worker count; the fastest is reported")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(",")]
+    else:
+        counts = sorted({1, cpus} | {2 ** n for n in range(1, cpus.bit_length()) if 2 ** n <= cpus})
+
+    path = os.path.join(common.WORK_DIR, f"model_{args.size:g}mb.ifc")
+    generated, elapsed = common.timed(common.write_synthetic_ifc, path, args.size)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"{size_mb:.0f} MB model generated in {elapsed:.1f}s: {generated}; {cpus} CPUs")
+
+    reference = None
+    baseline = None
+    for workers in counts:
+        best = None
+        for _ in range(args.repeat):
+            index, elapsed = common.timed(build_index, path, workers)
+            best = elapsed if best is None else min(best, elapsed)
+        if reference is None:
+            reference = index
+        identical = same_index(reference, index)
+        baseline = baseline or best
+        print(f"{workers:>3} workers  {best:7.2f}s  {size_mb / best:7.1f} MB/s  "
+              f"speedup {baseline / best:5.2f}x  efficiency {baseline / best / workers:6.1%}  "
+              f"{len(index)} entities{'' if identical else '  INDEX DIFFERS'}")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
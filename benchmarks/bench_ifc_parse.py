@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: parsing synthetic IFC models
+
+For each size, writes an IFC4 model (benchmarks/common.py) and times the
+single-pass StepFile scan, reopening it from the persisted entity index,
+decoding every IfcSpace, resolving their placements, storeys, quantities
+and bounding boxes (SpatialModel), and the full IFCProcessor._parse_ifc_file. Sizes up to ``--legacy-max`` MB are also
+run through the previous line-based parser (whole file in memory, three
+passes, one entity assumed per line) for comparison. With ``--memory``
+each step is repeated under tracemalloc to report the peak Python heap
+(the memory-mapped file is not counted); tracemalloc slows the run, so
+timings come from the first run.
+
+Usage: python benchmarks/bench_ifc_parse.py [--sizes 10,100,500] [--legacy-max 100] [--memory]
+"""
+
+import argparse
+import os
+import tracemalloc
+
+import common
+
+
+def legacy_parse(path):
+    """The line-based parser IFCProcessor used before StepFile"""
+    with open(path, "r", encoding="utf-8") as file:
+        content = file.read()
+    header = {}
+    in_header = False
+    for line in content.split("\n"):
+        line = line.strip()
+        if line.startswith("HEADER"):
+            in_header = True
+        elif line.startswith("ENDSEC"):
+            break
+        elif in_header and "FILE_NAME" in line:
+            header["file_name"] = line
+    entities = {}
+    for line in content.split("\n"):
+        line = line.strip()
+        if line.startswith("#"):
+            parts = line.split("=")
+            if len(parts) >= 2:
+                entities[parts[0].strip("#")] = {"type": parts[1].split("(")[0].strip(), "raw": line}
+    spaces = [line for line in content.split("\n") if "IFCSPACE" in line]
+    return header, entities, spaces
+
+
+MEMORY = False
+
+
+def measure(func, *args):
+    """Return (result, elapsed seconds, peak traced heap bytes or None)"""
+    result, elapsed = common.timed(func, *args)
+    peak = None
+    if MEMORY:
+        del result
+        tracemalloc.start()
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def line(label, size_mb, elapsed, peak, extra=""):
+    memory = f"peak heap {peak / 1024 / 1024:8.1f} MB  " if peak is not None else ""
+    print(f"{size_mb:>5.0f} MB  {label:<28} {elapsed:7.2f}s  {size_mb / elapsed:7.1f} MB/s  {memory}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,100,500", help="model sizes in MB")
+    parser.add_argument("--legacy-max", type=float, default=100, help="largest size run through the old parser")
+    parser.add_argument("--memory", action="store_true", help="also report peak heap (slow)")
+    args = parser.parse_args()
+    global MEMORY
+    MEMORY = args.memory
+
+    from backend.ifc.spatial import SpatialModel
+    from backend.ifc.step import StepFile
+    from backend.services.ifc_processor import IFCProcessor
+
+    for size_mb in (float(size) for size in args.sizes.split(",")):
+        path = os.path.join(common.WORK_DIR, f"model_{size_mb:g}mb.ifc")
+        counts, elapsed = common.timed(common.write_synthetic_ifc, path, size_mb)
+        actual_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"{actual_mb:>5.0f} MB  generated in {elapsed:.1f}s: {counts}")
+
+        step, elapsed, peak = measure(lambda: StepFile(path, persist_index=False))
+        line("StepFile scan", actual_mb, elapsed, peak, f"{len(step)} entities")
+        step.close()
+        StepFile(path).close()  # writes the index
+        step, elapsed, peak = measure(StepFile, path)
+        index_mb = os.path.getsize(path + ".idx") / 1024 / 1024
+        line("StepFile from .idx", actual_mb, elapsed, peak, f"index file {index_mb:.1f} MB")
+        space_ids = step.ids_of_type("IFCSPACE")
+        _, elapsed = common.timed(lambda: [step.entity(entity_id) for entity_id in space_ids])
+        print(f"{'':>8}  decode {len(space_ids)} spaces {elapsed:7.2f}s")
+        model = SpatialModel(step)
+        _, elapsed = common.timed(lambda: [model.space_geometry(entity_id, step.entity(entity_id).args)
+                                           for entity_id in space_ids])
+        print(f"{'':>8}  resolve {len(space_ids)} spaces {elapsed:7.2f}s  "
+              f"({elapsed / max(len(space_ids), 1) * 1e6:.0f} us/space, {len(model._transforms)} placements cached)")
+        step.close()
+
+        processor = IFCProcessor()
+        ifc_data, elapsed, peak = measure(processor._parse_ifc_file, path)
+        line("IFCProcessor parse", actual_mb, elapsed, peak, f"{len(ifc_data['spaces'])} spaces")
+
+        if size_mb <= args.legacy_max:
+            (_, entities, _), elapsed, peak = measure(legacy_parse, path)
+            line("previous line-based parser", actual_mb, elapsed, peak, f"{len(entities)} entities")
+        os.remove(path)
+        os.remove(path + ".idx")
+
+
+if __name__ == "__main__":
+    main()
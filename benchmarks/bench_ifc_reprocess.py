@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Incremental processing benchmark: reprocessing revised IFC models
+
+Processes a synthetic IFC4 model (benchmarks/common.py) into the database,
+then times IFCProcessor.process_ifc_file for:
+
+- reprocessing the identical file (skipped by content hash),
+- a revision in which ``--changed`` percent of the spaces were renamed
+  (only their fingerprints differ, so only they are extracted and written),
+- a forced full reprocess of the revision.
+
+Usage: python benchmarks/bench_ifc_reprocess.py [--size 50] [--changed 1]
+"""
+
+import argparse
+import os
+import re
+
+import common
+
+
+def revise(path, revised_path, changed_pct):
+    """Copy the model, renaming every n-th space; returns the number renamed"""
+    with open(path, "r", encoding="ascii") as file:
+        text = file.read()
+    every = max(1, round(100 / changed_pct))
+    count = [0, 0]
+
+    def rename(match):
+        count[0] += 1
+        if count[0] % every:
+            return match.group(0)
+        count[1] += 1
+        return match.group(0)[:-1] + " rev'"
+
+    with open(revised_path, "w", encoding="ascii") as out:
+        out.write(re.sub(r"'Office \d+\.\d+'", rename, text))
+    return count[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=float, default=50, help="model size in MB")
+    parser.add_argument("--changed", type=float, default=1, help="percent of spaces changed in the revision")
+    args = parser.parse_args()
+
+    from backend.core.database import SessionLocal
+    from backend.models.ifc_file import IFCFile
+    from backend.models.ifc_space import IFCSpace
+    from backend.services.ifc_processor import IFCProcessor
+    from backend.services.ifc_storage import hash_file
+
+    common.create_schema()
+    path = os.path.join(common.WORK_DIR, "model.ifc")
+    counts = common.write_synthetic_ifc(path, args.size)
+    revised_path = os.path.join(common.WORK_DIR, "model_rev.ifc")
+    renamed = revise(path, revised_path, args.changed)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"{size_mb:.0f} MB model: {counts}; revision renames {renamed} spaces")
+
+    db = SessionLocal()
+    ifc_file = IFCFile(
+        filename="model.ifc", original_filename="model.ifc", file_path=path,
+        file_size=os.path.getsize(path), file_hash=hash_file(path)
+    )
+    db.add(ifc_file)
+    db.commit()
+    file_id = ifc_file.id
+    db.close()
+
+    def process(label, force=False):
+        _, elapsed = common.timed(IFCProcessor().process_ifc_file, file_id, force=force)
+        db = SessionLocal()
+        try:
+            stored = db.query(IFCSpace).filter(IFCSpace.ifc_file_id == file_id).count()
+        finally:
+            db.close()
+        print(f"{label:<36} {elapsed:8.2f}s  {stored} spaces stored")
+
+    process("first processing")
+    process("identical file")
+
+    db = SessionLocal()
+    ifc_file = db.get(IFCFile, file_id)
+    ifc_file.file_path = revised_path
+    ifc_file.file_size = os.path.getsize(revised_path)
+    ifc_file.file_hash = hash_file(revised_path)
+    db.commit()
+    db.close()
+    process(f"revision ({args.changed:g}% of spaces changed)")
+    process("revision, forced full reprocess", force=True)
+
+
+if __name__ == "__main__":
+    main()
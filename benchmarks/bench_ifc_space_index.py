@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Spatial index benchmark: point, box and nearest-space lookups
+
+Builds SpaceIndex over a synthetic building (storeys of rectangular rooms
+of varied size, plus spaces known only by their coordinates) and reports
+p50/p99 latency of random containing-point, box-intersection and k-nearest
+queries, next to a linear numpy scan over all boxes. Every index answer is
+checked against the scan.
+
+Usage: python benchmarks/bench_ifc_space_index.py [--spaces 50000] [--queries 2000] [--k 5]
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import common
+
+
+def synthetic_rows(count, rng):
+    """Rooms laid out in rows on 3.5 m storeys of 400 rooms; every 20th has no bounding box"""
+    rows = []
+    for index in range(count):
+        storey, position = divmod(index, 400)
+        x0 = (position % 20) * 12.0 + rng.uniform(0, 2)
+        y0 = (position // 20) * 10.0 + rng.uniform(0, 2)
+        width, depth = rng.uniform(4, 10), rng.uniform(4, 8)
+        z = storey * 3.5
+        row = SimpleNamespace(
+            id=index + 1, x_coordinate=x0 + width / 2, y_coordinate=y0 + depth / 2, z_coordinate=z, height=3.0,
+            bbox_min_x=x0, bbox_min_y=y0, bbox_min_z=z, bbox_max_x=x0 + width, bbox_max_y=y0 + depth, bbox_max_z=z + 3.0,
+        )
+        if index % 20 == 19:
+            row.bbox_min_x = None
+        rows.append(row)
+    return rows
+
+
+def scan_containing(index, x, y, z):
+    boxes = index.boxes
+    inside = (boxes[:, 0] <= x) & (x <= boxes[:, 3]) & (boxes[:, 1] <= y) & (y <= boxes[:, 4])
+    inside &= (boxes[:, 2] <= z) & (z <= boxes[:, 5])
+    return set(index.ids[inside].tolist())
+
+
+def scan_intersecting(index, box):
+    min_x, min_y, max_x, max_y, min_z, max_z = box
+    boxes = index.boxes
+    hit = (boxes[:, 0] <= max_x) & (min_x <= boxes[:, 3]) & (boxes[:, 1] <= max_y) & (min_y <= boxes[:, 4])
+    hit &= (min_z <= boxes[:, 5]) & (boxes[:, 2] <= max_z)
+    return sorted(index.ids[hit].tolist())
+
+
+def scan_nearest(index, x, y, z, k):
+    distances = index._distances(np.arange(len(index)), x, y, z)
+    return np.sort(distances)[:k]
+
+
+def measure(label, queries, run):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        run(*query)
+        samples.append(time.perf_counter() - start)
+    print(f"{label:<40} p50 {common.percentile(samples, 50) * 1e6:8.1f} us  "
+          f"p99 {common.percentile(samples, 99) * 1e6:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spaces", type=int, default=50000, help="spaces in the building")
+    parser.add_argument("--queries", type=int, default=2000, help="random queries per kind")
+    parser.add_argument("--k", type=int, default=5, help="spaces per nearest query")
+    args = parser.parse_args()
+
+    from backend.services.space_index import SpaceIndex
+
+    rng = np.random.default_rng(7)
+    rows = synthetic_rows(args.spaces, rng)
+    index, elapsed = common.timed(SpaceIndex.from_rows, rows)
+    common.report("build index", len(index), elapsed, unit="spaces")
+    print(f"grid of {'x'.join(map(str, index.shape))} cells of {'x'.join(f'{size:.1f}' for size in index.cell_size)} m, "
+          f"{len(index.members) / len(index):.2f} cells per space")
+
+    top = index.boxes[:, 3:].max(axis=0)
+    points = [tuple(rng.uniform(0, top[axis]) for axis in range(3)) for _ in range(args.queries)]
+    boxes = []
+    for x, y, z in points:
+        half = rng.uniform(1, 20)
+        boxes.append((x - half, y - half, x + half, y + half, z - 1, z + 1))
+
+    measure("containing point (index)", points, index.containing)
+    measure("containing point (scan)", points, lambda x, y, z: scan_containing(index, x, y, z))
+    measure("intersecting box (index)", [(box,) for box in boxes], lambda box: index.intersecting(*box))
+    measure("intersecting box (scan)", [(box,) for box in boxes], lambda box: scan_intersecting(index, box))
+    measure(f"{args.k} nearest (index)", points, lambda x, y, z: index.nearest(x, y, z, args.k))
+    measure(f"{args.k} nearest (scan)", points, lambda x, y, z: scan_nearest(index, x, y, z, args.k))
+
+    mismatches = 0
+    for (x, y, z), box in zip(points, boxes):
+        mismatches += set(index.containing(x, y, z)) != scan_containing(index, x, y, z)
+        mismatches += index.intersecting(*box) != scan_intersecting(index, box)
+        nearest = [distance for _, distance in index.nearest(x, y, z, args.k)]
+        mismatches += not np.allclose(nearest, scan_nearest(index, x, y, z, args.k))
+    print(f"answers differing from the scan: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Space write benchmark: saving extracted IFC spaces
+
+Times writing N synthetic spaces of one IFC file into the database, each
+followed by a commit:
+
+- adding one ORM object per space (how spaces used to be saved),
+- IFCProcessor._write_spaces inserting them in multi-row chunks,
+- _write_spaces replacing all of them with changed versions (bulk updates),
+- _write_spaces replacing them with a model sharing none of their GlobalIds
+  (bulk deletes and inserts).
+
+It also checks that a write rolled back before its commit leaves the
+previous spaces in place.
+
+Usage: python benchmarks/bench_ifc_space_write.py [--spaces 1000,10000,50000]
+"""
+
+import argparse
+
+import common
+
+
+def synthetic_spaces(count, prefix="S", revision=0):
+    return [
+        {
+            "ifc_id": f"{prefix}{index:07d}",
+            "fingerprint": f"{revision:02d}{index:030d}",
+            "name": f"Office {index}",
+            "long_name": f"Room {index}; revision {revision}",
+            "space_type": "INTERNAL",
+            "area": 20.0 + index % 7,
+            "volume": 60.0 + index % 7,
+            "height": 3.0,
+            "x_coordinate": float(index % 100) * 5,
+            "y_coordinate": float(index // 100 % 100) * 5,
+            "z_coordinate": float(index // 10000) * 3.5,
+            "bbox_min_x": float(index % 100) * 5 - 2,
+            "bbox_min_y": float(index // 100 % 100) * 5 - 2,
+            "bbox_min_z": float(index // 10000) * 3.5,
+            "bbox_max_x": float(index % 100) * 5 + 2,
+            "bbox_max_y": float(index // 100 % 100) * 5 + 2,
+            "bbox_max_z": float(index // 10000) * 3.5 + 3,
+            "level_name": f"Level {index // 10000}",
+            "level_elevation": float(index // 10000) * 3.5,
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spaces", default="1000,10000,50000", help="space counts")
+    args = parser.parse_args()
+
+    from sqlalchemy import func, select
+
+    from backend.core.database import SessionLocal
+    from backend.models.ifc_file import IFCFile
+    from backend.models.ifc_space import IFCSpace
+    from backend.services.ifc_processor import SPACE_FIELDS, IFCProcessor
+
+    common.create_schema()
+    processor = IFCProcessor()
+
+    def new_file(db, name):
+        ifc_file = IFCFile(filename=name, original_filename=name, file_path=name, file_size=0)
+        db.add(ifc_file)
+        db.commit()
+        return ifc_file.id
+
+    def stored(db, file_id):
+        return db.execute(
+            select(IFCSpace.id, IFCSpace.ifc_id, IFCSpace.fingerprint)
+            .where(IFCSpace.ifc_file_id == file_id)
+            .order_by(IFCSpace.id)
+        ).all()
+
+    def count(db, file_id):
+        return db.scalar(select(func.count()).where(IFCSpace.ifc_file_id == file_id))
+
+    def orm_add(db, file_id, spaces):
+        for space_data in spaces:
+            db.add(IFCSpace(ifc_file_id=file_id, **{field: space_data.get(field) for field in SPACE_FIELDS}))
+        db.commit()
+
+    def bulk_write(db, file_id, spaces):
+        processor._write_spaces(db, file_id, spaces, [], stored(db, file_id))
+        db.commit()
+
+    db = SessionLocal()
+    try:
+        for total in (int(value) for value in args.spaces.split(",")):
+            print(f"{total} spaces")
+
+            file_id = new_file(db, f"orm_{total}.ifc")
+            _, elapsed = common.timed(orm_add, db, file_id, synthetic_spaces(total))
+            db.expunge_all()
+            common.report("  ORM add per space", total, elapsed, unit="spaces")
+
+            file_id = new_file(db, f"bulk_{total}.ifc")
+            _, elapsed = common.timed(bulk_write, db, file_id, synthetic_spaces(total))
+            common.report("  bulk insert", total, elapsed, unit="spaces")
+
+            _, elapsed = common.timed(bulk_write, db, file_id, synthetic_spaces(total, revision=1))
+            common.report("  bulk replace, same GlobalIds", total, elapsed, unit="spaces")
+
+            _, elapsed = common.timed(bulk_write, db, file_id, synthetic_spaces(total, prefix="T"))
+            common.report("  bulk replace, new GlobalIds", total, elapsed, unit="spaces")
+
+            processor._write_spaces(db, file_id, synthetic_spaces(total, prefix="U"), [], stored(db, file_id))
+            db.rollback()
+            kept = db.scalar(
+                select(func.count()).where(IFCSpace.ifc_file_id == file_id, IFCSpace.ifc_id.like("T%"))
+            )
+            print(f"  rolled back write keeps previous spaces: {kept == total == count(db, file_id)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: storing an uploaded IFC file
+
+Compares peak Python heap usage of reading the whole upload and writing it
+out (the previous upload endpoint) with store_upload, which streams it to
+disk in chunks, for uploads of increasing size. Also times POST /ifc/upload
+end to end (processing is queued, not awaited).
+
+Usage: python benchmarks/bench_ifc_upload.py [--sizes 10,50,100]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import tracemalloc
+
+import common
+
+CHUNK = b"#1=IFCWALL('0abc',$,$,'Wall',$,$,$,$);\n" * 1024
+
+
+def make_upload(size_mb):
+    from fastapi import UploadFile
+
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    remaining = size_mb * 1024 * 1024
+    while remaining > 0:
+        spool.write(CHUNK[:remaining])
+        remaining -= len(CHUNK)
+    spool.seek(0)
+    return UploadFile(spool, filename="bench.ifc")
+
+
+async def read_whole(upload, directory):
+    content = await upload.read()
+    with open(os.path.join(directory, "whole.ifc"), "wb") as buffer:
+        buffer.write(content)
+    return len(content)
+
+
+async def stream(upload, directory):
+    from backend.services.ifc_storage import store_upload
+
+    stored = await store_upload(upload, directory, "streamed.ifc", max_size=1 << 40)
+    return stored.size
+
+
+def peak_memory(func, size_mb, directory):
+    upload = make_upload(size_mb)
+    tracemalloc.start()
+    _, elapsed = common.timed(asyncio.run, func(upload, directory))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,50,100", help="upload sizes in MB")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    directory = tempfile.mkdtemp(dir=common.WORK_DIR)
+    for size_mb in sizes:
+        for label, func in (("read whole file", read_whole), ("store_upload", stream)):
+            peak, elapsed = peak_memory(func, size_mb, directory)
+            print(f"{size_mb:>4} MB  {label:<20} peak heap {peak / 1024 / 1024:8.2f} MB  {elapsed:6.3f}s")
+
+    common.create_schema()
+    common.create_user()
+    client = common.get_client()
+    headers = common.auth_headers()
+    for size_mb in sizes:
+        upload = make_upload(size_mb)
+        response, elapsed = common.timed(
+            client.post, "/api/v1/ifc/upload", headers=headers,
+            files={"file": ("bench.ifc", upload.file, "application/octet-stream")}
+        )
+        response.raise_for_status()
+        print(f"{size_mb:>4} MB  POST /ifc/upload        {elapsed:6.3f}s  "
+              f"status {response.json()['processing_status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: GET /readings/latest against a large reading history
+
+Seeds ``--readings`` raw readings spread over ``--sensors`` sensors, then
+compares a GROUP BY over sensor_readings with the sensor_latest lookup
+that /readings/latest uses, and times the endpoint itself.
+
+Usage: python benchmarks/bench_latest_readings.py [--sensors 200] [--readings 500000]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import common
+
+
+def seed_readings(sensor_ids, count, chunk=20000):
+    from sqlalchemy import insert
+    from backend.core.database import SessionLocal
+    from backend.models.reading import SensorReading
+
+    start = datetime(2024, 1, 1)
+    db = SessionLocal()
+    try:
+        for offset in range(0, count, chunk):
+            db.execute(insert(SensorReading), [
+                {
+                    "sensor_id": sensor_ids[i % len(sensor_ids)],
+                    "value": 20.0 + (i % 100) / 10.0,
+                    "timestamp": start + timedelta(seconds=i),
+                    "quality_score": 1.0,
+                    "is_valid": 1,
+                }
+                for i in range(offset, min(offset + chunk, count))
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def time_queries(repeat):
+    from sqlalchemy import and_, select
+    from sqlalchemy.sql import func
+    from backend.core.database import AsyncSessionLocal
+    from backend.models.reading import SensorReading
+    from backend.services.latest_readings import get_latest, rebuild_latest
+
+    async with AsyncSessionLocal() as db:
+        await rebuild_latest(db)
+
+        newest = (
+            select(SensorReading.sensor_id, func.max(SensorReading.timestamp).label("max_timestamp"))
+            .group_by(SensorReading.sensor_id)
+            .subquery()
+        )
+        group_by = select(SensorReading).join(newest, and_(
+            SensorReading.sensor_id == newest.c.sensor_id,
+            SensorReading.timestamp == newest.c.max_timestamp
+        ))
+
+        for label, run in (
+            ("GROUP BY over sensor_readings", lambda: db.scalars(group_by)),
+            ("sensor_latest lookup", lambda: get_latest(db)),
+        ):
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await run()
+                samples.append(time.perf_counter() - start)
+            print(f"{label:<40} p50 {common.percentile(samples, 50) * 1000:8.3f} ms  "
+                  f"p99 {common.percentile(samples, 99) * 1000:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sensors", type=int, default=200)
+    parser.add_argument("--readings", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    common.create_schema()
+    common.create_user()
+    sensor_ids = common.seed_sensors(args.sensors)
+    _, elapsed = common.timed(seed_readings, sensor_ids, args.readings)
+    common.report("seeded readings", args.readings, elapsed)
+
+    asyncio.run(time_queries(args.repeat))
+
+    client = common.get_client()
+    headers = common.auth_headers()
+    samples = []
+    for _ in range(args.repeat):
+        response, elapsed = common.timed(client.get, "/api/v1/readings/latest", headers=headers)
+        response.raise_for_status()
+        samples.append(elapsed)
+    print(f"{'GET /readings/latest':<40} p50 {common.percentile(samples, 50) * 1000:8.3f} ms  "
+          f"p99 {common.percentile(samples, 99) * 1000:8.3f} ms  ({len(response.json())} sensors)")
+
+
+if __name__ == "__main__":
+    main()
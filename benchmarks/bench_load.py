@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent dashboard reads and bulk ingestion against the API
+
+Dashboard clients loop over the list endpoints the UIs poll while ingestion
+clients post batches to /readings/bulk. Requests go through the ASGI app
+in-process on one event loop, so any blocking call in a handler shows up
+directly as latency for every other client.
+
+Usage: python benchmarks/bench_load.py [--duration 10] [--dashboard-clients 20]
+                                       [--ingest-clients 4] [--batch 500]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import common
+
+DASHBOARD_PATHS = [
+    "/api/v1/sensors/?limit=100",
+    "/api/v1/alerts/?limit=50",
+    "/api/v1/readings/?limit=100",
+    "/api/v1/locations/",
+]
+
+
+def seed(sensor_count: int, reading_count: int):
+    from sqlalchemy import insert
+    from backend.core.database import SessionLocal
+    from backend.models.reading import SensorReading
+
+    common.create_schema()
+    common.create_user()
+    sensor_ids = common.seed_sensors(sensor_count)
+    start = datetime.utcnow() - timedelta(days=7)
+    db = SessionLocal()
+    try:
+        rows = [
+            {"sensor_id": sensor_ids[i % sensor_count], "value": 20.0 + i % 10,
+             "timestamp": start + timedelta(seconds=i)}
+            for i in range(reading_count)
+        ]
+        for offset in range(0, len(rows), 10000):
+            db.execute(insert(SensorReading), rows[offset:offset + 10000])
+        db.commit()
+    finally:
+        db.close()
+    return sensor_ids
+
+
+async def dashboard_client(client, headers, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(random.choice(DASHBOARD_PATHS), headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def ingest_client(client, headers, deadline, latencies, sensor_ids, batch):
+    while time.perf_counter() < deadline:
+        now = datetime.utcnow().isoformat()
+        rows = [{"sensor_id": random.choice(sensor_ids), "value": random.uniform(15, 35), "timestamp": now}
+                for _ in range(batch)]
+        start = time.perf_counter()
+        response = await client.post("/api/v1/readings/bulk", json=rows, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+def summarize(label, latencies, duration):
+    ms = [latency * 1000.0 for latency in latencies]
+    print(f"{label:<10} {len(ms):>6} req  {len(ms) / duration:8.1f} req/s  "
+          f"p50 {common.percentile(ms, 50):8.1f} ms  p95 {common.percentile(ms, 95):8.1f} ms  "
+          f"p99 {common.percentile(ms, 99):8.1f} ms")
+
+
+async def run(args, sensor_ids):
+    import httpx
+    from main import app
+
+    headers = common.auth_headers()
+    dashboard, ingest = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(dashboard_client(client, headers, deadline, dashboard) for _ in range(args.dashboard_clients)),
+            *(ingest_client(client, headers, deadline, ingest, sensor_ids, args.batch)
+              for _ in range(args.ingest_clients)),
+        )
+    summarize("dashboard", dashboard, args.duration)
+    summarize("ingest", ingest, args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--dashboard-clients", type=int, default=20)
+    parser.add_argument("--ingest-clients", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--sensors", type=int, default=200)
+    parser.add_argument("--readings", type=int, default=200000)
+    args = parser.parse_args()
+
+    sensor_ids = seed(args.sensors, args.readings)
+    import logging
+    logging.disable(logging.INFO)
+    asyncio.run(run(args, sensor_ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Login burst benchmark: POST /auth/login throughput and event loop stalls
+
+Fires ``--logins`` concurrent logins (``--concurrency`` at a time) while a
+probe client polls /health. With bcrypt on the event loop every login
+stalls the probe; with the hashing pool the probe stays responsive.
+Requests go through the ASGI app in-process on one event loop.
+
+Usage: python benchmarks/bench_login.py [--logins 40] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import common
+
+PASSWORD = "bench-password"
+
+
+async def run_burst(app, logins, concurrency):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies = []
+        probe_latencies = []
+        statuses = {}
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/api/v1/auth/login", data={"username": "bench", "password": PASSWORD}
+                    )
+                    outcome = response.status_code
+                except Exception as e:
+                    # A stalled event loop can hold SQLite write locks past their timeout
+                    outcome = type(e).__name__
+                login_latencies.append(time.perf_counter() - start)
+                statuses[outcome] = statuses.get(outcome, 0) + 1
+
+        async def probe():
+            # Measured from when the probe was due, so time the event loop
+            # spends blocked before waking the sleep counts as latency
+            while not done.is_set():
+                due = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                (await client.get("/health")).raise_for_status()
+                probe_latencies.append(time.perf_counter() - due)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+        return elapsed, login_latencies, probe_latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4, help="PASSWORD_HASH_WORKERS for the pooled run")
+    args = parser.parse_args()
+
+    from backend.auth.security import get_password_hash, password_hasher
+    from backend.core.config import settings
+    from main import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    common.create_schema()
+    common.create_user(hashed_password=get_password_hash(PASSWORD))
+
+    for label, workers in (("bcrypt on event loop", 0), (f"bcrypt pool ({args.workers} threads)", args.workers)):
+        settings.PASSWORD_HASH_WORKERS = workers
+        settings.PASSWORD_HASH_MAX_QUEUE = args.logins
+        elapsed, logins, probes, statuses = asyncio.run(run_burst(app, args.logins, args.concurrency))
+        password_hasher.shutdown()
+        common.report(label, args.logins, elapsed, "logins")
+        print(f"    login p50 {common.percentile(logins, 50) * 1000:8.1f} ms  "
+              f"p99 {common.percentile(logins, 99) * 1000:8.1f} ms  statuses {statuses}")
+        print(f"    /health probe p50 {common.percentile(probes, 50) * 1000:8.1f} ms  "
+              f"max {max(probes) * 1000:8.1f} ms  ({len(probes)} probes)")
+    print(f"pool metrics: {password_hasher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
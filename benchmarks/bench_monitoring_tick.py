@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark one MonitoringService tick (_check_sensors) against N active sensors
+
+Reports wall time, the number of SQL statements issued per tick and the
+service's acquisition metrics. ``--device-latency`` adds a random delay to
+every simulated driver request to model real device I/O.
+
+Usage: python benchmarks/bench_monitoring_tick.py [--sensors 1000 10000 50000]
+                                                  [--device-latency 50] [--batch-size 1]
+"""
+
+import argparse
+import asyncio
+import random
+
+import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sensors", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--ticks", type=int, default=3)
+    parser.add_argument("--device-latency", type=float, default=0.0,
+                        help="maximum simulated device latency in milliseconds")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="sensors per simulator request (default: driver default)")
+    args = parser.parse_args()
+
+    from sqlalchemy import event
+    from backend.core.database import async_engine
+    from backend.drivers.registry import driver_registry
+    from backend.services.monitoring_service import MonitoringService
+
+    common.create_schema()
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+    service = MonitoringService()
+    simulator = driver_registry.default
+    if args.batch_size:
+        simulator.max_batch_size = args.batch_size
+    if args.device_latency:
+        read_batch = simulator.read_batch
+
+        async def slow_read_batch(sensors):
+            await asyncio.sleep(random.uniform(0, args.device_latency) / 1000.0)
+            return await read_batch(sensors)
+
+        simulator.read_batch = slow_read_batch
+
+    total = 0
+    for count in args.sensors:
+        common.seed_sensors(count - total)
+        total = count
+        for tick in range(args.ticks):
+            statements.clear()
+            _, elapsed = common.timed(asyncio.run, service._check_sensors())
+            common.report(f"tick {tick + 1} ({count} sensors, {len(statements)} stmts)", count, elapsed, "sensors")
+            print(f"    {service.last_tick_metrics}")
+
+
+if __name__ == "__main__":
+    main()
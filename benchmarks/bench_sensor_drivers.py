@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark batched vs per-sensor reads through the Modbus TCP driver
+
+Runs the in-process ModbusStandInServer (tests/modbus_server.py) and reads N sensors mapped to
+consecutive holding registers, first one request per sensor and then with
+the driver's batched multi-register requests over the same connection.
+
+Usage: python benchmarks/bench_sensor_drivers.py [--sensors 5000] [--units 4]
+"""
+
+import argparse
+import asyncio
+from types import SimpleNamespace
+
+import common
+
+
+async def run(args):
+    from backend.drivers.modbus import ModbusTCPDriver
+    from tests.modbus_server import ModbusStandInServer
+
+    server = ModbusStandInServer()
+    sensors = []
+    for i in range(args.sensors):
+        unit, register = i % args.units + 1, i // args.units
+        server.set_value(unit, register, 200 + i % 100)
+        sensors.append(SimpleNamespace(id=i + 1, device_id=f"{unit}:{register}"))
+    port = await server.start()
+    driver = ModbusTCPDriver("127.0.0.1", port, scale=0.1)
+
+    try:
+        for label, batch_size in (("one request per sensor", 1), ("batched register reads", driver.max_batch_size)):
+            server.request_count = 0
+            start = asyncio.get_running_loop().time()
+            readings = {}
+            for offset in range(0, len(sensors), batch_size):
+                readings.update(await driver.read_batch(sensors[offset:offset + batch_size]))
+            elapsed = asyncio.get_running_loop().time() - start
+            assert len(readings) == len(sensors), "missing readings"
+            common.report(f"{label} ({server.request_count} requests)", len(sensors), elapsed, "sensors")
+    finally:
+        await driver.close()
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sensors", type=int, default=5000)
+    parser.add_argument("--units", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
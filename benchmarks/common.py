@@ -0,0 +1,234 @@
+"""
+Shared helpers for the benchmark scripts
+
+Each benchmark runs against a throwaway SQLite database inside a temporary
+working directory, so it never touches ifc_monitoring.db or uploads/.
+Import this module before anything from ``backend`` or ``main``.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Inherited through the environment so spawned worker processes share it
+WORK_DIR = os.environ.setdefault("IFC_BENCH_DIR", tempfile.mkdtemp(prefix="ifc_bench_"))
+os.chdir(WORK_DIR)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}")
+
+
+def create_schema():
+    """Create all tables in the benchmark database"""
+    from backend.core.database import engine
+    from backend.models import Base
+
+    Base.metadata.create_all(bind=engine)
+
+
+def create_user(username: str = "bench", hashed_password: str = "!", **fields):
+    """Create a user directly in the database and return its id"""
+    from backend.core.database import SessionLocal
+    from backend.models.user import User, UserRole
+
+    db = SessionLocal()
+    try:
+        user = User(
+            username=username,
+            email=f"{username}@bench.local",
+            full_name="Benchmark User",
+            hashed_password=hashed_password,
+            role=fields.pop("role", UserRole.ADMIN),
+            is_active=True,
+            **fields
+        )
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def seed_sensors(count: int, sensor_type: str = "temperature", **fields) -> List[int]:
+    """Create a location with ``count`` active sensors and return their ids"""
+    from sqlalchemy import insert
+    from backend.core.database import SessionLocal
+    from backend.models.location import Location
+    from backend.models.sensor import Sensor
+
+    db = SessionLocal()
+    try:
+        location = Location(name="Benchmark")
+        db.add(location)
+        db.flush()
+        offset = db.query(Sensor).count()
+        rows = [
+            {
+                "name": f"Sensor {offset + i}",
+                "sensor_type": sensor_type,
+                "location_id": location.id,
+                "device_id": f"bench-{offset + i}",
+                "is_active": True,
+                "update_interval": fields.get("update_interval", 60),
+                "alert_threshold_min": fields.get("alert_threshold_min", 18.0),
+                "alert_threshold_max": fields.get("alert_threshold_max", 30.0),
+                "unit": fields.get("unit", "°C"),
+            }
+            for i in range(count)
+        ]
+        db.execute(insert(Sensor), rows)
+        db.commit()
+        return [sensor_id for (sensor_id,) in
+                db.query(Sensor.id).filter(Sensor.location_id == location.id).order_by(Sensor.id)]
+    finally:
+        db.close()
+
+
+def write_synthetic_ifc(path: str, size_mb: float, spaces_per_storey: int = 20, walls_per_space: int = 10) -> Dict[str, int]:
+    """Write an IFC4 model of about ``size_mb`` megabytes and return entity counts.
+
+    The model has a project/site/building/storey hierarchy, spaces with
+    local placements, extruded rectangle geometry and area/volume
+    quantities, and walls whose multi-line polylines, nested lists and
+    strings with escaped quotes and semicolons make up the bulk.
+    """
+    target = int(size_mb * 1024 * 1024)
+    counts = {"storeys": 0, "spaces": 0, "walls": 0}
+    next_id = [0]
+
+    def new(text, lines):
+        next_id[0] += 1
+        lines.append(f"#{next_id[0]}={text};\n")
+        return next_id[0]
+
+    def guid(n):
+        return f"{n:022X}"[-22:]
+
+    with open(path, "w", encoding="ascii") as out:
+        out.write(
+            "ISO-10303-21;\nHEADER;\n"
+            "FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');\n"
+            "FILE_NAME('synthetic.ifc','2024-01-01T00:00:00',('bench'),('bench'),'bench','bench','');\n"
+            "FILE_SCHEMA(('IFC4'));\nENDSEC;\nDATA;\n"
+        )
+        lines: List[str] = []
+        origin = new("IFCCARTESIANPOINT((0.,0.,0.))", lines)
+        z_axis = new("IFCDIRECTION((0.,0.,1.))", lines)
+        x_axis = new("IFCDIRECTION((1.,0.,0.))", lines)
+        world = new(f"IFCAXIS2PLACEMENT3D(#{origin},#{z_axis},#{x_axis})", lines)
+        context = new(f"IFCGEOMETRICREPRESENTATIONCONTEXT($,'Model',3,1.E-05,#{world},$)", lines)
+        project = new(f"IFCPROJECT('{guid(1)}',$,'Synthetic ''Bench'' Project','Generated; for benchmarks',$,$,$,(#{context}),$)", lines)
+        site_placement = new(f"IFCLOCALPLACEMENT($,#{world})", lines)
+        site = new(f"IFCSITE('{guid(2)}',$,'Site',$,$,#{site_placement},$,$,.ELEMENT.,$,$,$,$,$)", lines)
+        building_placement = new(f"IFCLOCALPLACEMENT(#{site_placement},#{world})", lines)
+        building = new(f"IFCBUILDING('{guid(3)}',$,'Building',$,$,#{building_placement},$,$,.ELEMENT.,$,$,$)", lines)
+        new(f"IFCRELAGGREGATES('{guid(4)}',$,$,$,#{project},(#{site}))", lines)
+        new(f"IFCRELAGGREGATES('{guid(5)}',$,$,$,#{site},(#{building}))", lines)
+        storey_ids = []
+        written = 0
+
+        while written < target:
+            level = counts["storeys"]
+            elevation = level * 3.5
+            point = new(f"IFCCARTESIANPOINT((0.,0.,{elevation:.1f}))", lines)
+            axis = new(f"IFCAXIS2PLACEMENT3D(#{point},#{z_axis},#{x_axis})", lines)
+            storey_placement = new(f"IFCLOCALPLACEMENT(#{building_placement},#{axis})", lines)
+            storey = new(
+                f"IFCBUILDINGSTOREY('{guid(10 + next_id[0])}',$,'Level {level}',$,$,#{storey_placement},$,$,.ELEMENT.,{elevation:.1f})",
+                lines
+            )
+            storey_ids.append(storey)
+            counts["storeys"] += 1
+            space_ids, wall_ids = [], []
+
+            for i in range(spaces_per_storey):
+                x, y = (i % 10) * 6.0, (i // 10) * 5.0
+                point = new(f"IFCCARTESIANPOINT(({x:.1f},{y:.1f},0.))", lines)
+                axis = new(f"IFCAXIS2PLACEMENT3D(#{point},#{z_axis},#{x_axis})", lines)
+                placement = new(f"IFCLOCALPLACEMENT(#{storey_placement},#{axis})", lines)
+                profile_point = new("IFCCARTESIANPOINT((3.,2.5))", lines)
+                profile_axis = new(f"IFCAXIS2PLACEMENT2D(#{profile_point},$)", lines)
+                profile = new(f"IFCRECTANGLEPROFILEDEF(.AREA.,$,#{profile_axis},6.,5.)", lines)
+                solid = new(f"IFCEXTRUDEDAREASOLID(#{profile},#{world},#{z_axis},3.)", lines)
+                body = new(f"IFCSHAPEREPRESENTATION(#{context},'Body','SweptSolid',(#{solid}))", lines)
+                shape = new(f"IFCPRODUCTDEFINITIONSHAPE($,$,(#{body}))", lines)
+                space = new(
+                    f"IFCSPACE('{guid(100000 + next_id[0])}',$,'{level}{i:02d}','Room {i}; level {level}',"
+                    f"'Office',#{placement},#{shape},'Office {level}.{i}',.ELEMENT.,.INTERNAL.,$)",
+                    lines
+                )
+                area = new("IFCQUANTITYAREA('NetFloorArea',$,$,30.,$)", lines)
+                volume = new("IFCQUANTITYVOLUME('NetVolume',$,$,90.,$)", lines)
+                height = new("IFCQUANTITYLENGTH('Height',$,$,3.,$)", lines)
+                quantities = new(f"IFCELEMENTQUANTITY('{guid(next_id[0])}',$,'Qto_SpaceBaseQuantities',$,$,(#{area},#{volume},#{height}))", lines)
+                new(f"IFCRELDEFINESBYPROPERTIES('{guid(next_id[0])}',$,$,$,(#{space}),#{quantities})", lines)
+                space_ids.append(space)
+                counts["spaces"] += 1
+
+                for w in range(walls_per_space):
+                    points = [new(f"IFCCARTESIANPOINT(({x + k * 0.5:.2f},{y + w * 0.1:.2f}))", lines) for k in range(4)]
+                    polyline = new("IFCPOLYLINE((\n  " + ",\n  ".join(f"#{p}" for p in points) + "))", lines)
+                    axis_rep = new(f"IFCSHAPEREPRESENTATION(#{context},'Axis','Curve2D',(#{polyline}))", lines)
+                    wall_shape = new(f"IFCPRODUCTDEFINITIONSHAPE($,$,(#{axis_rep}))", lines)
+                    wall = new(
+                        f"IFCWALL('{guid(900000 + next_id[0])}',$,'Wall ''{w}''; type A',\n"
+                        f"  'Partition /* not a comment */ wall',$,#{placement},#{wall_shape},'W-{w}',.PARTITIONING.)",
+                        lines
+                    )
+                    wall_ids.append(wall)
+                    counts["walls"] += 1
+
+            new(f"IFCRELAGGREGATES('{guid(next_id[0])}',$,$,$,#{storey},(" + ",".join(f"#{s}" for s in space_ids) + "))", lines)
+            new(f"IFCRELCONTAINEDINSPATIALSTRUCTURE('{guid(next_id[0])}',$,$,$,(" + ",".join(f"#{w}" for w in wall_ids) + f"),#{storey})", lines)
+            chunk = "".join(lines)
+            out.write(chunk)
+            written += len(chunk)
+            lines = []
+
+        new(f"IFCRELAGGREGATES('{guid(6)}',$,$,$,#{building},(" + ",".join(f"#{s}" for s in storey_ids) + "))", lines)
+        out.write("".join(lines))
+        out.write("ENDSEC;\nEND-ISO-10303-21;\n")
+    counts["entities"] = next_id[0]
+    return counts
+
+
+def auth_headers(username: str = "bench") -> Dict[str, str]:
+    """Return an Authorization header with a fresh token for ``username``"""
+    from backend.auth.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def get_client():
+    """Return a TestClient for the application (lifespan is not started)"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return TestClient(app)
+
+
+def timed(func: Callable, *args, **kwargs):
+    """Run ``func`` and return (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def report(label: str, count: int, elapsed: float, unit: str = "rows"):
+    """Print a throughput line"""
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"{label:<40} {count:>9} {unit} in {elapsed:8.3f}s  ({rate:,.0f} {unit}/s)")
@@ -10,9 +10,14 @@ import logging
 import os
 
 from backend.api.api_v1.api import api_router
+from backend.auth.security import password_hasher
 from backend.core.config import settings
-from backend.core.database import engine
+from backend.core.database import engine, async_engine, AsyncSessionLocal
 from backend.models import Base
+from backend.services.ifc_jobs import ifc_job_runner
+from backend.services.latest_readings import rebuild_latest
+from backend.services.monitoring_service import monitoring_service
+from backend.services.reading_rollups import check_upsert_support
 
 # Configure logging
 logging.basicConfig(
@@ -28,18 +33,30 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     logger.info("Starting IFC Monitoring System...")
+    check_upsert_support(engine.dialect.name)
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created successfully")
     
+    # Initialize the last-value table of databases that predate it
+    async with AsyncSessionLocal() as db:
+        await rebuild_latest(db)
+    
     # Start background tasks
-    # TODO: Start sensor monitoring service
+    await ifc_job_runner.start()
+    await monitoring_service.start_rollups()
+    await monitoring_service.start_retention()
     
     yield
     
     # Shutdown
     logger.info("Shutting down IFC Monitoring System...")
+    await monitoring_service.stop_retention()
+    await monitoring_service.stop_rollups()
+    await ifc_job_runner.stop()
+    await async_engine.dispose()
+    password_hasher.shutdown()
 
 
 # Create FastAPI application
@@ -81,7 +98,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {"status": "healthy", "password_hasher": password_hasher.stats()}
 
 
 if __name__ == "__main__":
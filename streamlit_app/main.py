@@ -10,6 +10,7 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import time
 import os
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -347,47 +348,71 @@ def readings_page():
     st.title("📊 Leituras dos Sensores")
     
     # Date range selector
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         start_date = st.date_input("Data Início", value=datetime.now() - timedelta(days=1))
     with col2:
         end_date = st.date_input("Data Fim", value=datetime.now())
+    with col3:
+        bucket = st.selectbox("Intervalo", ['1m', '5m', '15m', '1h', '6h', '1d'], index=1)
+    
+    start_time = datetime.combine(start_date, datetime.min.time())
+    end_time = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    
+    sensors_data = make_api_request('/sensors/?limit=1000')
+    sensors = sensors_data.get('sensors', []) if sensors_data else []
     
-    # Get readings data
-    readings_data = make_api_request('/readings/')
+    if not sensors:
+        st.info("Nenhum sensor encontrado")
+        return
     
-    if readings_data:
-        readings_df = pd.DataFrame(readings_data.get('readings', []))
+    sensor_names = {sensor['id']: f"{sensor['name']} ({sensor['sensor_type']})" for sensor in sensors}
+    sensor_id = st.selectbox("Selecionar Sensor", list(sensor_names), format_func=sensor_names.get)
+    
+    # Chart from server-side time buckets
+    params = urlencode({
+        'sensor_id': sensor_id,
+        'start': start_time.isoformat(),
+        'end': end_time.isoformat(),
+        'bucket': bucket,
+        'fn': 'avg,min,max,count'
+    })
+    aggregate_data = make_api_request(f'/readings/aggregate?{params}')
+    
+    if aggregate_data and aggregate_data.get('timestamps'):
+        st.subheader("📈 Gráfico de Leituras")
         
-        if not readings_df.empty:
-            # Convert timestamp to datetime
-            readings_df['timestamp'] = pd.to_datetime(readings_df['timestamp'])
-            
-            # Filter by date range
-            readings_df = readings_df[
-                (readings_df['timestamp'].dt.date >= start_date) &
-                (readings_df['timestamp'].dt.date <= end_date)
-            ]
-            
-            st.subheader("Leituras Recentes")
-            st.dataframe(readings_df, use_container_width=True)
-            
-            # Charts
-            if len(readings_df) > 0:
-                st.subheader("📈 Gráfico de Leituras")
-                
-                sensor_id = st.selectbox("Selecionar Sensor", readings_df['sensor_id'].unique())
-                
-                sensor_data = readings_df[readings_df['sensor_id'] == sensor_id]
-                
-                fig = px.line(sensor_data, x='timestamp', y='value', 
-                             title=f'Leituras do Sensor {sensor_id}')
-                st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("Nenhuma leitura encontrada")
-    else:
-        st.error("Erro ao carregar leituras")
+        chart_df = pd.DataFrame({
+            'timestamp': pd.to_datetime(aggregate_data['timestamps']),
+            'avg': aggregate_data['avg'],
+            'min': aggregate_data['min'],
+            'max': aggregate_data['max']
+        })
+        
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=chart_df['timestamp'], y=chart_df['max'], name='Máximo',
+                                 line=dict(width=0), showlegend=False))
+        fig.add_trace(go.Scatter(x=chart_df['timestamp'], y=chart_df['min'], name='Mínimo',
+                                 line=dict(width=0), fill='tonexty', showlegend=False))
+        fig.add_trace(go.Scatter(x=chart_df['timestamp'], y=chart_df['avg'], name='Média'))
+        fig.update_layout(title=f'Leituras do Sensor {sensor_names[sensor_id]} ({bucket})')
+        st.plotly_chart(fig, use_container_width=True)
+    elif aggregate_data is not None:
+        st.info("Nenhuma leitura encontrada no período")
+    
+    # Most recent raw readings of the selected sensor
+    params = urlencode({
+        'sensor_id': sensor_id,
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'limit': 100
+    })
+    readings_data = make_api_request(f'/readings/?{params}')
+    
+    if readings_data and readings_data.get('readings'):
+        st.subheader("Leituras Recentes")
+        st.dataframe(pd.DataFrame(readings_data['readings']), use_container_width=True)
 
 def ifc_page():
     """IFC file management page"""
@@ -463,7 +488,15 @@ def ifc_page():
                                 elif file_info['processing_status'] == 'completed':
                                     st.success("Processado com sucesso")
                                 else:
-                                    st.warning("Processando...")
+                                    job_response = requests.get(
+                                        f"{API_BASE_URL}/ifc/files/{file_info['id']}/job",
+                                        headers={'Authorization': f'Bearer {st.session_state.access_token}'}
+                                    )
+                                    if job_response.status_code == 200:
+                                        job = job_response.json()
+                                        st.progress(job['progress'] or 0.0, text=f"Processando... ({job['status']}, {job['stage'] or 'na fila'})")
+                                    else:
+                                        st.warning("Processando...")
                                 
                                 if st.button(f"Reprocessar", key=f"reprocess_{file_info['id']}"):
                                     try:
@@ -472,8 +505,11 @@ def ifc_page():
                                             headers={'Authorization': f'Bearer {st.session_state.access_token}'}
                                         )
                                         if reprocess_response.status_code == 200:
-                                            st.success("Reprocessamento iniciado!")
-                                            st.rerun()
+                                            if reprocess_response.json().get('job_id') is None:
+                                                st.info("Arquivo inalterado desde o último processamento")
+                                            else:
+                                                st.success("Reprocessamento enfileirado!")
+                                                st.rerun()
                                     except Exception as e:
                                         st.error(f"Erro: {str(e)}")
             else:
@@ -504,23 +540,34 @@ def ifc_page():
                     )
                     
                     if selected_file:
-                        # Get spaces for visualization
-                        spaces_response = requests.get(
-                            f"{API_BASE_URL}/ifc/files/{selected_file}/spaces",
-                            headers={'Authorization': f'Bearer {st.session_state.access_token}'}
-                        )
+                        # Get the geometry of all spaces in one request
+                        geometry_etag = next(f.get('geometry_etag') for f in processed_files if f['id'] == selected_file)
+                        spaces = load_geometry(selected_file, geometry_etag, st.session_state.access_token)
                         
-                        if spaces_response.status_code == 200:
-                            spaces_data = spaces_response.json()
-                            spaces = spaces_data.get('spaces', [])
-                            
-                            if spaces:
+                        if spaces is not None:
+                            if len(spaces['id']):
+                                # Colour spaces by the latest values of their sensors
+                                heatmap = None
+                                sensor_type = st.selectbox(
+                                    "Colorir por sensor",
+                                    ["", "temperature", "humidity", "pressure", "vibration"],
+                                    format_func=lambda x: x or "Área"
+                                )
+                                if sensor_type:
+                                    heatmap_response = requests.get(
+                                        f"{API_BASE_URL}/ifc/files/{selected_file}/heatmap",
+                                        params={'sensor_type': sensor_type},
+                                        headers={'Authorization': f'Bearer {st.session_state.access_token}'}
+                                    )
+                                    if heatmap_response.status_code == 200:
+                                        heatmap = heatmap_response.json()
+                                
                                 # Create 3D visualization
-                                create_3d_visualization(spaces)
+                                create_3d_visualization(spaces, heatmap)
                             else:
                                 st.info("Nenhum espaço encontrado neste arquivo IFC")
                         else:
-                            st.error("Erro ao carregar espaços")
+                            st.error("Erro ao carregar geometria")
                 else:
                     st.info("Nenhum arquivo IFC processado disponível")
             else:
@@ -588,31 +635,67 @@ def ifc_page():
         except Exception as e:
             st.error(f"Erro: {str(e)}")
 
-def create_3d_visualization(spaces):
-    """Create 3D visualization of building spaces"""
-    if not spaces:
+@st.cache_data(show_spinner=False)
+def load_geometry(file_id, geometry_etag, token):
+    """Space geometry of an IFC file as columns (numpy arrays and lists of strings).
+
+    The artifact of a given ``geometry_etag`` never changes, so it is
+    downloaded once per version and cached by the browser and by Streamlit.
+    """
+    import gzip
+    import json
+    import struct
+    import numpy as np
+    
+    response = requests.get(
+        f"{API_BASE_URL}/ifc/files/{file_id}/geometry",
+        params={'v': geometry_etag} if geometry_etag else None,
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    if response.status_code != 200:
+        return None
+    data = response.content
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    (header_size,) = struct.unpack_from("<I", data, 8)
+    header = json.loads(data[12:12 + header_size])
+    offset = 12 + header_size + (-header_size % 4)
+    columns = dict(header['strings'])
+    for column, dtype in header['columns']:
+        columns[column] = np.frombuffer(data, dtype=dtype, count=header['count'], offset=offset)
+        offset += header['count'] * np.dtype(dtype).itemsize
+    return columns
+
+def create_3d_visualization(spaces, heatmap=None):
+    """Create 3D visualization of building spaces, coloured by sensor values when a heatmap is given.
+
+    ``spaces`` are the columns returned by ``load_geometry``.
+    """
+    if spaces is None or not len(spaces['id']):
         st.info("Nenhum espaço disponível para visualização")
         return
     
     # Create sample 3D visualization using Plotly
+    import numpy as np
     import plotly.graph_objects as go
     import plotly.express as px
     
-    # Extract coordinates and create 3D scatter plot
-    x_coords = []
-    y_coords = []
-    z_coords = []
-    space_names = []
-    space_areas = []
-    space_types = []
-    
-    for space in spaces:
-        x_coords.append(space.get('x_coordinate', 0))
-        y_coords.append(space.get('y_coordinate', 0))
-        z_coords.append(space.get('z_coordinate', 0))
-        space_names.append(space.get('name', 'Unknown'))
-        space_areas.append(space.get('area', 25))
-        space_types.append(space.get('space_type', 'space'))
+    x_coords = spaces['x']
+    y_coords = spaces['y']
+    z_coords = spaces['z']
+    space_names = [name or 'Unknown' for name in spaces['name']]
+    space_areas = np.nan_to_num(spaces['area'], nan=25.0)
+    
+    colors = space_areas
+    color_title = "Área (m²)"
+    if heatmap:
+        values = np.full(len(spaces['id']), np.nan)
+        positions = np.searchsorted(spaces['id'], heatmap['space_ids'])
+        found = positions < len(spaces['id'])
+        found[found] &= spaces['id'][positions[found]] == np.asarray(heatmap['space_ids'])[found]
+        values[positions[found]] = np.asarray(heatmap['values'])[found]
+        colors = values
+        color_title = heatmap['sensor_type']
     
     # Create 3D scatter plot
     fig = go.Figure(data=go.Scatter3d(
@@ -622,10 +705,10 @@ def create_3d_visualization(spaces):
         mode='markers',
         marker=dict(
             size=8,
-            color=space_areas,
+            color=colors,
             colorscale='Viridis',
             opacity=0.8,
-            colorbar=dict(title="Área (m²)")
+            colorbar=dict(title=color_title)
         ),
         text=space_names,
         hovertemplate='<b>%{text}</b><br>' +
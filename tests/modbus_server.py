@@ -0,0 +1,78 @@
+"""
+In-process Modbus TCP stand-in server for the driver tests and benchmarks
+"""
+
+import asyncio
+import struct
+from typing import Dict, Optional, Set, Tuple
+from backend.drivers.modbus import MAX_REGISTERS_PER_REQUEST, MBAP_HEADER, READ_HOLDING_REGISTERS
+
+
+class ModbusStandInServer:
+    """Minimal in-process Modbus TCP server for the driver tests and benchmarks.
+
+    Serves ``read holding registers`` from an in-memory map of
+    ``(unit, register) -> value`` and counts the connections it accepts and
+    the requests it answers. ``response_delay`` holds every answer back to
+    exercise client timeouts.
+    """
+
+    def __init__(self, registers: Optional[Dict[Tuple[int, int], int]] = None):
+        self.registers = registers if registers is not None else {}
+        self.request_count = 0
+        self.connection_count = 0
+        self.response_delay = 0.0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening and return the bound port"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening and close the open connections"""
+        if self._server is not None:
+            self._server.close()
+            for handler in self._handlers:
+                handler.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def set_value(self, unit: int, register: int, value: int):
+        """Store a signed 16-bit value"""
+        self.registers[(unit, register)] = value & 0xFFFF
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connection_count += 1
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                transaction_id, protocol_id, length, unit = MBAP_HEADER.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                self.request_count += 1
+                if self.response_delay:
+                    await asyncio.sleep(self.response_delay)
+                writer.write(self._respond(transaction_id, protocol_id, unit, pdu))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(handler)
+            writer.close()
+
+    def _respond(self, transaction_id: int, protocol_id: int, unit: int, pdu: bytes) -> bytes:
+        function = pdu[0]
+        if function != READ_HOLDING_REGISTERS:
+            body = struct.pack(">BB", function | 0x80, 1)  # illegal function
+        else:
+            start, count = struct.unpack(">HH", pdu[1:5])
+            if not 1 <= count <= MAX_REGISTERS_PER_REQUEST:
+                body = struct.pack(">BB", function | 0x80, 3)  # illegal data value
+            else:
+                values = [self.registers.get((unit, start + i), 0) for i in range(count)]
+                body = struct.pack(f">BB{count}H", function, count * 2, *values)
+        return MBAP_HEADER.pack(transaction_id, protocol_id, len(body) + 1, unit) + body
@@ -0,0 +1,111 @@
+"""
+ModbusTCPDriver against the in-process ModbusStandInServer
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.drivers.modbus import ModbusConnectionError, ModbusError, ModbusTCPDriver
+from tests.modbus_server import ModbusStandInServer
+
+
+def run_with_server(scenario, timeout: float = 1.0):
+    """Run ``scenario(server, driver)`` against a fresh stand-in server"""
+    async def main():
+        server = ModbusStandInServer()
+        port = await server.start()
+        driver = ModbusTCPDriver("127.0.0.1", port, scale=0.1, timeout=timeout)
+        try:
+            await scenario(server, driver)
+        finally:
+            await driver.close()
+            await server.stop()
+
+    asyncio.run(main())
+
+
+def test_reads_registers_and_batches_neighbouring_sensors():
+    async def scenario(server, driver):
+        server.set_value(1, 10, 215)
+        server.set_value(1, 11, -40)
+        server.set_value(2, 7, 1000)
+
+        assert await driver.read_holding_registers(1, 10, 2) == [215, 0x10000 - 40]
+
+        sensors = [
+            SimpleNamespace(id=1, device_id="1:10"),
+            SimpleNamespace(id=2, device_id="1:11"),
+            SimpleNamespace(id=3, device_id="2:7"),
+            SimpleNamespace(id=4, device_id="not-an-address"),
+        ]
+        server.request_count = 0
+        readings = await driver.read_batch(sensors)
+        assert {sensor_id: reading["value"] for sensor_id, reading in readings.items()} == {
+            1: 21.5, 2: -4.0, 3: 100.0
+        }
+        assert server.request_count == 2  # one request per unit
+        assert server.connection_count == 1
+
+    run_with_server(scenario)
+
+
+def test_exception_response_raises_and_keeps_connection():
+    async def scenario(server, driver):
+        with pytest.raises(ModbusError, match="Exception code 3"):
+            await driver.read_holding_registers(1, 0, 0)  # illegal data value
+
+        server.set_value(1, 0, 5)
+        assert await driver.read_holding_registers(1, 0, 1) == [5]
+        assert server.connection_count == 1
+
+    run_with_server(scenario)
+
+
+def test_timeout_drops_connection_and_next_request_reconnects():
+    async def scenario(server, driver):
+        server.set_value(1, 3, 42)
+        server.response_delay = 0.3
+        with pytest.raises(ModbusConnectionError, match="TimeoutError"):
+            await driver.read_holding_registers(1, 3, 1)
+
+        server.response_delay = 0
+        assert await driver.read_holding_registers(1, 3, 1) == [42]
+        assert server.connection_count == 2
+
+    run_with_server(scenario, timeout=0.1)
+
+
+def test_cancelled_request_does_not_leak_its_response():
+    async def scenario(server, driver):
+        server.set_value(1, 1, 11)
+        server.set_value(1, 2, 22)
+        server.response_delay = 0.2
+        request = asyncio.create_task(driver.read_holding_registers(1, 1, 1))
+        await asyncio.sleep(0.05)  # the request is on the wire
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+        # The late answer to the cancelled request must not be taken for this one
+        server.response_delay = 0
+        assert await driver.read_holding_registers(1, 2, 1) == [22]
+        assert server.connection_count == 2
+
+    run_with_server(scenario)
+
+
+def test_unresponsive_gateway_abandons_the_rest_of_the_batch():
+    async def scenario(server, driver):
+        server.response_delay = 5.0
+        sensors = [SimpleNamespace(id=unit, device_id=f"{unit}:0") for unit in range(1, 21)]
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(asyncio.TimeoutError, match="unavailable"):
+            await driver.read_batch(sensors)
+        # One request timeout, not one per unit
+        assert loop.time() - started < 1.0
+        assert server.request_count == 1
+
+    run_with_server(scenario, timeout=0.1)